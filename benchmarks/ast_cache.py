@@ -0,0 +1,66 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from syvora.ast_creator import createAst, loadAst
+from syvora.ast_creator.serialization import deserialize, serialize
+from syvora.build_cache import BuildCache
+
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(["x", "y", str(rng.randrange(100)), f"<f{rng.randrange(10)} n={{x}} />"])
+    op = rng.choice(["+", "-", "*", "/", "%", "<", "=="])
+    return f"({random_expression(rng, depth - 1)} {op} {random_expression(rng, depth - 1)})"
+
+
+def generate_source(functions: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(functions):
+        lines.append(f"fn f{i}(x: Int, y: Int) -> Int {{")
+        lines.append(f"    <print arg={{{random_expression(rng, 5)}}} />")
+        lines.append(f"    return if x > {i} {{ {random_expression(rng, 4)} }} else {{ {random_expression(rng, 4)} }}")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = generate_source(args.functions)
+    data = serialize(createAst(source, "<bench>"))
+    print(f"source: {len(source) / 1024:.1f} KiB, serialized: {len(data) / 1024:.1f} KiB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.syv")
+        with open(path, "w") as file:
+            file.write(source)
+        cache = BuildCache(os.path.join(directory, "ast"))
+        loadAst(path, cache)
+
+        parse = measure(lambda: createAst(source, path), args.repeat)
+        load = measure(lambda: deserialize(data), args.repeat)
+        cached = measure(lambda: loadAst(path, cache), args.repeat)
+
+    print(f"tokenize + parse: {parse * 1000:8.2f} ms")
+    print(f"deserialize:      {load * 1000:8.2f} ms ({parse / load:.1f}x)")
+    print(f"cached loadAst:   {cached * 1000:8.2f} ms ({parse / cached:.1f}x, including read and hash)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import time
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.optimizer import create_llvm_module, optimize
+from syvora.llvmir_generator.target import create_target_machine
+
+
+def generate_source(components: int) -> str:
+    lines = ["fn main() -> Int {"]
+    # Only every other component is reachable from main.
+    for i in range(0, components, 2):
+        lines.append(f"    <component{i} width={{320}} height={{{i}}} />")
+    lines.append("    return 0")
+    lines.append("}")
+    lines.append("")
+
+    for i in range(components):
+        lines.append(f"fn component{i}(width: Int, height: Int) -> Int {{")
+        lines.append(f"    <print arg={{2 * 60 * 60 + {i} * 0}} />")
+        lines.append(f"    <print arg={{width * 1 + (16 - 4) / 3 * height}} />")
+        lines.append(f"    <print arg={{if {i} % 2 == 0 && !false {{ width - 0 }} else {{ 8 * 8 }}}} />")
+        lines.append("    return width * (height + 0) * (100 - 99)")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def measure(source: str, opt_level: int, fold: bool):
+    start = time.perf_counter()
+    ast = createAst(source, "<bench>")
+    if fold:
+        ast = optimize_ast(ast)
+    generator = LLVMIRGenerator()
+    generator.visit(ast)
+    codegen = time.perf_counter() - start
+
+    start = time.perf_counter()
+    llvm_module = create_llvm_module(generator.module)
+    optimize(llvm_module, opt_level, create_target_machine(opt_level))
+    llvm_time = time.perf_counter() - start
+
+    instructions = sum(1 for function in llvm_module.functions for block in function.blocks for _ in block.instructions)
+    return codegen, llvm_time, len(str(generator.module)), instructions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--components", type=int, default=2000)
+    parser.add_argument("-O", dest="opt_level", type=int, default=2)
+    args = parser.parse_args()
+
+    source = generate_source(args.components)
+    for label, fold in [("unfolded", False), ("folded", True)]:
+        codegen, llvm_time, ir_size, instructions = measure(source, args.opt_level, fold)
+        print(f"{label:9} frontend+codegen {codegen * 1000:8.1f} ms  llvm {llvm_time * 1000:8.1f} ms  "
+              f"ir {ir_size / 1024:8.1f} KiB  {instructions} instructions after -O{args.opt_level}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import gc
+import tracemalloc
+from syvora.ast_creator import ASTNode
+from syvora.ast_creator.ast_nodes import iter_fields
+from syvora.ast_creator.ast_parser import Parser
+from syvora.ast_creator.lexer import tokenize
+
+
+def generate_source(components: int) -> str:
+    lines = []
+    for i in range(components):
+        lines.append(f"fn component{i}(width: Int, height: Int) -> Int {{")
+        lines.append(f"    <stack spacing={{2 * 60 * 60}} width={{width}}>")
+        lines.append(f"        <row height={{height - {i}}}>")
+        lines.append(f"            <label size={{12}} weight={{width / 2}} />")
+        lines.append(f"            <icon size={{16}} />")
+        lines.append("        </row>")
+        lines.append(f"        <button width={{width - 8}} height={{32}} />")
+        lines.append("    </stack>")
+        lines.append("    return width * height")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def iter_nodes(root: ASTNode):
+    stack = [root]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, ASTNode):
+            yield value
+            stack.extend(child for _, child in iter_fields(value))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+# Plain __dict__-backed mirrors of the node classes, laid out the way the AST
+# was before the nodes got __slots__.
+dict_classes = {}
+
+
+# Copies the node structure while sharing the leaf values, so both layouts are
+# measured on exactly the same strings and numbers.
+def copy_nodes(value, dict_backed: bool):
+    if isinstance(value, ASTNode):
+        cls = type(value)
+        if dict_backed:
+            cls = dict_classes.get(cls) or dict_classes.setdefault(cls, type(cls.__name__, (), {}))
+        node = object.__new__(cls)
+        for name, child in iter_fields(value):
+            setattr(node, name, copy_nodes(child, dict_backed))
+        return node
+    elif isinstance(value, list):
+        return [copy_nodes(child, dict_backed) for child in value]
+    elif isinstance(value, tuple):
+        return tuple(copy_nodes(child, dict_backed) for child in value)
+    return value
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--components", type=int, default=5000)
+    args = parser.parse_args()
+
+    tokens = tokenize(generate_source(args.components), "<bench>")
+    module = Parser(None, tokens).parse()
+    nodes = sum(1 for _ in iter_nodes(module))
+
+    slotted = measure(lambda: copy_nodes(module, False))
+    dict_backed = measure(lambda: copy_nodes(module, True))
+    print(f"{nodes} nodes")
+    print(f"__dict__ nodes: {dict_backed / nodes:6.1f} bytes/node")
+    print(f"__slots__ nodes: {slotted / nodes:6.1f} bytes/node ({dict_backed / slotted:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import re
+import time
+from syvora.ast_creator.lexer import Token, TokenType, tokenize
+
+
+# The regex-per-token tokenizer that preceded the compact token stream, kept
+# here as the baseline.
+legacy_token_types = [
+    (TokenType.KEYWORD.name,
+     r'\b(?:import|as|struct|pub|const|var|fn|export|return|if|else|throws|async)\b'),
+    (TokenType.TYPE_EXPRESSION.name, r'[A-Z][a-zA-Z0-9]*'),
+    (TokenType.IDENTIFIER.name, r'[a-z][a-zA-Z0-9]*'),
+    (TokenType.FLOAT_LITERAL.name, r'\d+\.\d+'),
+    (TokenType.INTEGER_LITERAL.name, r'\d+'),
+    (TokenType.STRING_LITERAL.name, r'"(?:[^"\\]|\\.)*"'),
+    (TokenType.BOOLEAN_LITERAL.name, r'\b(?:true|false)\b'),
+    (TokenType.WHITESPACE.name, r'[ \t]+'),
+    (TokenType.NEWLINE.name, r'\n'),
+    (TokenType.COMMENT.name, r'(?:\/\/[^\n]*|\/\*(?:.|\n)*?\*\/)'),
+    (TokenType.SYMBOL.name, r'(?:->|/>|</)|[{}()\[\],.:;<>]'),
+    (TokenType.OPERATOR.name,
+     r'[+\-*/%^!=<>&|]|(?:\.\.<|==|!=|<=|>=|&&|\|\||\.\.\.)'),
+]
+legacy_token_regex = re.compile('|'.join('(?P<%s>%s)' % pair for pair in legacy_token_types))
+
+
+def legacy_tokenize(source_code: str, file_path: str):
+    line_num = 1
+    col_num = 1
+
+    for m in re.finditer(legacy_token_regex, source_code):
+        token_type = TokenType[m.lastgroup]
+        token_value = m.group(token_type.name)
+
+        if token_type == TokenType.WHITESPACE or token_type == TokenType.COMMENT:
+            pass
+        else:
+            yield Token(token_type, token_value, line_num, col_num, file_path)
+
+        col_num += len(token_value)
+        line_num += token_value.count('\n')
+        col_num = 1 if '\n' in token_value else col_num
+
+
+def generate_source(functions: int) -> str:
+    lines = []
+    for i in range(functions):
+        lines.append(f"// component {i}")
+        lines.append(f"fn component{i}(width: Int, height: Int) -> Int {{")
+        lines.append(f"    <layout width={{width * 2 + {i}}} height={{height - 1}}>")
+        lines.append(f"        <label size={{2 * 60 * 60}} weight={{{i}.5}} />")
+        lines.append("    </layout>")
+        lines.append("    return width * height")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = generate_source(args.functions)
+    count = len(tokenize(source, "<bench>"))
+    print(f"{len(source) / 1e6:.1f} MB, {count} tokens")
+
+    legacy = measure(lambda: list(legacy_tokenize(source, "<bench>")), args.repeat)
+    compact = measure(lambda: tokenize(source, "<bench>"), args.repeat)
+    print(f"legacy:  {count / legacy / 1e6:6.2f} M tokens/s")
+    print(f"compact: {count / compact / 1e6:6.2f} M tokens/s ({legacy / compact:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import mark_memoizable, optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.jit import JIT
+from syvora.llvmir_generator.optimizer import create_llvm_module
+
+
+def generate_source(n: int) -> str:
+    return "\n".join([
+        "fn main() -> Int {",
+        f"    return <fib n={{{n}}} />",
+        "}",
+        "",
+        "fn fib(n: Int) -> Int {",
+        "    return if n <= 2 { 1 } else { <fib n={n - 1} /> + <fib n={n - 2} /> }",
+        "}",
+        "",
+    ])
+
+
+def measure(n: int, opt_level: int, memo_capacity):
+    # No compile-time evaluation, so the call is really made at runtime.
+    ast = optimize_ast(createAst(generate_source(n), "<bench>"), max_steps=0)
+    if memo_capacity is not None:
+        mark_memoizable(ast, memo_capacity)
+    generator = LLVMIRGenerator()
+    generator.visit(ast)
+
+    jit = JIT(create_llvm_module(generator.module), opt_level)
+    result = generator.run_function(jit)
+    return result, jit.execution_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 25, 30, 35, 40])
+    parser.add_argument("--memo-capacity", type=int, default=4096)
+    parser.add_argument("-O", dest="opt_level", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'n':>4} {'plain':>12} {'memoized':>12}")
+    for n in args.sizes:
+        plain_result, plain = measure(n, args.opt_level, None)
+        memo_result, memoized = measure(n, args.opt_level, args.memo_capacity)
+        assert plain_result == memo_result
+        print(f"{n:>4} {plain * 1000:>9.3f} ms {memoized * 1000:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
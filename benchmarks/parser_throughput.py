@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+from syvora.ast_creator import BinaryExpression, TokenType
+from syvora.ast_creator.ast_parser import Parser
+from syvora.ast_creator.lexer import tokenize
+
+
+class DescentParser(Parser):
+    # The one-method-per-precedence-level chain the precedence-climbing
+    # expression parser replaced, kept here as the baseline.
+    def expression(self):
+        return self.or_expression()
+
+    def or_expression(self):
+        return self.binary_expression(self.and_expression, '||')
+
+    def and_expression(self):
+        return self.binary_expression(self.equality_expression, '&&')
+
+    def equality_expression(self):
+        return self.binary_expression(self.relational_expression, '==', '!=')
+
+    def relational_expression(self):
+        return self.binary_expression(self.range_expression, '<', '<=', '>', '>=')
+
+    def range_expression(self):
+        return self.binary_expression(self.additive_expression, '...', '..<')
+
+    def additive_expression(self):
+        return self.binary_expression(self.multiplicative_expression, '+', '-')
+
+    def multiplicative_expression(self):
+        return self.binary_expression(self.unary_expression, '*', '/', '%')
+
+    def binary_expression(self, next_expression_fn, *ops):
+        left = next_expression_fn()
+
+        while self.token_type == TokenType.OPERATOR and self.token_value in ops:
+            op = self.token_value
+            self.next()
+            self.skip_newlines()
+            right = next_expression_fn()
+            left = BinaryExpression(left, op, right)
+
+        return left
+
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(["x", "y", str(rng.randrange(100)), f"<f{rng.randrange(10)} n={{x}} />"])
+    op = rng.choice(["+", "-", "*", "/", "%"])
+    return f"{random_expression(rng, depth - 1)} {op} {random_expression(rng, depth - 1)}"
+
+
+def generate_source(functions: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(functions):
+        lines.append(f"fn f{i}(x: Int, y: Int) -> Int {{")
+        lines.append(f"    <print arg={{{random_expression(rng, 5)}}} />")
+        lines.append(f"    return {random_expression(rng, 6)}")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def measure(parser_class, tokens, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_class(None, tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tokens = tokenize(generate_source(args.functions), "<bench>")
+    print(f"{len(tokens)} tokens")
+
+    descent = measure(DescentParser, tokens, args.repeat)
+    climbing = measure(Parser, tokens, args.repeat)
+    print(f"descent:    {len(tokens) / descent / 1e6:6.2f} M tokens/s")
+    print(f"precedence: {len(tokens) / climbing / 1e6:6.2f} M tokens/s ({descent / climbing:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import time
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.jit import JIT
+from syvora.llvmir_generator.optimizer import create_llvm_module
+from syvora.llvmir_generator.profile import read_profile, use_profile
+from syvora.llvmir_generator.target import NATIVE_CPU
+
+
+def blend_source(terms: int) -> str:
+    return " + ".join(f"(x * {3 + 2 * j} + k * {5 + 3 * j}) * (x + {7 + j} * k)" for j in range(terms))
+
+
+# Every workload is a run(n) whose work grows with n. calls spends its time in
+# a function too large to inline without knowing it is hot, branches in ifs
+# that almost always go the same way. Both have a smaller warm-up phase, as
+# real programs do, so that their hot loops stand out in the profile.
+WORKLOADS = {
+    "calls": f"""fn blend(x: Int, k: Int) -> Int {{
+    return {blend_source(24)}
+}}
+
+fn warm(n: Int) -> Int {{
+    return for i in 0 ..< n with acc = 27 {{ if acc % 2 == 0 {{ acc / 2 }} else {{ if acc == 1 {{ i }} else {{ 3 * acc + 1 }} }} }}
+}}
+
+fn run(n: Int) -> Int {{
+    return <warm n={{n / 10}} /> + for i in 0 ..< n with acc = 0 {{ acc + <blend x={{i}} k={{i % 8}} /> }}
+}}
+""",
+    "branches": """fn warm(n: Int) -> Int {
+    return for i in 0 ..< n with acc = 27 { if acc % 2 == 0 { acc / 2 } else { if acc == 1 { i } else { 3 * acc + 1 } } }
+}
+
+fn step(acc: Int, i: Int) -> Int {
+    return if i % 4096 == 17 { acc / 3 + i % 7 } else { if i % 16 == 5 { acc - i } else { acc + i % 11 } }
+}
+
+fn run(n: Int) -> Int {
+    return <warm n={n / 10} /> + for i in 0 ..< n with acc = 0 { if acc > 1000000000 { acc / 2 } else { <step acc={acc} i={i} /> } }
+}
+""",
+}
+
+
+def compile_run(source: str, opt_level: int, target_cpu=None, profile=None, instrumented: bool = False):
+    module = optimize_ast(createAst(source, "<bench>"))
+    for function in module.functions:
+        function.instrumented = instrumented
+    if profile is not None:
+        use_profile(profile, module.functions)
+    generator = LLVMIRGenerator()
+    generator.visit(module)
+    jit = JIT(create_llvm_module(generator.module), opt_level, target_cpu=target_cpu)
+    slot = next(slot for slot, function in enumerate(module.function_table) if function.name == "run")
+    return jit, jit.cfunction(generator.function_for_slot(slot)), module
+
+
+def measure(run, count: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(count)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=50000000)
+    parser.add_argument("--train-count", type=int, default=5000000,
+                        help="n of the instrumented run that records the profile")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-O", dest="opt_level", type=int, default=2)
+    args = parser.parse_args()
+
+    for name, source in WORKLOADS.items():
+        jit, run, module = compile_run(source, args.opt_level, instrumented=True)
+        run(args.train_count)
+        profile = read_profile(jit, module.functions)
+
+        variants = [
+            ("generic", None, None),
+            ("native", NATIVE_CPU, None),
+            ("generic+profile", None, profile),
+            ("native+profile", NATIVE_CPU, profile),
+        ]
+        results = set()
+        baseline = None
+        for label, target_cpu, variant_profile in variants:
+            # The JIT owns the machine code run points to.
+            jit, run, _ = compile_run(source, args.opt_level, target_cpu, variant_profile)
+            elapsed, result = measure(run, args.count, args.repeat)
+            baseline = baseline or elapsed
+            results.add(result)
+            print(f"{name:8} {label:16} {elapsed * 1000:8.1f} ms ({baseline / elapsed:.2f}x)")
+        if len(results) != 1:
+            raise RuntimeError(f"{name}: variants disagree: {sorted(results)}")
+
+
+if __name__ == "__main__":
+    main()
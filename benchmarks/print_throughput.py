@@ -0,0 +1,92 @@
+import argparse
+import os
+import tempfile
+import time
+import llvmlite.ir as ir
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.jit import JIT
+from syvora.llvmir_generator.optimizer import create_llvm_module
+from syvora.semantic import BOOL, FLOAT, INT
+
+
+class PrintfGenerator(LLVMIRGenerator):
+    # The printf wrapper per printed value the buffered runtime replaced,
+    # kept here as the baseline.
+    def add_runtime(self, declare_only: bool = False):
+        i8_pointer = ir.IntType(8).as_pointer()
+        printf = ir.Function(self.module, ir.FunctionType(ir.IntType(32), [i8_pointer], var_arg=True), "printf")
+
+        self.print_functions = {}
+        for name, value_type, format_text in [(INT, ir.IntType(64), "%ld\n"),
+                                              (FLOAT, ir.DoubleType(), "%f\n"),
+                                              (BOOL, ir.IntType(1), "%d\n")]:
+            function = ir.Function(self.module, ir.FunctionType(ir.VoidType(), [value_type]), f"print_{name}")
+            builder = ir.IRBuilder(function.append_basic_block("entry"))
+
+            data = bytearray((format_text + "\0").encode())
+            format_string = ir.GlobalVariable(self.module, ir.ArrayType(ir.IntType(8), len(data)), f".str.{name}")
+            format_string.linkage = 'private'
+            format_string.global_constant = True
+            format_string.initializer = ir.Constant(format_string.value_type, data)
+
+            value = function.args[0]
+            if name == BOOL:
+                value = builder.zext(value, ir.IntType(32))
+            builder.call(printf, [builder.bitcast(format_string, i8_pointer), value])
+            builder.ret_void()
+            self.print_functions[name] = function
+
+
+def generate_source(kind: str) -> str:
+    value = {INT: "n * 7919", FLOAT: "0.5", BOOL: "n % 3 == 0"}[kind]
+    return f"""fn emit(n: Int) -> Int {{
+    <print arg={{{value}}} />
+    return if n == 0 {{ 0 }} else {{ <emit n={{n - 1}} /> }}
+}}
+
+fn main() -> Int {{
+    return <emit n={{0}} />
+}}
+"""
+
+
+def measure(generator_class, kind: str, count: int, opt_level: int) -> float:
+    module = optimize_ast(createAst(generate_source(kind), "<bench>"))
+    generator = generator_class()
+    generator.visit(module)
+    jit = JIT(create_llvm_module(generator.module), opt_level)
+    slot = next(slot for slot, function in enumerate(module.function_table) if function.name == "emit")
+    emit = jit.cfunction(generator.function_for_slot(slot))
+
+    # The output goes to a file so the terminal does not dominate the timing.
+    with tempfile.TemporaryFile() as output:
+        saved_stdout = os.dup(1)
+        os.dup2(output.fileno(), 1)
+        try:
+            start = time.perf_counter()
+            emit(count - 1)
+            jit.flush_output()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.dup2(saved_stdout, 1)
+            os.close(saved_stdout)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("-O", dest="opt_level", type=int, default=2)
+    args = parser.parse_args()
+
+    for kind in [INT, FLOAT, BOOL]:
+        printf = measure(PrintfGenerator, kind, args.count, args.opt_level)
+        buffered = measure(LLVMIRGenerator, kind, args.count, args.opt_level)
+        print(f"{kind:5}  printf: {args.count / printf / 1e6:6.2f} M lines/s   "
+              f"buffered: {args.count / buffered / 1e6:6.2f} M lines/s ({printf / buffered:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import time
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.jit import JIT
+from syvora.llvmir_generator.optimizer import create_llvm_module
+
+
+class UnhintedGenerator(LLVMIRGenerator):
+    # The same loops without vectorization hints, so the difference they make
+    # is measured on its own.
+    def loop_hints(self, node):
+        return [["llvm.loop.mustprogress"]]
+
+
+# What each workload adds up for every i in the range, its type and whether it
+# runs with fast-math. sum adds the elements themselves and map first sends
+# each through an arithmetic function; both keep the optimizer from replacing
+# the loop with a closed form. fsum is a Float reduction, which only fast-math
+# lets the vectorizer reorder.
+WORKLOADS = {
+    "sum": ("i % 1000", "Int", "0", False),
+    "map": ("(i * i + 3 * i) % 7 * (i % 13 - 6)", "Int", "0", False),
+    "fsum": ("0.125", "Float", "0.0", True),
+}
+
+
+def loop_source(value: str, value_type: str, zero: str) -> str:
+    return f"""fn run(n: Int) -> {value_type} {{
+    return for i in 0 ..< n with total = {zero} {{ total + {value} }}
+}}
+"""
+
+
+# Before ranges, iterating meant recursing with the state in arguments.
+def recursive_source(value: str, value_type: str, zero: str) -> str:
+    return f"""fn step(i: Int, n: Int, total: {value_type}) -> {value_type} {{
+    return if i < n {{ <step i={{i + 1}} n={{n}} total={{total + {value}}} /> }} else {{ total }}
+}}
+
+fn run(n: Int) -> {value_type} {{
+    return <step i={{0}} n={{n}} total={{{zero}}} />
+}}
+"""
+
+
+def measure(generator_class, source: str, fast_math: bool, count: int, opt_level: int, repeat: int):
+    module = optimize_ast(createAst(source, "<bench>"))
+    for function in module.functions:
+        function.fast_math = fast_math
+    generator = generator_class()
+    generator.visit(module)
+    jit = JIT(create_llvm_module(generator.module), opt_level)
+    slot = next(slot for slot, function in enumerate(module.function_table) if function.name == "run")
+    run = jit.cfunction(generator.function_for_slot(slot))
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(count)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-O", dest="opt_levels", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+
+    for opt_level in args.opt_levels:
+        for name, (value, value_type, zero, fast_math) in WORKLOADS.items():
+            variants = [
+                ("recursion", LLVMIRGenerator, recursive_source(value, value_type, zero)),
+                ("range", UnhintedGenerator, loop_source(value, value_type, zero)),
+                ("range+hints", LLVMIRGenerator, loop_source(value, value_type, zero)),
+            ]
+            results = set()
+            baseline = None
+            for label, generator_class, source in variants:
+                elapsed, result = measure(generator_class, source, fast_math, args.count, opt_level, args.repeat)
+                baseline = baseline or elapsed
+                results.add(result)
+                print(f"-O{opt_level} {name:4} {label:12} {args.count / elapsed / 1e6:9.1f} M elements/s "
+                      f"({baseline / elapsed:.1f}x)")
+            if len(results) != 1:
+                raise RuntimeError(f"{name}: variants disagree: {sorted(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+SOURCE = """fn main() -> Int {
+    <print arg={<double n={21} />} />
+    return 0
+}
+
+fn double(n: Int) -> Int {
+    return n * 2
+}
+"""
+
+# Reports whether llvmlite got imported, so a regression in the lazy imports
+# shows up next to the timings.
+PROBE = """
+import sys
+from syvora.main import main
+main(sys.argv[1:])
+sys.stdout.flush()
+print("llvmlite" in sys.modules, file=sys.stderr)
+"""
+
+
+def measure(command, path: str, repeat: int):
+    best = float("inf")
+    loaded = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", PROBE, *command, path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        best = min(best, time.perf_counter() - start)
+        loaded = result.stderr.strip().splitlines()[-1]
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.syv")
+        with open(path, "w") as file:
+            file.write(SOURCE)
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        python = time.perf_counter() - start
+
+        print(f"{'python -c pass':32} {python * 1000:8.1f} ms")
+        for command in [["check"], ["ast"], ["run", "--tiered", "--hot-threshold", "0"], ["ir"], ["run"]]:
+            best, loaded = measure(command, path, args.repeat)
+            print(f"{' '.join(command):32} {best * 1000:8.1f} ms  llvmlite loaded: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import ctypes
+import sys
+import time
+import llvmlite.ir as ir
+from syvora.ast_creator import createAst
+from syvora.ast_optimizer import optimize_ast
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.jit import JIT
+from syvora.llvmir_generator.optimizer import create_llvm_module
+
+
+class DeclaredOrderGenerator(LLVMIRGenerator):
+    # Fields in the order the source declares them, the way C lays them out.
+    reorder_fields = False
+
+
+class RegisterGenerator(LLVMIRGenerator):
+    # Every struct passed and returned in registers, however large.
+    max_register_struct_size = sys.maxsize
+
+
+class PointerGenerator(LLVMIRGenerator):
+    # Every struct passed and returned through memory.
+    max_register_struct_size = -1
+
+
+# Every workload is a struct with a spawn(i) that creates the i-th element, a
+# step(p, dt) that advances one and a score(p) the checksum adds up. Their
+# Bools sit between the 8-byte fields, so the declared order is padded: Cell
+# takes 24 bytes that way and 16 reordered, which fits in registers, and
+# Particle 64 and 48, which does not.
+WORKLOADS = {
+    "Cell": """struct Cell {
+    const alive: Bool
+    const energy: Float
+    const dirty: Bool
+}
+
+fn spawn(i: Int) -> Cell {
+    return <Cell alive={i % 3 != 0} energy={if i % 2 == 0 { 1.0 } else { 2.5 }} dirty={false} />
+}
+
+fn step(p: Cell, dt: Float) -> Cell {
+    return <Cell alive={p.alive && p.energy > dt} energy={if p.alive { p.energy - dt } else { p.energy + dt * 0.5 }} dirty={!p.dirty} />
+}
+
+fn score(p: Cell) -> Float {
+    return if p.alive && !p.dirty { p.energy } else { 0.0 }
+}
+""",
+    "Particle": """struct Particle {
+    const alive: Bool
+    const x: Float
+    const frozen: Bool
+    const y: Float
+    const charged: Bool
+    const vx: Float
+    const id: Int
+    const vy: Float
+}
+
+fn spawn(i: Int) -> Particle {
+    return <Particle alive={i % 7 != 0} x={0.0} frozen={i % 5 == 0} y={100.0} charged={i % 3 == 0} vx={if i % 4 == 0 { 2.0 } else { 1.0 }} id={i} vy={0.0} />
+}
+
+fn step(p: Particle, dt: Float) -> Particle {
+    return if p.frozen || !p.alive { p } else { <Particle alive={p.y > 0.0} x={p.x + p.vx * dt} frozen={false} y={p.y + p.vy * dt} charged={p.charged} vx={if p.charged { p.vx * 0.5 } else { p.vx }} id={p.id} vy={p.vy - 9.8 * dt} /> }
+}
+
+fn score(p: Particle) -> Float {
+    return if p.alive { p.x + p.y } else { 0.0 }
+}
+""",
+}
+
+# (label, generator class, whether step may be inlined into the loop)
+VARIANTS = [
+    ("declared", DeclaredOrderGenerator, True),
+    ("reordered", LLVMIRGenerator, True),
+    ("declared calls", DeclaredOrderGenerator, False),
+    ("reordered calls", LLVMIRGenerator, False),
+    ("register calls", RegisterGenerator, False),
+    ("pointer calls", PointerGenerator, False),
+]
+
+DT = 0.01
+
+
+def call(builder: ir.IRBuilder, function: ir.Function, struct_pointer, scalars: list):
+    # Syvora has no arrays, so the loops over one are written in IR here. They
+    # call the generated functions the way generated code does: a struct
+    # argument is either loaded or passed as a pointer to the element, and a
+    # struct result either returned or written through a pointer.
+    params = list(function.function_type.args)
+    args = []
+    result = None
+    if isinstance(function.function_type.return_type, ir.VoidType):
+        entry = ir.IRBuilder()
+        entry.position_at_start(builder.function.entry_basic_block)
+        result = entry.alloca(params.pop(0).pointee)
+        args.append(result)
+    if struct_pointer is not None:
+        args.append(struct_pointer if params.pop(0).is_pointer else builder.load(struct_pointer))
+    args.extend(scalars)
+    value = builder.call(function, args)
+    return value if result is None else builder.load(result)
+
+
+def counted_loop(module: ir.Module, name: str, return_type: ir.Type, body):
+    i64 = ir.IntType(64)
+    function = ir.Function(module, ir.FunctionType(return_type, [ir.IntType(8).as_pointer(), i64]), name)
+    array, count = function.args
+    entry = function.append_basic_block("entry")
+    loop = function.append_basic_block("loop")
+    done = function.append_basic_block("done")
+    builder = ir.IRBuilder(entry)
+    zero = ir.Constant(return_type, 0.0) if isinstance(return_type, ir.DoubleType) else None
+    builder.cbranch(builder.icmp_signed(">", count, ir.Constant(i64, 0)), loop, done)
+
+    builder.position_at_end(loop)
+    index = builder.phi(i64)
+    index.add_incoming(ir.Constant(i64, 0), entry)
+    total = builder.phi(return_type) if zero is not None else None
+    if total is not None:
+        total.add_incoming(zero, entry)
+    value = body(builder, array, index, total)
+    next_index = builder.add(index, ir.Constant(i64, 1))
+    index.add_incoming(next_index, builder.block)
+    if total is not None:
+        total.add_incoming(value, builder.block)
+    builder.cbranch(builder.icmp_signed("<", next_index, count), loop, done)
+
+    builder.position_at_end(done)
+    if total is None:
+        builder.ret_void()
+    else:
+        result = builder.phi(return_type)
+        result.add_incoming(zero, entry)
+        result.add_incoming(value, loop)
+        builder.ret(result)
+
+
+def add_driver(generator: LLVMIRGenerator, struct_type: ir.Type, spawn: ir.Function, step: ir.Function, score: ir.Function):
+    module = generator.module
+    f64 = ir.DoubleType()
+
+    def element(builder, array, index):
+        return builder.gep(builder.bitcast(array, struct_type.as_pointer()), [index], inbounds=True)
+
+    # The size LLVM itself gives the type, as an array of it is laid out.
+    size = ir.Function(module, ir.FunctionType(ir.IntType(64), []), "size")
+    builder = ir.IRBuilder(size.append_basic_block("entry"))
+    end = builder.gep(ir.Constant(struct_type.as_pointer(), None), [ir.Constant(ir.IntType(32), 1)])
+    builder.ret(builder.ptrtoint(end, ir.IntType(64)))
+
+    def fill(builder, array, index, total):
+        builder.store(call(builder, spawn, None, [index]), element(builder, array, index))
+
+    def update(builder, array, index, total):
+        pointer = element(builder, array, index)
+        builder.store(call(builder, step, pointer, [ir.Constant(f64, DT)]), pointer)
+
+    def checksum(builder, array, index, total):
+        return builder.fadd(total, call(builder, score, element(builder, array, index), []))
+
+    counted_loop(module, "fill", ir.VoidType(), fill)
+    counted_loop(module, "update", ir.VoidType(), update)
+    counted_loop(module, "checksum", f64, checksum)
+
+
+def compile_workload(source: str, generator_class, inline: bool, opt_level: int):
+    module = optimize_ast(createAst(source, "<bench>"))
+    generator = generator_class()
+    generator.visit(module)
+    functions = {function.name: generator.function_for_slot(slot) for slot, function in enumerate(module.function_table)}
+    if not inline:
+        functions["step"].attributes.add('noinline')
+    declaration = module.structs[0]
+    add_driver(generator, generator.struct_type(declaration), functions["spawn"], functions["step"], functions["score"])
+
+    jit = JIT(create_llvm_module(generator.module), opt_level)
+    pointer = ctypes.c_void_p
+    entry_points = (
+        ctypes.CFUNCTYPE(ctypes.c_int64)(jit.engine.get_function_address("size")),
+        ctypes.CFUNCTYPE(None, pointer, ctypes.c_int64)(jit.engine.get_function_address("fill")),
+        ctypes.CFUNCTYPE(None, pointer, ctypes.c_int64)(jit.engine.get_function_address("update")),
+        ctypes.CFUNCTYPE(ctypes.c_double, pointer, ctypes.c_int64)(jit.engine.get_function_address("checksum")),
+    )
+    return jit, entry_points, generator.struct_layout(declaration)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1000000, help="elements in the array")
+    parser.add_argument("--steps", type=int, default=10, help="passes over the array per measurement")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-O", dest="opt_level", type=int, default=2)
+    args = parser.parse_args()
+
+    for name, source in WORKLOADS.items():
+        results = set()
+        baseline = None
+        for label, generator_class, inline in VARIANTS:
+            # The JIT owns the machine code the entry points run.
+            jit, (size, fill, update, checksum), layout = compile_workload(source, generator_class, inline, args.opt_level)
+            element_size = size()
+            if element_size != layout.size:
+                raise RuntimeError(f"{name}: LLVM lays {label} out in {element_size} bytes, not {layout.size}")
+
+            # 8-byte words keep the elements aligned.
+            array = (ctypes.c_uint64 * (args.count * element_size // 8))()
+            best = float("inf")
+            for _ in range(args.repeat):
+                fill(array, args.count)
+                start = time.perf_counter()
+                for _ in range(args.steps):
+                    update(array, args.count)
+                best = min(best, time.perf_counter() - start)
+            results.add(checksum(array, args.count))
+
+            baseline = baseline or best
+            passing = "registers" if layout.size <= generator_class.max_register_struct_size else "pointer"
+            print(f"{name:8} {label:15} {element_size:3} B ({layout.padding:2} padding) "
+                  f"{args.count * element_size / 2 ** 20:7.1f} MiB, {passing:9} "
+                  f"{args.count * args.steps / best / 1e6:8.1f} M elements/s ({baseline / best:.2f}x)")
+        if len(results) != 1:
+            raise RuntimeError(f"{name}: variants disagree: {sorted(results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
-from .ast import createAst
+from .ast import createAst, createFunctionStream, loadAst
+from .fingerprint import function_fingerprint, function_signature
 from .ast_nodes import *
-from .lexer import TokenType
+from .lexer import FileTable, TokenStream, TokenType
@@ -1,8 +1,52 @@
-from .lexer import tokenize
+import hashlib
+import mmap
+from typing import Generator
+from syvora.build_cache import BuildCache
+from .ast_nodes import FunctionDeclaration, Module, StructDeclaration
+from .lexer import DEFAULT_WINDOW_SIZE, StreamingTokenStream, file_table, tokenize
 from .ast_parser import Parser
+from .serialization import deserialize, serialize
+
+
+AST_UNIT = "ast"
 
 
 def createAst(source_code: str, file_path: str):
     tokens = tokenize(source_code, file_path)
     parser = Parser(source_code, tokens)
     return parser.parse()
+
+
+# Parses a file, or loads the tree serialized the last time a file with the
+# same contents was parsed.
+def loadAst(file_path: str, cache: BuildCache = None) -> Module:
+    with open(file_path, "rb") as file:
+        source = file.read()
+    if cache is None:
+        return createAst(source.decode("utf-8"), file_path)
+
+    key = hashlib.sha256(source).hexdigest()
+    data = cache.load(key, AST_UNIT)
+    module = deserialize(data) if data is not None else None
+    if module is None:
+        module = createAst(source.decode("utf-8"), file_path)
+        cache.store(key, AST_UNIT, serialize(module))
+    return module
+
+
+# Yields functions as soon as they are parsed, and structs in between where
+# they are declared.
+def createFunctionStream(file_path: str, window_size: int = DEFAULT_WINDOW_SIZE) -> Generator[FunctionDeclaration | StructDeclaration, None, None]:
+    with open(file_path, "rb") as file:
+        size = file.seek(0, 2)
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+
+    try:
+        tokens = StreamingTokenStream(source, file_table.add(file_path), window_size=window_size)
+        parser = Parser(None, tokens)
+        if len(parser.parse_imports()) > 0:
+            raise ValueError(f"{file_path}: imports need the whole module and cannot be streamed")
+        yield from parser.parse_declarations()
+    finally:
+        if isinstance(source, mmap.mmap):
+            source.close()
@@ -3,27 +3,99 @@ from .lexer import TokenType
 
 
 class ASTNode:
-    pass
+    # _fields are the syntactic children of a node; any other slots hold
+    # annotations that passes attach to it.
+    _fields = ()
+    __slots__ = ()
+
+
+def iter_fields(node: ASTNode):
+    for name in node._fields:
+        yield name, getattr(node, name)
 
 
 class Module(ASTNode):
-    def __init__(self, functions: List['FunctionDeclaration']):
+    _fields = ('imports', 'structs', 'functions', 'exports')
+    __slots__ = _fields + ('function_table',)
+
+    # exports is None when the module has no export statement.
+    def __init__(self, functions: List['FunctionDeclaration'], imports: Optional[List['ImportStatement']] = None, exports: Optional[List[str]] = None, structs: Optional[List['StructDeclaration']] = None):
+        self.imports = imports if imports is not None else []
+        self.structs = structs if structs is not None else []
         self.functions = functions
+        self.exports = exports
+        self.function_table: Optional[List['FunctionDeclaration']] = None
+
+    def __repr__(self):
+        lines = list(map(lambda i: str(i), self.imports)) + list(map(lambda s: str(s), self.structs))
+        lines += list(map(lambda f: str(f), self.functions))
+        if self.exports is not None:
+            lines.append(f"export {{ {', '.join(self.exports)} }}")
+        return "\n".join(lines)
+
+
+class ImportStatement(ASTNode):
+    _fields = ('path', 'names')
+    __slots__ = _fields
+
+    # names holds (exported name, local name) pairs, or None to import
+    # everything the module exports under its own name.
+    def __init__(self, path: str, names: Optional[List[tuple[str, str]]] = None):
+        self.path = path
+        self.names = names
+
+    def __repr__(self):
+        if self.names is None:
+            return f'import "{self.path}"'
+        names = ', '.join(name if name == local_name else f"{name} as {local_name}" for name, local_name in self.names)
+        return f'import "{self.path}" with {{ {names} }}'
+
+
+class StructDeclaration(ASTNode):
+    _fields = ('name', 'fields')
+    __slots__ = _fields
+
+    def __init__(self, name: str, fields: List['FieldDeclaration']):
+        self.name = name
+        self.fields = fields
 
     def __repr__(self):
-        return "\n".join(map(lambda f: str(f), self.functions))
+        return f"struct {self.name} {{ {', '.join(map(str, self.fields))} }}"
+
+
+class FieldDeclaration(ASTNode):
+    _fields = ('identifier', 'type')
+    __slots__ = _fields
+
+    def __init__(self, identifier: 'Identifier', type: 'AccessibleTypeExpression'):
+        self.identifier = identifier
+        self.type = type
+
+    def __repr__(self):
+        return f"{self.identifier.name}: {self.type}"
 
 
 class FunctionDeclaration(ASTNode):
-    def low_level_func_name(self):
+    _fields = ('name', 'arguments', 'return_type', 'body')
+    __slots__ = _fields + ('memo_capacity', 'fast_math', 'local_count', 'instrumented', 'profile')
+
+    def low_level_func_name(self, name: Optional[str] = None):
         labels = '-'.join(map(lambda x: x.identifier.name, self.arguments))
-        return f"{self.name}_{labels}"
+        return f"{name or self.name}_{labels}"
 
     def __init__(self, name: str, arguments: list['Argument'], return_type: Optional['AccessibleTypeExpression'], body: 'Block'):
         self.name = name
         self.arguments = arguments
         self.return_type = return_type
         self.body = body
+        self.memo_capacity: Optional[int] = None
+        self.fast_math = False
+        # Arguments plus the variables loops bind; set by the resolver.
+        self.local_count: Optional[int] = None
+        # Whether generated code counts its calls and branches, and the counts
+        # a profiled run recorded, for profile-guided optimization.
+        self.instrumented = False
+        self.profile = None
 
     def __repr__(self):
         return f"""
@@ -35,19 +107,58 @@ body: ({self.body})
 
 
 class Argument(ASTNode):
+    _fields = ('identifier', 'type')
+    __slots__ = _fields
+
     def __init__(self, identifier: 'Identifier', type: 'AccessibleTypeExpression'):
         self.identifier = identifier
         self.type = type
 
+    def __repr__(self):
+        return f"{self.identifier.name}: {self.type}"
+
 
 class IfExpression(ASTNode):
-    def __init__(self, condition, true_block, false_block):
+    _fields = ('condition', 'true_block', 'false_block')
+    __slots__ = _fields + ('value_type',)
+
+    def __init__(self, condition: ASTNode, true_block: 'Block', false_block: Optional[ASTNode]):
         self.condition = condition
         self.true_block = true_block
         self.false_block = false_block
+        self.value_type: Optional[str] = None
+
+    def __repr__(self):
+        return f"(if {self.condition} {self.true_block} else {self.false_block})"
+
+
+class ForExpression(ASTNode):
+    _fields = ('variable', 'range', 'accumulator', 'initial', 'body')
+    __slots__ = _fields + ('variable_slot', 'accumulator_slot', 'value_type')
+
+    # range is a BinaryExpression with a range operator. A loop with an
+    # accumulator folds over the range: the accumulator starts as initial, the
+    # body's value becomes its next value and the last one is the loop's.
+    # Without one the body only runs for its effects.
+    def __init__(self, variable: 'Identifier', range: ASTNode, accumulator: Optional['Identifier'], initial: Optional[ASTNode], body: 'Block'):
+        self.variable = variable
+        self.range = range
+        self.accumulator = accumulator
+        self.initial = initial
+        self.body = body
+        self.variable_slot: Optional[int] = None
+        self.accumulator_slot: Optional[int] = None
+        self.value_type: Optional[str] = None
+
+    def __repr__(self):
+        accumulator = "" if self.accumulator is None else f" with {self.accumulator.name} = {self.initial}"
+        return f"(for {self.variable.name} in {self.range}{accumulator} {self.body})"
 
 
 class FunctionCallExpression(ASTNode):
+    _fields = ('function_name', 'arguments', 'children')
+    __slots__ = _fields + ('slot', 'value_type')
+
     def low_level_func_name(self):
         labels = '-'.join(map(lambda x: x[0], self.arguments))
         return f"{self.function_name}_{labels}"
@@ -56,6 +167,8 @@ class FunctionCallExpression(ASTNode):
         self.function_name = function_name
         self.arguments = arguments
         self.children = children
+        self.slot: Optional[int] = None
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
         return f"""
@@ -65,29 +178,75 @@ children: {self.children}
 """
 
 
+# <Point x={1} y={2} /> builds a struct; fields holds (name, value) pairs in
+# the order the struct declares them.
+class StructExpression(ASTNode):
+    _fields = ('type_name', 'fields')
+    __slots__ = _fields + ('declaration', 'value_type')
+
+    def __init__(self, type_name: str, fields: list[tuple[str, ASTNode]]):
+        self.type_name = type_name
+        self.fields = fields
+        self.declaration: Optional[StructDeclaration] = None
+        self.value_type: Optional[str] = None
+
+    def __repr__(self):
+        fields = ' '.join(f"{name}={{{value}}}" for name, value in self.fields)
+        return f"<{self.type_name} {fields} />"
+
+
+class MemberAccessExpression(ASTNode):
+    _fields = ('expression', 'member')
+    __slots__ = _fields + ('declaration', 'index', 'value_type')
+
+    # declaration is the struct expression evaluates to and index the
+    # position of member among its fields; both are set by the type checker.
+    def __init__(self, expression: ASTNode, member: str):
+        self.expression = expression
+        self.member = member
+        self.declaration: Optional[StructDeclaration] = None
+        self.index: Optional[int] = None
+        self.value_type: Optional[str] = None
+
+    def __repr__(self):
+        return f"{self.expression}.{self.member}"
+
+
 class BinaryExpression(ASTNode):
+    _fields = ('left', 'operator', 'right')
+    __slots__ = _fields + ('value_type',)
+
     def __init__(self, left: ASTNode, operator, right: ASTNode):
         self.left = left
         self.operator = operator
         self.right = right
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
         return f"({self.left} {self.operator} {self.right})"
 
 
 class UnaryExpression(ASTNode):
+    _fields = ('operator', 'expression')
+    __slots__ = _fields + ('value_type',)
+
     def __init__(self, operator, expression):
         self.operator = operator
         self.expression = expression
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
         return f"({self.operator}{self.expression})"
 
 
 class Block(ASTNode):
+    _fields = ('statements', 'return_expression')
+    __slots__ = _fields + ('value_type',)
+
     def __init__(self, statements: List[ASTNode], return_expression: Optional[ASTNode]):
         self.statements = statements
         self.return_expression = return_expression
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
         return f"""
@@ -97,29 +256,49 @@ return_expression: {self.return_expression})
 
 
 class IdentifierExpression(ASTNode):
+    _fields = ('name',)
+    __slots__ = _fields + ('slot', 'value_type')
+
     def __init__(self, name):
         self.name = name
+        self.slot: Optional[int] = None
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
         return f"({self.name})"
 
 
 class LiteralExpression(ASTNode):
+    _fields = ('value', 'literal_type')
+    __slots__ = _fields + ('value_type',)
+
     def __init__(self, value: int | float | bool, literal_type: TokenType):
         self.value = value
         self.literal_type = literal_type
+        self.value_type: Optional[str] = None
 
     def __repr__(self):
-        return f"{self.literal_type}({self.value})"
+        return f"{self.literal_type.name}({self.value})"
 
 
 class AccessibleTypeExpression(ASTNode):
+    _fields = ('name', 'child')
+    __slots__ = _fields + ('declaration',)
+
     def __init__(self, name: str, child: Optional['AccessibleTypeExpression']):
         self.name = name
         self.child = child
+        # The struct the type names; set by the resolver, None for scalars.
+        self.declaration: Optional[StructDeclaration] = None
+
+    def __repr__(self) -> str:
+        return self.name if self.child is None else f"{self.name}.{self.child}"
 
 
 class TypeExpression(ASTNode):
+    _fields = ('name',)
+    __slots__ = _fields
+
     def __init__(self, name: str):
         self.name = name
 
@@ -128,6 +307,9 @@ class TypeExpression(ASTNode):
 
 
 class Identifier(ASTNode):
+    _fields = ('name',)
+    __slots__ = _fields
+
     def __init__(self, name: str):
         self.name = name
 
@@ -1,63 +1,191 @@
-from typing import Any, Generator, Optional, Callable
+from typing import Any, Generator, Optional
 from .ast_nodes import *
-from .lexer import Token, TokenType
+from .lexer import Token, TokenStream, TokenType
+
+
+binary_precedences = {
+    '||': 1,
+    '&&': 2,
+    '==': 3, '!=': 3,
+    '<': 4, '<=': 4, '>': 4, '>=': 4,
+    '...': 5, '..<': 5,
+    '+': 6, '-': 6,
+    '*': 7, '/': 7, '%': 7,
+}
 
 
 class Parser:
-    def __init__(self, source_code: str, tokens: Generator[Token, None, None]):
+    def __init__(self, source_code: str, tokens: TokenStream):
         self.source_code = source_code
         self.tokens = tokens
-        self.current_token: Optional[Token] = None
+        self.kinds = tokens.kinds
+        self.starts = tokens.starts
+        self.ends = tokens.ends
+        self.source = tokens.source
+        self.index = -1
+        self.token_type: Optional[int] = None
+        self.token_value: Optional[str] = None
         self.next()
 
+    @property
+    def current_token(self) -> Optional[Token]:
+        if self.token_type is None:
+            return None
+        return self.tokens.token(self.index)
+
     def next(self):
-        try:
-            self.current_token = next(self.tokens)
-        except StopIteration:
-            self.current_token = None
-        return self.current_token
+        self.index += 1
+        if self.index >= len(self.kinds) and not self.tokens.fill():
+            self.token_type = None
+            self.token_value = None
+            return None
+
+        i = self.index
+        self.token_type = self.kinds[i]
+        self.token_value = self.source[self.starts[i]:self.ends[i]].decode("utf-8")
+        return self.token_value
 
     def parse(self) -> Module:
-        functions: list[FunctionDeclaration] = []
+        imports = self.parse_imports()
+        structs = []
+        functions = []
+        for declaration in self.parse_declarations():
+            (structs if isinstance(declaration, StructDeclaration) else functions).append(declaration)
+        exports = None
+        if self.match(TokenType.KEYWORD, 'export'):
+            exports = self.export_statement()
+            self.skip_newlines()
+        if self.token_type is not None:
+            raise SyntaxError(f"Unexpected token: {self.current_token}")
+        return Module(functions, imports, exports, structs)
+
+    def parse_imports(self) -> list[ImportStatement]:
+        imports = []
+        self.skip_newlines()
+        while self.match(TokenType.KEYWORD, 'import'):
+            imports.append(self.import_statement())
+            self.skip_newlines()
+        return imports
+
+    def parse_declarations(self) -> Generator[FunctionDeclaration | StructDeclaration, None, None]:
         while True:
             self.skip_newlines()
             if self.match(TokenType.KEYWORD, 'fn'):
-                functions.append(self.function_declaration())
+                declaration = self.function_declaration()
+            elif self.match(TokenType.KEYWORD, 'struct'):
+                declaration = self.structure_declaration()
             else:
                 break
-            self.expect(TokenType.NEWLINE)
-        return Module(functions)
+            # The last declaration may end the file without a line break.
+            if self.token_type is not None:
+                self.expect(TokenType.NEWLINE)
+            self.index -= self.tokens.discard(self.index)
+            yield declaration
 
     def program(self):
         # Implement program rule
         pass
 
-    def import_statement(self):
-        # Implement import_statement rule
-        pass
+    def import_statement(self) -> ImportStatement:
+        self.expect(TokenType.KEYWORD, 'import')
+        path = self.expect(TokenType.STRING_LITERAL)[1:-1]
 
-    def structure_declaration(self):
-        # Implement structure_declaration rule
-        pass
+        names = None
+        if self.match(TokenType.KEYWORD, 'with'):
+            self.next()
+            self.expect(TokenType.SYMBOL, '{')
+            self.skip_newlines()
+            names = []
+            while not self.match(TokenType.SYMBOL, '}'):
+                name = self.entity_name()
+                local_name = name
+                if self.match(TokenType.KEYWORD, 'as'):
+                    self.next()
+                    local_name = self.entity_name()
+                names.append((name, local_name))
+                if not self.match(TokenType.SYMBOL, ','):
+                    break
+                self.next()
+                self.skip_newlines()
+            self.skip_newlines()
+            self.expect(TokenType.SYMBOL, '}')
+        elif self.match(TokenType.KEYWORD, 'as'):
+            raise SyntaxError(f"Module aliases are not supported yet: {self.current_token}")
+
+        self.expect(TokenType.NEWLINE)
+        return ImportStatement(path, names)
+
+    # Only functions can be imported and exported so far, but the grammar
+    # also allows type names.
+    def entity_name(self) -> str:
+        if self.match(TokenType.TYPE_EXPRESSION):
+            return self.expect(TokenType.TYPE_EXPRESSION)
+        return self.expect(TokenType.IDENTIFIER)
+
+    # Structs only have fields so far: no type parameters, conformances,
+    # methods, initializers, static members or default values.
+    def structure_declaration(self) -> StructDeclaration:
+        self.expect(TokenType.KEYWORD, 'struct')
+        name = self.expect(TokenType.TYPE_EXPRESSION)
+        if not self.match(TokenType.SYMBOL, '{'):
+            raise SyntaxError(f"Generic structs and conformances are not supported yet: {self.current_token}")
+        self.next()
+        self.skip_newlines()
 
-    def function_call_expression(self) -> FunctionCallExpression:
-        self.expect(TokenType.SYMBOL, "<")
-        function_name = self.expect(TokenType.IDENTIFIER).value
+        fields = []
+        while not self.match(TokenType.SYMBOL, '}'):
+            fields.append(self.field_declaration())
+            self.skip_newlines()
+        self.expect(TokenType.SYMBOL, '}')
+        return StructDeclaration(name, fields)
+
+    # Every field is visible and, as nothing can be assigned yet, pub and var
+    # make no difference.
+    def field_declaration(self) -> FieldDeclaration:
+        if self.match(TokenType.KEYWORD, 'pub'):
+            self.next()
+        if not (self.match(TokenType.KEYWORD, 'const') or self.match(TokenType.KEYWORD, 'var')):
+            raise SyntaxError(f"Only fields are supported in structs so far: {self.current_token}")
+        self.next()
+
+        identifier = Identifier(self.expect(TokenType.IDENTIFIER))
+        self.expect(TokenType.SYMBOL, ':')
+        type_expression = self.accessible_type_expression()
+        if self.match(TokenType.OPERATOR, '='):
+            raise SyntaxError(f"Default values of fields are not supported yet: {self.current_token}")
+        if not self.match(TokenType.SYMBOL, '}'):
+            self.expect(TokenType.NEWLINE)
+        return FieldDeclaration(identifier, type_expression)
 
-        arguments: list[tuple[str, ASTNode]] = []
+    def attribute_list(self) -> list[tuple[str, ASTNode]]:
+        attributes: list[tuple[str, ASTNode]] = []
         while not self.match(TokenType.SYMBOL, "/>") and not self.match(TokenType.SYMBOL, ">"):
-            arg_name = self.expect(TokenType.IDENTIFIER).value
+            name = self.expect(TokenType.IDENTIFIER)
             self.expect(TokenType.OPERATOR, "=")
 
             # if self.match(TokenType.STRING_LITERAL):
-            #     arg_value = self.parse_string_literal()
+            #     value = self.parse_string_literal()
             # else:
             self.expect(TokenType.SYMBOL, "{")
             self.skip_newlines()
-            arg_value = self.expression()
+            value = self.expression()
             self.skip_newlines()
             self.expect(TokenType.SYMBOL, "}")
-            arguments.append((arg_name, arg_value))
+            attributes.append((name, value))
+        return attributes
+
+    # A call whose name is a type builds a struct of that type from its
+    # attributes instead.
+    def function_call_expression(self) -> FunctionCallExpression | StructExpression:
+        self.expect(TokenType.SYMBOL, "<")
+        if self.match(TokenType.TYPE_EXPRESSION):
+            type_name = self.expect(TokenType.TYPE_EXPRESSION)
+            fields = self.attribute_list()
+            self.expect(TokenType.SYMBOL, "/>")
+            return StructExpression(type_name, fields)
+
+        function_name = self.expect(TokenType.IDENTIFIER)
+        arguments = self.attribute_list()
 
         children = None
         if self.match(TokenType.SYMBOL, "/>"):
@@ -81,11 +209,42 @@ class Parser:
 
         return FunctionCallExpression(function_name, arguments, children)
 
+    def if_expression(self) -> IfExpression:
+        self.expect(TokenType.KEYWORD, "if")
+        condition = self.expression()
+        true_block = self.block()
+
+        false_block = None
+        if self.match(TokenType.KEYWORD, "else"):
+            self.next()
+            if self.match(TokenType.KEYWORD, "if"):
+                false_block = self.if_expression()
+            else:
+                false_block = self.block()
+
+        return IfExpression(condition, true_block, false_block)
+
+    def for_expression(self) -> ForExpression:
+        self.expect(TokenType.KEYWORD, "for")
+        variable = Identifier(self.expect(TokenType.IDENTIFIER))
+        self.expect(TokenType.KEYWORD, "in")
+        range = self.expression()
+
+        accumulator = None
+        initial = None
+        if self.match(TokenType.KEYWORD, "with"):
+            self.next()
+            accumulator = Identifier(self.expect(TokenType.IDENTIFIER))
+            self.expect(TokenType.OPERATOR, "=")
+            initial = self.expression()
+
+        return ForExpression(variable, range, accumulator, initial, self.block())
+
     def function_declaration(self) -> FunctionDeclaration:
         self.expect(TokenType.KEYWORD, 'fn')
         name = self.expect(TokenType.IDENTIFIER)
         [arguments, return_type, block] = self.function_after_identifier()
-        return FunctionDeclaration(name.value, arguments, return_type, block)
+        return FunctionDeclaration(name, arguments, return_type, block)
 
     def function_after_identifier(self):
         self.expect(TokenType.SYMBOL, '(')
@@ -143,7 +302,7 @@ class Parser:
         return arguments
 
     def argument(self):
-        identifier = Identifier(self.expect(TokenType.IDENTIFIER).value)
+        identifier = Identifier(self.expect(TokenType.IDENTIFIER))
         self.expect(TokenType.SYMBOL, ":")
         type_expression = self.accessible_type_expression()
         return Argument(identifier, type_expression)
@@ -154,97 +313,113 @@ class Parser:
         if self.match(TokenType.SYMBOL, "."):
             self.next()
             child = self.accessible_type_expression()
-        return AccessibleTypeExpression(name.value, child)
+        return AccessibleTypeExpression(name, child)
 
-    def export_statement(self):
-        # Implement export_statement rule
-        pass
+    def export_statement(self) -> list[str]:
+        self.expect(TokenType.KEYWORD, 'export')
+        self.expect(TokenType.SYMBOL, '{')
+        self.skip_newlines()
+        names = []
+        while not self.match(TokenType.SYMBOL, '}'):
+            names.append(self.entity_name())
+            if not self.match(TokenType.SYMBOL, ','):
+                break
+            self.next()
+            self.skip_newlines()
+        self.skip_newlines()
+        self.expect(TokenType.SYMBOL, '}')
+        if self.token_type is not None:
+            self.expect(TokenType.NEWLINE)
+        return names
 
     def type_expression(self):
         # Implement type_expression rule
         pass
 
-    def expression(self):
-        return self.or_expression()
+    def expression(self, min_precedence: int = 1) -> ASTNode:
+        # Precedence climbing over binary_precedences; every level is left-associative.
+        left = self.unary_expression()
 
-    def or_expression(self):
-        return self.binary_expression(self.and_expression, '||')
-
-    def and_expression(self):
-        return self.binary_expression(self.equality_expression, '&&')
-
-    def equality_expression(self):
-        return self.binary_expression(self.relational_expression, '==', '!=')
-
-    def relational_expression(self):
-        return self.binary_expression(self.range_expression, '<', '<=', '>', '>=')
-
-    def range_expression(self):
-        return self.binary_expression(self.additive_expression, '...', '..<')
-
-    def additive_expression(self):
-        return self.binary_expression(self.multiplicative_expression, '+', '-')
-
-    def multiplicative_expression(self):
-        return self.binary_expression(self.unary_expression, '*', '/', '%')
-
-    def binary_expression(self, next_expression_fn: Callable[[], ASTNode], *ops: str):
-        left = next_expression_fn()
-
-        while self.current_token and self.current_token.type == TokenType.OPERATOR and self.current_token.value in ops:
-            op = self.current_token.value
+        # '<' and '>' are lexed as symbols because they also delimit calls, but
+        # right after an operand they can only be comparisons.
+        while self.token_type == TokenType.OPERATOR or (self.token_type == TokenType.SYMBOL and self.token_value in ('<', '>')):
+            precedence = binary_precedences.get(self.token_value, 0)
+            if precedence < min_precedence:
+                break
+            op = self.token_value
             self.next()
             self.skip_newlines()
-            right = next_expression_fn()
+            right = self.expression(precedence + 1)
             left = BinaryExpression(left, op, right)
 
         return left
 
     def unary_expression(self) -> ASTNode:
-        if self.current_token and self.current_token.type == TokenType.OPERATOR and self.current_token.value in ['!', '-']:
-            op = self.current_token.value
+        if self.token_type == TokenType.OPERATOR and self.token_value in ['!', '-']:
+            op = self.token_value
             self.next()
             return UnaryExpression(op, self.primary_expression())
         else:
             return self.primary_expression()
 
     def primary_expression(self) -> ASTNode:
-        if self.current_token.type == TokenType.IDENTIFIER:
-            name = self.current_token.value
+        expression = self.operand_expression()
+        while self.match(TokenType.SYMBOL, "."):
+            self.next()
+            expression = MemberAccessExpression(expression, self.expect(TokenType.IDENTIFIER))
+        return expression
+
+    def operand_expression(self) -> ASTNode:
+        if self.token_type == TokenType.IDENTIFIER:
+            name = self.token_value
             self.next()
             return IdentifierExpression(name)
         elif self.match(TokenType.SYMBOL, "<"):
             return self.function_call_expression()
-        elif self.current_token.type in [TokenType.INTEGER_LITERAL, TokenType.FLOAT_LITERAL, TokenType.BOOLEAN_LITERAL]:
-            literal_type = self.current_token.type
+        elif self.match(TokenType.KEYWORD, "if"):
+            return self.if_expression()
+        elif self.match(TokenType.KEYWORD, "for"):
+            return self.for_expression()
+        elif self.match(TokenType.SYMBOL, "("):
+            self.next()
+            self.skip_newlines()
+            expression = self.expression()
+            self.skip_newlines()
+            self.expect(TokenType.SYMBOL, ")")
+            return expression
+        elif self.token_type in [TokenType.INTEGER_LITERAL, TokenType.FLOAT_LITERAL, TokenType.BOOLEAN_LITERAL]:
+            literal_type = TokenType(self.token_type)
             if literal_type == TokenType.INTEGER_LITERAL:
-                value = int(self.current_token.value)
+                value = int(self.token_value)
             elif literal_type == TokenType.FLOAT_LITERAL:
-                value = float(self.current_token.value)
+                value = float(self.token_value)
             elif literal_type == TokenType.BOOLEAN_LITERAL:
-                value = self.current_token.value == 'true'
+                value = self.token_value == 'true'
             self.next()
             return LiteralExpression(value, literal_type)
         else:
             raise SyntaxError(f"Unexpected token: {self.current_token}")
 
     def skip_newlines(self):
-        while self.current_token and self.current_token.type == TokenType.NEWLINE:
+        while self.token_type == TokenType.NEWLINE:
             self.next()
 
-    def expect(self, token_type: TokenType, value: Optional[str] = None) -> Token:
+    def expect(self, token_type: TokenType, value: Optional[str] = None) -> str:
         if self.match(token_type, value):
-            token = self.current_token
+            token_value = self.token_value
             self.next()
-            return token
+            return token_value
         else:
-            error_line = self.source_code.split(
-                '\n')[self.current_token.line - 1]
+            token = self.current_token
+            if token is None:
+                raise SyntaxError(
+                    f"Expected {token_type.name} with value '{value}', but reached the end of {self.tokens.file_path}")
+            error_line = self.tokens.line_text(token.line)
             raise SyntaxError(
-                f"Expected {token_type} with value '{value}', but got {self.current_token.type} with value '{self.current_token.value}'\n"
-                f"at {self.current_token.file_path}, line {self.current_token.line}, column {self.current_token.column}\n"
+                f"Expected {token_type.name} with value '{value}', but got {token.type.name} with value '{token.value}'\n"
+                f"at {token.file_path}, line {token.line}, column {token.column}\n"
                 f"{error_line}\n"
-                f"{' ' * (self.current_token.column - 1)}^")
+                f"{' ' * (token.column - 1)}^")
 
     def match(self, token_type: TokenType, value: Optional[str] = None):
-        return self.current_token != None and self.current_token.type == token_type and (value is None or self.current_token.value == value)
+        return self.token_type == token_type and (value is None or self.token_value == value)
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Dict, Iterator, List
+from .ast_nodes import *
+
+
+def _encode(value, out: List[str]) -> None:
+    if isinstance(value, ASTNode):
+        out.append(type(value).__name__)
+        out.append("(")
+        for name, child in iter_fields(value):
+            out.append(name)
+            _encode(child, out)
+        out.append(")")
+    elif isinstance(value, (list, tuple)):
+        out.append("[")
+        for child in value:
+            _encode(child, out)
+        out.append("]")
+    else:
+        out.append(repr(value))
+
+
+def iter_function_calls(node) -> Iterator[FunctionCallExpression]:
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, FunctionCallExpression):
+            yield value
+        if isinstance(value, ASTNode):
+            stack.extend(child for _, child in iter_fields(value))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+def iter_struct_expressions(node) -> Iterator[StructExpression]:
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, StructExpression):
+            yield value
+        if isinstance(value, ASTNode):
+            stack.extend(child for _, child in iter_fields(value))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+# The resolved structs whose layout code generated for node depends on: the
+# ones the signatures of the function and its callees and its struct
+# expressions name, and the ones their fields hold.
+def struct_dependencies(node: FunctionDeclaration, callees: List[FunctionDeclaration]) -> List[StructDeclaration]:
+    types = []
+    for function in [node] + callees:
+        types.append(function.return_type)
+        types.extend(argument.type for argument in function.arguments)
+    stack = [t.declaration for t in types if t is not None]
+    stack.extend(expression.declaration for expression in iter_struct_expressions(node.body))
+
+    structs = {}
+    while stack:
+        declaration = stack.pop()
+        if declaration is None or declaration.name in structs:
+            continue
+        structs[declaration.name] = declaration
+        stack.extend(field.type.declaration for field in declaration.fields)
+    return [structs[name] for name in sorted(structs)]
+
+
+def function_signature(node: FunctionDeclaration) -> str:
+    out: List[str] = [node.low_level_func_name()]
+    _encode([arg.type for arg in node.arguments], out)
+    _encode(node.return_type, out)
+    return "".join(out)
+
+
+def function_fingerprint(node: FunctionDeclaration, declarations: Dict[str, FunctionDeclaration], salt: str = "") -> str:
+    out: List[str] = [salt]
+    _encode(node, out)
+
+    # Callers only depend on the signatures of their callees, so a change
+    # to a callee's body does not invalidate them.
+    callees = sorted({call.low_level_func_name() for call in iter_function_calls(node.body)})
+    for callee in callees:
+        declaration = declarations.get(callee)
+        out.append(callee)
+        out.append(function_signature(declaration) if declaration is not None else "?")
+
+    # Nor does anything about the structs it uses but their fields.
+    known = [declarations[callee] for callee in callees if callee in declarations]
+    for struct in struct_dependencies(node, known):
+        _encode(struct, out)
+
+    return hashlib.sha256("\0".join(out).encode("utf-8")).hexdigest()
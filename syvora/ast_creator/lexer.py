@@ -1,9 +1,11 @@
 import re
-from enum import Enum, auto
-from typing import NamedTuple, Any
+from array import array
+from bisect import bisect_right
+from enum import IntEnum, auto
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     KEYWORD = auto()
     TYPE_EXPRESSION = auto()
     IDENTIFIER = auto()
@@ -30,40 +32,191 @@ class Token:
         return f"{self.type.name}({self.value}) at {self.file_path}, line {self.line}, column {self.column}"
 
 
+class FileTable:
+    def __init__(self):
+        self.paths: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def add(self, path: str) -> int:
+        file_id = self.ids.get(path)
+        if file_id is None:
+            file_id = len(self.paths)
+            self.paths.append(path)
+            self.ids[path] = file_id
+        return file_id
+
+    def path(self, file_id: int) -> str:
+        return self.paths[file_id]
+
+
+file_table = FileTable()
+
+
 token_types = [
-    (TokenType.KEYWORD.name,
-     r'\b(?:import|as|struct|pub|const|var|fn|export|return|if|else|throws|async)\b'),
-    (TokenType.TYPE_EXPRESSION.name, r'[A-Z][a-zA-Z0-9]*'),
-    (TokenType.IDENTIFIER.name, r'[a-z][a-zA-Z0-9]*'),
-    (TokenType.FLOAT_LITERAL.name, r'\d+\.\d+'),
-    (TokenType.INTEGER_LITERAL.name, r'\d+'),
-    (TokenType.STRING_LITERAL.name, r'"(?:[^"\\]|\\.)*"'),
-    (TokenType.BOOLEAN_LITERAL.name, r'\b(?:true|false)\b'),
-    (TokenType.WHITESPACE.name, r'[ \t]+'),
-    (TokenType.NEWLINE.name, r'\n'),
-    (TokenType.COMMENT.name, r'(?:\/\/[^\n]*|\/\*(?:.|\n)*?\*\/)'),
-    (TokenType.SYMBOL.name, r'(?:->|/>|</)|[{}()\[\],.:;<>]'),
-    (TokenType.OPERATOR.name,
-     r'[+\-*/%^!=<>&|]|(?:\.\.<|==|!=|<=|>=|&&|\|\||\.\.\.)'),
+    (TokenType.KEYWORD,
+     rb'\b(?:import|with|as|struct|pub|const|var|fn|export|return|if|else|for|in|throws|async)\b'),
+    (TokenType.BOOLEAN_LITERAL, rb'\b(?:true|false)\b'),
+    (TokenType.TYPE_EXPRESSION, rb'[A-Z][a-zA-Z0-9]*'),
+    (TokenType.IDENTIFIER, rb'[a-z][a-zA-Z0-9]*'),
+    (TokenType.FLOAT_LITERAL, rb'\d+\.\d+'),
+    (TokenType.INTEGER_LITERAL, rb'\d+'),
+    (TokenType.STRING_LITERAL, rb'"(?:[^"\\]|\\.)*"'),
+    (TokenType.NEWLINE, rb'\n'),
+    # Start of a block comment or string whose end has not been read yet.
+    (None, rb'/(?=\*)|"'),
+    # Multi-character operators have to win over the symbols they start with.
+    (TokenType.OPERATOR, rb'\.\.<|\.\.\.|==|!=|<=|>=|&&|\|\|'),
+    (TokenType.SYMBOL, rb'(?:->|/>|</)|[{}()\[\],.:;<>]'),
+    (TokenType.OPERATOR, rb'[+\-*/%^!=&|]'),
 ]
 
-pattern = '|'.join('(?P<%s>%s)' % pair for pair in token_types)
+# Whitespace and comments never reach the parser, so they are consumed as a
+# prefix of the following token instead of being matched on their own. The
+# token is optional so that trivia at the end of the source still matches as
+# a whole rather than being backtracked into.
+trivia = rb'(?:[ \t]+|//[^\n]*|/\*[\s\S]*?\*/)*'
+
+pattern = trivia + b'(?:' + b'|'.join(b'(%s)' % regex for _, regex in token_types) + b')?'
 token_regex = re.compile(pattern)
 
+# Maps a capture group index to its token kind; 0 marks an incomplete token.
+group_kinds = [0] + [0 if token_type is None else int(token_type) for token_type, _ in token_types]
+token_types_by_kind = [None] + list(TokenType)
+
+DEFAULT_WINDOW_SIZE = 1 << 20
+
+
+class TokenStream:
+    def __init__(self, source: bytes, file_id: int, files: FileTable = file_table):
+        self.source = source
+        self.file_id = file_id
+        self.files = files
+        self.kinds = array('B')
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self._line_starts: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self.kinds)):
+            yield self.token(i)
+
+    @property
+    def file_path(self) -> str:
+        return self.files.path(self.file_id)
+
+    # Scans source[start:end] and returns the offset scanning stopped at. Unless
+    # this is the final chunk, scanning stops in front of a block comment or
+    # string that is not terminated before `end`.
+    def scan(self, start: int = 0, end: Optional[int] = None, final: bool = True) -> int:
+        kinds_append = self.kinds.append
+        starts_append = self.starts.append
+        ends_append = self.ends.append
+        end = len(self.source) if end is None else end
+
+        for m in token_regex.finditer(self.source, start, end):
+            group = m.lastindex
+            if group is None:
+                continue
+            kind = group_kinds[group]
+            token_start, token_end = m.span(group)
+            if not kind:
+                if not final:
+                    return token_start
+                elif self.source[token_start:token_end] == b'"':
+                    continue
+                kind = TokenType.OPERATOR
+            kinds_append(kind)
+            starts_append(token_start)
+            ends_append(token_end)
+
+        return end
+
+    def fill(self) -> bool:
+        # In-memory streams are scanned up front; there is never anything to add.
+        return False
+
+    # Drops the first `count` tokens once the parser no longer needs them and
+    # returns how many were dropped.
+    def discard(self, count: int) -> int:
+        return 0
+
+    def type(self, i: int) -> TokenType:
+        return token_types_by_kind[self.kinds[i]]
+
+    def value(self, i: int) -> str:
+        return self.source[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    @property
+    def line_starts(self) -> array:
+        if self._line_starts is None:
+            line_starts = array('Q', [0])
+            line_starts.extend(m.end() for m in re.finditer(b'\n', self.source))
+            self._line_starts = line_starts
+        return self._line_starts
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        line = bisect_right(self.line_starts, offset)
+        line_start = self.line_starts[line - 1]
+        column = len(self.source[line_start:offset].decode("utf-8", "replace")) + 1
+        return line, column
+
+    def line_text(self, line: int) -> str:
+        line_start = self.line_starts[line - 1]
+        line_end = self.source.find(b'\n', line_start)
+        if line_end < 0:
+            line_end = len(self.source)
+        return self.source[line_start:line_end].decode("utf-8", "replace")
+
+    def token(self, i: int) -> Token:
+        line, column = self.position(self.starts[i])
+        return Token(self.type(i), self.value(i), line, column, self.file_path)
+
+
+class StreamingTokenStream(TokenStream):
+    def __init__(self, source, file_id: int, files: FileTable = file_table, window_size: int = DEFAULT_WINDOW_SIZE):
+        super().__init__(source, file_id, files)
+        self.window_size = window_size
+        self.offset = 0
+
+    def fill(self) -> bool:
+        source_size = len(self.source)
+        window_size = self.window_size
+        count = len(self.kinds)
+
+        while self.offset < source_size and len(self.kinds) == count:
+            end = min(self.offset + window_size, source_size)
+            final = end == source_size
+            if not final:
+                # Only cut at a line break so that no token straddles windows.
+                newline = self.source.rfind(b'\n', self.offset, end)
+                if newline < 0:
+                    window_size *= 2
+                    continue
+                end = newline + 1
+
+            stop = self.scan(self.offset, end, final)
+            if stop == self.offset and not final:
+                # A single comment or string is larger than the window.
+                window_size *= 2
+                continue
+            self.offset = stop
+
+        return len(self.kinds) > count
 
-def tokenize(source_code: str, file_path: str):
-    line_num = 1
-    col_num = 1
+    def discard(self, count: int) -> int:
+        del self.kinds[:count]
+        del self.starts[:count]
+        del self.ends[:count]
+        return count
 
-    for m in re.finditer(token_regex, source_code):
-        token_type = TokenType[m.lastgroup]
-        token_value = m.group(token_type.name)
 
-        if token_type == TokenType.WHITESPACE or token_type == TokenType.COMMENT:
-            pass
-        else:
-            yield Token(token_type, token_value, line_num, col_num, file_path)
+def tokenize(source_code: Union[str, bytes], file_path: str, files: FileTable = file_table) -> TokenStream:
+    if isinstance(source_code, str):
+        source_code = source_code.encode("utf-8")
 
-        col_num += len(token_value)
-        line_num += token_value.count('\n')
-        col_num = 1 if '\n' in token_value else col_num
+    tokens = TokenStream(source_code, files.add(file_path), files)
+    tokens.scan()
+    return tokens
@@ -0,0 +1,161 @@
+import inspect
+import marshal
+import struct
+from array import array
+from typing import List, Optional
+from syvora import __version__
+from .ast_nodes import *
+from .lexer import TokenType
+
+
+MAGIC = b"SYAT"
+# Bump whenever a node class gains, loses or reorders a field.
+FORMAT_VERSION = 3
+# magic, format version, instruction typecode, length of the syvora version,
+# length of the constants
+HEADER = struct.Struct("<4sHcHI")
+
+NODE_TYPES = [
+    Module, ImportStatement, FunctionDeclaration, Argument, IfExpression, FunctionCallExpression,
+    BinaryExpression, UnaryExpression, Block, IdentifierExpression, LiteralExpression,
+    AccessibleTypeExpression, TypeExpression, Identifier, ForExpression, StructDeclaration, FieldDeclaration,
+    StructExpression, MemberAccessExpression,
+]
+NODE_TAGS = {node_type: tag for tag, node_type in enumerate(NODE_TYPES)}
+# Children are written in the order the constructor takes them, so a node is
+# rebuilt with a single call.
+NODE_FIELDS = [list(inspect.signature(node_type.__init__).parameters)[1:] for node_type in NODE_TYPES]
+
+# Every instruction is one unsigned int: the operation in the low bits and its
+# operand above them.
+CONST, NONE, LIST, TUPLE, NODE, LEAF = range(6)
+OPERATION_BITS = 3
+OPERATION_MASK = (1 << OPERATION_BITS) - 1
+
+
+def is_leaf(node: ASTNode) -> bool:
+    return all(not isinstance(getattr(node, name), (ASTNode, list, tuple)) for name in node._fields)
+
+
+# A tree is stored as a flat postfix program that rebuilds it on a stack, so
+# neither writing nor reading it recurses however deep the expressions nest.
+# Names, operators and literal values go to a deduplicated constant table, and
+# nodes that only hold such values, like identifiers and literals, to a table
+# of leaves that are rebuilt with one instruction.
+class Serializer:
+    def __init__(self):
+        self.code = array("I")
+        self.constants: List = []
+        self.constant_indexes = {}
+        self.leaves: List[tuple] = []
+        self.leaf_indexes = {}
+
+    def emit(self, operation: int, operand: int = 0):
+        self.code.append(operand << OPERATION_BITS | operation)
+
+    def constant(self, value) -> int:
+        # 1, 1.0 and True are equal, so the type is part of the key.
+        key = (type(value), value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constant_indexes[key] = index
+        return index
+
+    def leaf(self, node: ASTNode) -> int:
+        tag = NODE_TAGS[type(node)]
+        key = (tag,) + tuple(self.constant(getattr(node, name)) for name in NODE_FIELDS[tag])
+        index = self.leaf_indexes.get(key)
+        if index is None:
+            index = len(self.leaves)
+            self.leaves.append(key)
+            self.leaf_indexes[key] = index
+        return index
+
+    def serialize(self, module: Module) -> bytes:
+        stack = [(module, False)]
+        while stack:
+            value, expanded = stack.pop()
+            if expanded:
+                if isinstance(value, ASTNode):
+                    self.emit(NODE, NODE_TAGS[type(value)])
+                else:
+                    self.emit(LIST if isinstance(value, list) else TUPLE, len(value))
+            elif isinstance(value, ASTNode):
+                if is_leaf(value):
+                    self.emit(LEAF, self.leaf(value))
+                    continue
+                stack.append((value, True))
+                fields = NODE_FIELDS[NODE_TAGS[type(value)]]
+                stack.extend((getattr(value, name), False) for name in reversed(fields))
+            elif isinstance(value, (list, tuple)):
+                stack.append((value, True))
+                stack.extend((child, False) for child in reversed(value))
+            elif value is None:
+                self.emit(NONE)
+            else:
+                self.emit(CONST, self.constant(value))
+
+        # marshal only knows plain ints, so token types are stored as such
+        # together with where they are.
+        token_types = [index for index, value in enumerate(self.constants) if isinstance(value, TokenType)]
+        constants = [int(value) if isinstance(value, TokenType) else value for value in self.constants]
+        tables = marshal.dumps((constants, token_types, self.leaves))
+
+        # Instructions take as few bytes as the largest one needs.
+        largest = max(self.code)
+        typecode = next(typecode for typecode in "BHI" if largest < 1 << 8 * array(typecode).itemsize)
+        version = __version__.encode()
+        return b"".join([HEADER.pack(MAGIC, FORMAT_VERSION, typecode.encode(), len(version), len(tables)),
+                         version, tables, array(typecode, self.code).tobytes()])
+
+
+def serialize(module: Module) -> bytes:
+    return Serializer().serialize(module)
+
+
+# Returns None for data written by another format or syvora version.
+def deserialize(data: bytes) -> Optional[Module]:
+    if len(data) < HEADER.size:
+        return None
+    magic, format_version, typecode, version_size, tables_size = HEADER.unpack_from(data)
+    offset = HEADER.size
+    if magic != MAGIC or format_version != FORMAT_VERSION or data[offset:offset + version_size] != __version__.encode():
+        return None
+    offset += version_size
+    constants, token_types, leaves = marshal.loads(data[offset:offset + tables_size])
+    code = array(typecode.decode())
+    code.frombytes(data[offset + tables_size:])
+
+    for index in token_types:
+        constants[index] = TokenType(constants[index])
+    leaves = [(NODE_TYPES[leaf[0]], tuple(constants[index] for index in leaf[1:])) for leaf in leaves]
+    arities = [len(fields) for fields in NODE_FIELDS]
+
+    stack = []
+    push = stack.append
+    for instruction in code:
+        operation = instruction & OPERATION_MASK
+        operand = instruction >> OPERATION_BITS
+        if operation == LEAF:
+            # Every occurrence gets its own node, since passes annotate them.
+            node_type, values = leaves[operand]
+            push(node_type(*values))
+        elif operation == NODE:
+            start = len(stack) - arities[operand]
+            stack[start:] = [NODE_TYPES[operand](*stack[start:])]
+        elif operation == CONST:
+            push(constants[operand])
+        elif operation == NONE:
+            push(None)
+        else:
+            start = len(stack) - operand
+            values = stack[start:]
+            del stack[start:]
+            push(values if operation == LIST else tuple(values))
+
+    module = stack.pop()
+    if stack or not isinstance(module, Module):
+        raise ValueError("Corrupt serialized syntax tree")
+    return module
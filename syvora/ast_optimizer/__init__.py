@@ -0,0 +1,5 @@
+from .constant_folder import ConstantFolder, fold_constants
+from .dead_functions import eliminate_dead_functions
+from .evaluator import CallEvaluator, Evaluator, evaluate_calls
+from .memoize import mark_memoizable
+from .passes import optimize_ast
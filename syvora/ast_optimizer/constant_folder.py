@@ -0,0 +1,164 @@
+import math
+from typing import Optional
+from syvora.ast_creator.ast_nodes import *
+from syvora.visitor import NodeTransformer
+
+
+INT_BITS = 64
+
+
+def wrap_int(value: int) -> int:
+    # Int is an i64, so folded arithmetic wraps around like the generated code.
+    value &= (1 << INT_BITS) - 1
+    return value - (1 << INT_BITS) if value >> (INT_BITS - 1) else value
+
+
+def is_literal(node, value=None) -> bool:
+    return isinstance(node, LiteralExpression) and (value is None or (node.value == value and type(node.value) == type(value)))
+
+
+def literal(value) -> LiteralExpression:
+    if isinstance(value, bool):
+        return LiteralExpression(value, TokenType.BOOLEAN_LITERAL)
+    elif isinstance(value, int):
+        return LiteralExpression(wrap_int(value), TokenType.INTEGER_LITERAL)
+    return LiteralExpression(value, TokenType.FLOAT_LITERAL)
+
+
+def fold_int(operator: str, left: int, right: int):
+    if operator == "+":
+        return left + right
+    elif operator == "-":
+        return left - right
+    elif operator == "*":
+        return left * right
+    elif operator in ("/", "%"):
+        # sdiv and srem trap on these, so they are left for the program to hit.
+        if right == 0 or (left == -(1 << (INT_BITS - 1)) and right == -1):
+            return None
+        # sdiv truncates towards zero, unlike Python's floor division.
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        return quotient if operator == "/" else left - right * quotient
+    return fold_comparison(operator, left, right)
+
+
+def fold_float(operator: str, left: float, right: float):
+    if operator == "+":
+        return left + right
+    elif operator == "-":
+        return left - right
+    elif operator == "*":
+        return left * right
+    elif operator == "/":
+        return left / right if right != 0 else None
+    elif operator == "%":
+        # math.fmod raises where frem gives NaN.
+        return math.fmod(left, right) if right != 0 and not math.isinf(left) else None
+    return fold_comparison(operator, left, right)
+
+
+def fold_comparison(operator: str, left, right) -> Optional[bool]:
+    if operator == "==":
+        return left == right
+    elif operator == "!=":
+        return left != right
+    elif operator == "<":
+        return left < right
+    elif operator == "<=":
+        return left <= right
+    elif operator == ">":
+        return left > right
+    elif operator == ">=":
+        return left >= right
+    return None
+
+
+# Folds operators over literals bottom-up and drops identity operations, so
+# codegen never emits arithmetic whose result is known at compile time.
+class ConstantFolder(NodeTransformer):
+    def visit_BinaryExpression(self, node: BinaryExpression):
+        node.left = yield node.left
+        node.right = yield node.right
+        left, operator, right = node.left, node.operator, node.right
+
+        if operator in ("&&", "||"):
+            return self.fold_logical(node)
+
+        if is_literal(left) and is_literal(right) and left.literal_type == right.literal_type:
+            value = None
+            if left.literal_type == TokenType.INTEGER_LITERAL:
+                value = fold_int(operator, left.value, right.value)
+            elif left.literal_type == TokenType.FLOAT_LITERAL:
+                value = fold_float(operator, left.value, right.value)
+            elif operator in ("==", "!="):
+                value = fold_comparison(operator, left.value, right.value)
+            if value is not None:
+                return literal(value)
+            return node
+
+        # Identities that keep the other operand, which is still evaluated.
+        if operator == "+" and is_literal(left, 0):
+            return right
+        if operator in ("+", "-") and is_literal(right, 0):
+            return left
+        if operator == "*" and is_literal(left, 1):
+            return right
+        if operator in ("*", "/") and is_literal(right, 1):
+            return left
+        return node
+
+    def fold_logical(self, node: BinaryExpression):
+        left, right = node.left, node.right
+        # The right operand is only evaluated when the left one does not
+        # decide the result, so dropping it with a literal left is safe.
+        decisive = node.operator == "||"
+        if is_literal(left, decisive):
+            return left
+        if is_literal(left, not decisive):
+            return right
+        if is_literal(right, not decisive):
+            return left
+        return node
+
+    def visit_UnaryExpression(self, node: UnaryExpression):
+        node.expression = yield node.expression
+        operand = node.expression
+
+        if not is_literal(operand):
+            return node
+        if node.operator == "-" and operand.literal_type in (TokenType.INTEGER_LITERAL, TokenType.FLOAT_LITERAL):
+            return literal(-operand.value)
+        if node.operator == "!" and operand.literal_type == TokenType.BOOLEAN_LITERAL:
+            return literal(not operand.value)
+        return node
+
+    def visit_IfExpression(self, node: IfExpression):
+        node.condition = yield node.condition
+        node.true_block = yield node.true_block
+        if node.false_block is not None:
+            node.false_block = yield node.false_block
+
+        if not is_literal(node.condition) or node.condition.literal_type != TokenType.BOOLEAN_LITERAL:
+            return node
+        taken = node.true_block if node.condition.value else node.false_block
+        if taken is None:
+            return Block([], None)
+        # A block that returns has to stay a branch of its own.
+        if isinstance(taken, Block) and taken.return_expression is not None:
+            return node
+        return taken
+
+    def visit_LiteralExpression(self, node: LiteralExpression):
+        return node
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        return node
+
+    def visit_AccessibleTypeExpression(self, node: AccessibleTypeExpression):
+        return node
+
+
+def fold_constants(node: ASTNode) -> ASTNode:
+    return ConstantFolder().visit(node)
@@ -0,0 +1,38 @@
+from typing import List, Set
+from syvora.ast_creator.ast_nodes import Module
+from syvora.ast_creator.fingerprint import iter_function_calls
+from syvora.semantic import resolve
+
+
+ENTRY_POINT = "main"
+
+
+def reachable_slots(module: Module, roots: List[int]) -> Set[int]:
+    reachable = set(roots)
+    stack = list(roots)
+    while stack:
+        body = module.function_table[stack.pop()].body
+        for call in iter_function_calls(body):
+            if call.slot not in reachable:
+                reachable.add(call.slot)
+                stack.append(call.slot)
+    return reachable
+
+
+# Drops every function that neither main nor an exported function can call.
+# Modules with neither, such as shared libraries, are left alone since any of
+# their functions may be used. Slots stay valid because the function table
+# itself is not touched.
+def eliminate_dead_functions(module: Module) -> Module:
+    if module.function_table is None:
+        resolve(module)
+
+    entry_points = {ENTRY_POINT} | set(module.exports or [])
+    slots = {id(function): slot for slot, function in enumerate(module.function_table)}
+    roots = [slots[id(function)] for function in module.functions if function.name in entry_points]
+    if len(roots) == 0:
+        return module
+
+    reachable = reachable_slots(module, roots)
+    module.functions = [function for function in module.functions if slots[id(function)] in reachable]
+    return module
@@ -0,0 +1,241 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from syvora.ast_creator.ast_nodes import *
+from syvora.ast_creator.fingerprint import iter_function_calls
+from syvora.semantic import builtin_functions
+from syvora.visitor import NodeVisitor
+from .constant_folder import ConstantFolder, fold_comparison, fold_float, fold_int, is_literal, literal, wrap_int
+
+
+DEFAULT_MAX_STEPS = 100000
+DEFAULT_MAX_DEPTH = 256
+
+
+class Unevaluable(Exception):
+    pass
+
+
+class Return:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+# A function is pure if it never reaches a builtin, directly or through the
+# functions it calls. Signature-only declarations are never pure.
+def pure_slots(function_table: List[FunctionDeclaration]) -> Set[int]:
+    callees = {}
+    for slot in range(len(builtin_functions), len(function_table)):
+        body = function_table[slot].body
+        if body is not None:
+            callees[slot] = {call.slot for call in iter_function_calls(body)}
+
+    impure = set(range(len(builtin_functions)))
+    impure.update(slot for slot in range(len(function_table)) if slot not in callees)
+    changed = True
+    while changed:
+        changed = False
+        for slot, calls in callees.items():
+            if slot not in impure and not calls.isdisjoint(impure):
+                impure.add(slot)
+                changed = True
+
+    return set(callees) - impure
+
+
+# Interprets pure functions on the AST. Every evaluation gets a fresh step and
+# call depth budget; running out of either, or anything the interpreter does
+# not handle, raises Unevaluable so the call is left to run at runtime.
+class Evaluator(NodeVisitor):
+    def __init__(self, function_table: List[FunctionDeclaration], max_steps: int = DEFAULT_MAX_STEPS, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.function_table = function_table
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.pure = pure_slots(function_table)
+        self.memo: Dict[Tuple[int, tuple], Any] = {}
+        self.failed: Set[Tuple[int, tuple]] = set()
+        self.frames: List[list] = []
+        self.steps = 0
+
+    def evaluate(self, slot: int, args: list) -> Optional[Any]:
+        key = (slot, tuple(args))
+        if key in self.memo:
+            return self.memo[key]
+        if key in self.failed or slot not in self.pure:
+            return None
+
+        self.steps = 0
+        self.frames = []
+        try:
+            return self._run(self.call(slot, args))
+        except Unevaluable:
+            self.failed.add(key)
+            return None
+
+    def step(self):
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise Unevaluable()
+
+    def call(self, slot: int, args: list):
+        key = (slot, tuple(args))
+        if key in self.memo:
+            return self.memo[key]
+        if slot not in self.pure or len(self.frames) >= self.max_depth:
+            raise Unevaluable()
+
+        function = self.function_table[slot]
+        self.frames.append(args + [None] * (function.local_count - len(args)))
+        result = yield function.body
+        self.frames.pop()
+
+        if not isinstance(result, Return):
+            raise Unevaluable()
+        self.memo[key] = result.value
+        return result.value
+
+    def generic_visit(self, node):
+        raise Unevaluable()
+
+    def visit_FunctionCallExpression(self, node: FunctionCallExpression):
+        self.step()
+        args = []
+        for _, arg_expr in node.arguments:
+            args.append((yield arg_expr))
+        if node.children is not None:
+            for child_expr in node.children:
+                yield child_expr
+        return (yield from self.call(node.slot, args))
+
+    def visit_Block(self, node: Block):
+        self.step()
+        value = None
+        for statement in node.statements:
+            value = yield statement
+            if isinstance(value, Return):
+                return value
+
+        if node.return_expression is not None:
+            value = yield node.return_expression
+            return value if isinstance(value, Return) else Return(value)
+        return value
+
+    def visit_IfExpression(self, node: IfExpression):
+        self.step()
+        condition = yield node.condition
+        if condition is True:
+            return (yield node.true_block)
+        elif condition is False:
+            return (yield node.false_block) if node.false_block is not None else None
+        raise Unevaluable()
+
+    def visit_ForExpression(self, node: ForExpression):
+        self.step()
+        start = yield node.range.left
+        end = yield node.range.right
+        value = (yield node.initial) if node.accumulator is not None else None
+        if node.range.operator == "...":
+            end += 1
+
+        frame = self.frames[-1]
+        for index in range(start, end):
+            self.step()
+            frame[node.variable_slot] = index
+            if node.accumulator is not None:
+                frame[node.accumulator_slot] = value
+            result = yield node.body
+            if isinstance(result, Return):
+                return result
+            if node.accumulator is not None:
+                value = result
+        return value
+
+    def visit_BinaryExpression(self, node: BinaryExpression):
+        self.step()
+        left = yield node.left
+        if node.operator in ("&&", "||"):
+            if not isinstance(left, bool):
+                raise Unevaluable()
+            if left == (node.operator == "||"):
+                return left
+            right = yield node.right
+        else:
+            right = yield node.right
+
+        value = None
+        if type(left) != type(right):
+            raise Unevaluable()
+        elif node.operator in ("&&", "||"):
+            value = right
+        elif isinstance(left, bool):
+            value = fold_comparison(node.operator, left, right) if node.operator in ("==", "!=") else None
+        elif isinstance(left, int):
+            value = fold_int(node.operator, left, right)
+            if type(value) == int:
+                value = wrap_int(value)
+        elif isinstance(left, float):
+            value = fold_float(node.operator, left, right)
+
+        if value is None:
+            raise Unevaluable()
+        return value
+
+    def visit_UnaryExpression(self, node: UnaryExpression):
+        self.step()
+        value = yield node.expression
+        if node.operator == "!" and isinstance(value, bool):
+            return not value
+        elif node.operator == "-" and isinstance(value, int) and not isinstance(value, bool):
+            return wrap_int(-value)
+        elif node.operator == "-" and isinstance(value, float):
+            return -value
+        raise Unevaluable()
+
+    # Structs are tuples of their fields in declared order.
+    def visit_StructExpression(self, node: StructExpression):
+        self.step()
+        fields = []
+        for _, expression in node.fields:
+            fields.append((yield expression))
+        return tuple(fields)
+
+    def visit_MemberAccessExpression(self, node: MemberAccessExpression):
+        self.step()
+        value = yield node.expression
+        return value[node.index]
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        self.step()
+        return self.frames[-1][node.slot]
+
+    def visit_LiteralExpression(self, node: LiteralExpression):
+        self.step()
+        return node.value
+
+
+# Constant folding that additionally replaces calls to pure functions with
+# literal arguments by the literal they evaluate to.
+class CallEvaluator(ConstantFolder):
+    def __init__(self, evaluator: Evaluator):
+        self.evaluator = evaluator
+
+    def visit_FunctionCallExpression(self, node: FunctionCallExpression):
+        arguments = []
+        for arg_name, arg_expr in node.arguments:
+            arguments.append((arg_name, (yield arg_expr)))
+        node.arguments = arguments
+        if node.children is not None:
+            children = []
+            for child_expr in node.children:
+                children.append((yield child_expr))
+            node.children = children
+
+        if node.children or not all(is_literal(arg_expr) for _, arg_expr in node.arguments):
+            return node
+        value = self.evaluator.evaluate(node.slot, [arg_expr.value for _, arg_expr in node.arguments])
+        # Structs have no literals to replace the call with.
+        return node if value is None or isinstance(value, tuple) else literal(value)
+
+
+def evaluate_calls(module: Module, max_steps: int = DEFAULT_MAX_STEPS, max_depth: int = DEFAULT_MAX_DEPTH) -> Module:
+    return CallEvaluator(Evaluator(module.function_table, max_steps, max_depth)).visit(module)
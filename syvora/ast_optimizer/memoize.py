@@ -0,0 +1,40 @@
+from syvora.ast_creator.ast_nodes import *
+from syvora.ast_creator.fingerprint import iter_function_calls
+from syvora.semantic import resolve
+from .dead_functions import reachable_slots
+from .evaluator import pure_slots
+
+
+DEFAULT_MEMO_CAPACITY = 4096
+
+MEMO_KEY_TYPES = ("Int", "Bool")
+
+
+def is_memo_key_type(t: Optional[AccessibleTypeExpression]) -> bool:
+    return t is not None and t.child is None and t.name in MEMO_KEY_TYPES
+
+
+def is_recursive(module: Module, slot: int) -> bool:
+    callees = [call.slot for call in iter_function_calls(module.function_table[slot].body)]
+    return slot in reachable_slots(module, callees)
+
+
+# Marks the functions whose results can be cached by their arguments: pure,
+# recursive, and taking and returning only Int and Bool. Code generation puts
+# a direct-mapped table of `capacity` entries in front of their bodies.
+def mark_memoizable(module: Module, capacity: int = DEFAULT_MEMO_CAPACITY) -> Module:
+    if capacity <= 0 or capacity & (capacity - 1) != 0:
+        raise ValueError(f"Memo capacity must be a power of two, got {capacity}")
+    if module.function_table is None:
+        resolve(module)
+
+    slots = {id(function): slot for slot, function in enumerate(module.function_table)}
+    pure = pure_slots(module.function_table)
+    for function in module.functions:
+        slot = slots[id(function)]
+        if (slot in pure and len(function.arguments) > 0
+                and is_memo_key_type(function.return_type)
+                and all(is_memo_key_type(arg.type) for arg in function.arguments)
+                and is_recursive(module, slot)):
+            function.memo_capacity = capacity
+    return module
@@ -0,0 +1,14 @@
+from syvora.ast_creator.ast_nodes import Module
+from syvora.semantic import check_types, resolve
+from .dead_functions import eliminate_dead_functions
+from .evaluator import DEFAULT_MAX_DEPTH, DEFAULT_MAX_STEPS, evaluate_calls
+
+
+# Runs before code generation on a whole module. Folding and compile-time
+# evaluation of pure calls happen in the same bottom-up sweep, so a call whose
+# arguments fold to literals is evaluated as well.
+def optimize_ast(module: Module, max_steps: int = DEFAULT_MAX_STEPS, max_depth: int = DEFAULT_MAX_DEPTH) -> Module:
+    if module.function_table is None:
+        resolve(module)
+    check_types(module)
+    return eliminate_dead_functions(evaluate_calls(module, max_steps, max_depth))
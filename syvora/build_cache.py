@@ -0,0 +1,74 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional
+from . import __version__
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.environ.get("SYVORA_CACHE_DIR", os.path.join(cache_home, "syvora"))
+
+
+class BuildCache:
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+
+    # Outputs link against the runtime, so they are rebuilt when it changes.
+    # Only builds, which load code generation anyway, import it.
+    @staticmethod
+    def hasher(opt_level: int, target: str, kind: str):
+        from .llvmir_generator.runtime import RUNTIME_VERSION
+        h = hashlib.sha256()
+        for part in [__version__.encode(), str(RUNTIME_VERSION).encode(), str(opt_level).encode(), target.encode(),
+                     kind.encode()]:
+            h.update(part)
+            h.update(b"\0")
+        return h
+
+    @staticmethod
+    def key(source: bytes, opt_level: int, target: str, kind: str) -> str:
+        h = BuildCache.hasher(opt_level, target, kind)
+        h.update(source)
+        return h.hexdigest()
+
+    @staticmethod
+    def file_key(file_path: str, opt_level: int, target: str, kind: str, chunk_size: int = 1 << 20) -> str:
+        h = BuildCache.hasher(opt_level, target, kind)
+        with open(file_path, "rb") as file:
+            while chunk := file.read(chunk_size):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def path(self, key: str, kind: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{kind}")
+
+    def load(self, key: str, kind: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key, kind), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def fetch(self, key: str, kind: str, output_path: str) -> bool:
+        cached_path = self.path(key, kind)
+        if not os.path.exists(cached_path):
+            return False
+        shutil.copyfile(cached_path, output_path)
+        return True
+
+    def store(self, key: str, kind: str, data: bytes) -> None:
+        cached_path = self.path(key, kind)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+
+        # Write to a temporary file first so that concurrent builds never
+        # observe a partially written artifact.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cached_path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, cached_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,63 @@
+import json
+import os
+import socket
+import sys
+from typing import List, Optional
+
+
+# Only the standard library is imported here: the client is meant to be
+# cheaper to start than the compiler it talks to.
+def default_socket_path() -> str:
+    path = os.environ.get("SYVORA_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "syvora.sock")
+    return os.path.join("/tmp", f"syvora-{os.getuid()}.sock")
+
+
+def send(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def receive(sock: socket.socket) -> Optional[dict]:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    data = b"".join(chunks)
+    return json.loads(data) if data else None
+
+
+# Runs a syvora command line on the server as if it had been started in
+# cwd and returns its exit status, stdout and stderr.
+def request(argv: List[str], socket_path: Optional[str] = None, cwd: Optional[str] = None) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or default_socket_path())
+        send(sock, {"argv": argv, "cwd": cwd or os.getcwd()})
+        response = receive(sock)
+    if response is None:
+        raise ConnectionError("syvora server closed the connection without answering")
+    return response
+
+
+def main(argv=None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    socket_path = None
+    if len(argv) >= 2 and argv[0] == "--socket":
+        socket_path, argv = argv[1], argv[2:]
+
+    response = request(argv, socket_path)
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,6 @@
-from .llvmir_generator import LLVMIRGenerator
+# LLVMIRGenerator pulls in llvmlite, so it is only imported once it is used.
+def __getattr__(name):
+    if name == "LLVMIRGenerator":
+        from .llvmir_generator import LLVMIRGenerator
+        return LLVMIRGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import tempfile
+from typing import Optional
+from llvmlite import binding as llvm
+from .optimizer import optimize
+from .target import create_target_machine
+
+
+OBJECT = "o"
+SHARED_LIBRARY = "so"
+
+
+def emit_object(llvm_module: llvm.ModuleRef, opt_level: int = 0, run_pipeline: bool = True, target_cpu: Optional[str] = None) -> bytes:
+    target_machine = create_target_machine(opt_level, reloc="pic", cpu=target_cpu)
+    if run_pipeline:
+        optimize(llvm_module, opt_level, target_machine)
+    return target_machine.emit_object(llvm_module)
+
+
+def link_shared_library(object_code: bytes) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        object_path = os.path.join(tmp_dir, "module.o")
+        library_path = os.path.join(tmp_dir, "module.so")
+        with open(object_path, "wb") as file:
+            file.write(object_code)
+
+        cc = os.environ.get("CC", "cc")
+        subprocess.run([cc, "-shared", "-o", library_path, object_path], check=True)
+
+        with open(library_path, "rb") as file:
+            return file.read()
+
+
+def emit(llvm_module: llvm.ModuleRef, kind: str, opt_level: int = 0, run_pipeline: bool = True, target_cpu: Optional[str] = None) -> bytes:
+    object_code = emit_object(llvm_module, opt_level, run_pipeline, target_cpu)
+    if kind == OBJECT:
+        return object_code
+    elif kind == SHARED_LIBRARY:
+        return link_shared_library(object_code)
+
+    raise ValueError(f"Unknown output kind: {kind}")
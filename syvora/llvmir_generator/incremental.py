@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional
+from llvmlite import binding as llvm
+from syvora import __version__
+from syvora.ast_creator import FunctionDeclaration, Module, function_fingerprint
+from syvora.build_cache import BuildCache
+from syvora.semantic import resolve
+from .llvmir_generator import LLVMIRGenerator
+from .optimizer import create_llvm_module
+from .runtime import RUNTIME_VERSION
+
+
+BITCODE = "bc"
+
+
+def generate_runtime_unit() -> LLVMIRGenerator:
+    generator = LLVMIRGenerator()
+    generator.add_runtime()
+    return generator
+
+
+def generate_function_unit(function: FunctionDeclaration, function_table) -> LLVMIRGenerator:
+    # Every function is generated into its own module. Callees are only
+    # declared and get resolved when the units are linked together.
+    generator = LLVMIRGenerator(function_table)
+    generator.add_runtime(declare_only=True)
+    generator.visit(function)
+    return generator
+
+
+class IncrementalCompiler:
+    def __init__(self, cache: Optional[BuildCache] = None):
+        self.cache = cache
+        self.units: Dict[str, bytes] = {}
+        self.rebuilt: List[str] = []
+
+    def load_unit(self, fingerprint: str) -> Optional[bytes]:
+        bitcode = self.units.get(fingerprint)
+        if bitcode is None and self.cache is not None:
+            bitcode = self.cache.load(fingerprint, BITCODE)
+            if bitcode is not None:
+                self.units[fingerprint] = bitcode
+        return bitcode
+
+    def store_unit(self, fingerprint: str, bitcode: bytes) -> None:
+        self.units[fingerprint] = bitcode
+        if self.cache is not None:
+            self.cache.store(fingerprint, BITCODE, bitcode)
+
+    def compile(self, module: Module) -> llvm.ModuleRef:
+        if module.function_table is None:
+            resolve(module)
+        declarations = {function.low_level_func_name(): function for function in module.functions}
+
+        self.rebuilt = []
+        linked = create_llvm_module(generate_runtime_unit().module)
+        for function in module.functions:
+            # The memo table, fast-math and profiling change the generated code
+            # but not the AST.
+            profile = function.profile.key() if function.profile is not None else None
+            salt = f"{__version__}/{RUNTIME_VERSION}/{function.memo_capacity}/{function.fast_math}/{function.instrumented}/{profile}"
+            fingerprint = function_fingerprint(function, declarations, salt)
+            bitcode = self.load_unit(fingerprint)
+            if bitcode is None:
+                unit = generate_function_unit(function, module.function_table)
+                bitcode = create_llvm_module(unit.module).as_bitcode()
+                self.store_unit(fingerprint, bitcode)
+                self.rebuilt.append(function.low_level_func_name())
+
+            linked.link_in(llvm.parse_bitcode(bitcode))
+
+        linked.verify()
+        return linked
@@ -0,0 +1,76 @@
+import ctypes
+import ctypes.util
+import time
+from typing import Optional
+from llvmlite import binding as llvm
+from llvmlite import ir
+from .optimizer import optimize
+from .runtime import FLUSH
+from .target import create_target_machine
+
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"))
+
+
+# Flushes C stdio, for native code that writes through it rather than the
+# runtime's buffer.
+def flush_native_output():
+    _libc.fflush(None)
+
+
+def ctype_from_llvm_type(t: ir.Type):
+    if isinstance(t, ir.VoidType):
+        return None
+    elif isinstance(t, ir.IntType):
+        if t.width == 1:
+            return ctypes.c_bool
+        return getattr(ctypes, f"c_int{t.width}")
+    elif isinstance(t, ir.DoubleType):
+        return ctypes.c_double
+    elif isinstance(t, ir.FloatType):
+        return ctypes.c_float
+
+    raise TypeError(f"Unsupported type for JIT call: {t}")
+
+
+class JIT:
+    def __init__(self, llvm_module: llvm.ModuleRef, opt_level: int = 0, run_pipeline: bool = True, target_cpu: Optional[str] = None):
+        start = time.perf_counter()
+
+        target_machine = create_target_machine(opt_level, cpu=target_cpu)
+        self.llvm_module = llvm_module
+        if run_pipeline:
+            optimize(self.llvm_module, opt_level, target_machine)
+        self.engine = llvm.create_mcjit_compiler(self.llvm_module, target_machine)
+        self.engine.finalize_object()
+        self.engine.run_static_constructors()
+
+        # Native builds flush the runtime's buffer at exit; here every call
+        # into the module is followed by a flush instead.
+        address = self.engine.get_function_address(FLUSH)
+        self.flush_runtime = ctypes.CFUNCTYPE(None)(address) if address else None
+
+        self.compile_time = time.perf_counter() - start
+        self.execution_time = 0.0
+
+    def cfunction(self, function: ir.Function):
+        func_type = function.function_type
+        cfunc_type = ctypes.CFUNCTYPE(
+            ctype_from_llvm_type(func_type.return_type),
+            *[ctype_from_llvm_type(t) for t in func_type.args])
+        return cfunc_type(self.engine.get_function_address(function.name))
+
+    def call(self, function: ir.Function, *args):
+        cfunc = self.cfunction(function)
+
+        start = time.perf_counter()
+        result = cfunc(*args)
+        self.flush_output()
+        self.execution_time += time.perf_counter() - start
+
+        return result
+
+    def flush_output(self):
+        if self.flush_runtime is not None:
+            self.flush_runtime()
+        flush_native_output()
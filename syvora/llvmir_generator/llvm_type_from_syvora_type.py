@@ -1,9 +1,10 @@
+from typing import Callable
 from llvmlite import ir
-from syvora.ast_creator import AccessibleTypeExpression
-from .symbol_table import SymbolTable
+from syvora.ast_creator import AccessibleTypeExpression, StructDeclaration
 
 
-def llvm_type_from_syvora_type(t: AccessibleTypeExpression, symbol_table: SymbolTable) -> ir.Type:
+# struct_type gives the LLVM type of a resolved struct type.
+def llvm_type_from_syvora_type(t: AccessibleTypeExpression, struct_type: Callable[[StructDeclaration], ir.Type]) -> ir.Type:
     if t.child == None:
         if t.name == "Int":
             return ir.IntType(64)
@@ -11,5 +12,7 @@ def llvm_type_from_syvora_type(t: AccessibleTypeExpression, symbol_table: Symbol
             return ir.DoubleType()
         elif t.name == "Bool":
             return ir.IntType(1)
+        elif t.declaration is not None:
+            return struct_type(t.declaration)
 
     raise TypeError(f"Unknown type: {t}")
@@ -1,133 +1,560 @@
+from typing import Dict, List, Optional
 import llvmlite.ir as ir
-import ctypes
+from llvmlite import binding as llvm
 from syvora.ast_creator import *
+from syvora.semantic import FLOAT, PRINT_SLOT, check_types, resolve
+from syvora.visitor import NodeVisitor
+from .jit import JIT
+from .optimizer import create_llvm_module, optimize
+from .target import create_target_machine
 from .llvm_type_from_syvora_type import llvm_type_from_syvora_type
-from .symbol_table import SymbolTable
-
-
-class LLVMIRGenerator:
-
-    def __init__(self):
-        self.module = ir.Module(name="syvora_module")
-        self.symbol_table = SymbolTable()
-
-    def add_print_function(self):
-        printf_type = ir.FunctionType(ir.IntType(
-            32), [ir.PointerType(ir.IntType(8))], var_arg=True)
-        printf = ir.Function(self.module, printf_type, name="printf")
-
-        print_function_type = ir.FunctionType(ir.VoidType(), [ir.IntType(64)])
-        print_function = ir.Function(
-            self.module, print_function_type, 'pring_arg')
-
-        block = print_function.append_basic_block('entry')
-        builder = ir.IRBuilder(block)
-
-        format_string = ir.Constant(ir.ArrayType(
-            ir.IntType(8), 4), bytearray("%d\n\00", "utf8"))
-        format_string_ptr = ir.GlobalVariable(
-            self.module, format_string.type, ".str")
-        format_string_ptr.linkage = 'private'
-        format_string_ptr.global_constant = True
-        format_string_ptr.initializer = format_string
-
-        integer_value = print_function.args[0]
-        builder.call(printf, [builder.bitcast(
-            format_string_ptr, ir.PointerType(ir.IntType(8))), integer_value])
-
-        builder.ret_void()
+from .profile import ProfileSummary, counter_count, counters_name
+from .runtime import declare_runtime, define_runtime
+from .structs import MAX_REGISTER_STRUCT_SIZE, StructLayout, layout_struct
+
+
+# Loops only get vectorization hints when they are reductions over arithmetic
+# SIMD has instructions for: LLVM warns about every loop it was told to
+# vectorize but could not, and it vectorizes a forced loop that divides Ints
+# even though the scalar one is faster. The body has to combine the
+# accumulator with such arithmetic that does not read it again.
+VECTOR_OPERATORS = ("+", "-", "*")
+ARITHMETIC_NODES = (BinaryExpression, UnaryExpression, IdentifierExpression, LiteralExpression)
+
+
+def is_arithmetic(node: ASTNode, excluded_slot: int) -> bool:
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if not isinstance(value, ARITHMETIC_NODES):
+            return False
+        if isinstance(value, IdentifierExpression):
+            if value.slot == excluded_slot:
+                return False
+        elif isinstance(value, BinaryExpression):
+            if value.operator not in VECTOR_OPERATORS:
+                return False
+            stack.extend([value.left, value.right])
+        elif isinstance(value, UnaryExpression):
+            stack.append(value.expression)
+    return True
+
+
+def is_reduction(node: ForExpression) -> bool:
+    if node.accumulator is None or len(node.body.statements) != 1:
+        return False
+    step = node.body.statements[0]
+    if not isinstance(step, BinaryExpression) or step.operator not in VECTOR_OPERATORS:
+        return False
+
+    def is_accumulator(expression):
+        return isinstance(expression, IdentifierExpression) and expression.slot == node.accumulator_slot
+
+    if is_accumulator(step.left):
+        operand = step.right
+    elif is_accumulator(step.right) and step.operator != "-":
+        operand = step.left
+    else:
+        return False
+    return is_arithmetic(operand, node.accumulator_slot)
+
+
+class LLVMIRGenerator(NodeVisitor):
+    # Whether struct fields are reordered to minimize padding, and the largest
+    # struct passed and returned in registers rather than through a pointer.
+    reorder_fields = True
+    max_register_struct_size = MAX_REGISTER_STRUCT_SIZE
+
+    # function_table maps resolved call slots to declarations; it may be a
+    # list or, for partial modules, a dict of just the slots that are used.
+    def __init__(self, function_table=None):
+        # A context of its own keeps the struct types of every generated
+        # module apart.
+        self.module = ir.Module(name="syvora_module", context=ir.Context())
+        self.function_table = function_table
+        self.functions: Dict[int, ir.Function] = {}
+        self.locals: List[ir.Value] = []
+        self.main_function: Optional[ir.Function] = None
+        self.print_functions: Optional[Dict[str, ir.Function]] = None
+        # Fast-math flags put on the Float instructions of the current function.
+        self.float_flags = ()
+        # The current function's profile counters when it is instrumented,
+        # the counts recorded for it when there are any, and how many of its
+        # branch sites have been emitted.
+        self.counters: Optional[ir.GlobalVariable] = None
+        self.function_profile = None
+        self.branch_site = 0
+        self.profile_summary: Optional[ProfileSummary] = None
+        self.layouts: Dict[str, StructLayout] = {}
+        # Where the current function stores a struct it returns through a
+        # pointer, and where the structs it loaded from memory are.
+        self.result: Optional[ir.Argument] = None
+        self.addresses: Dict[ir.Value, ir.Value] = {}
+
+    # Defines the output runtime print lowers to, or only declares it in units
+    # that get linked against the one that defines it.
+    def add_runtime(self, declare_only: bool = False):
+        self.print_functions = declare_runtime(self.module) if declare_only else define_runtime(self.module)
+
+    def declare_function(self, node: FunctionDeclaration) -> ir.Function:
+        func_name = node.low_level_func_name()
 
-        dummy = FunctionDeclaration(
-            "pring_arg", [Argument(Identifier("arg"), AccessibleTypeExpression("Int", None))], None, Block([], None))
-        self.symbol_table.insert("print_arg", (dummy, print_function))
+        llvm_function = self.module.globals.get(func_name)
+        if llvm_function is None:
+            # A struct returned through a pointer takes the first argument.
+            returns_pointer = self.passed_by_pointer(node.return_type)
+            ret_type = ir.VoidType() if node.return_type is None or returns_pointer else self.llvm_type(node.return_type)
+            types = [node.return_type] * returns_pointer + [arg.type for arg in node.arguments]
+            arg_types = [self.llvm_type(t).as_pointer() if self.passed_by_pointer(t) else self.llvm_type(t) for t in types]
+            func_type = ir.FunctionType(ret_type, arg_types)
+            llvm_function = ir.Function(self.module, func_type, func_name)
+            for i, (arg, t) in enumerate(zip(llvm_function.args, types)):
+                if self.passed_by_pointer(t):
+                    self.add_pointer_attributes(arg, t.declaration, returns_pointer and i == 0)
+
+        if node.name == "main":
+            self.main_function = llvm_function
+        return llvm_function
 
-    def visit(self, node):
-        method_name = f"visit_{node.__class__.__name__}"
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+    def add_pointer_attributes(self, arg: ir.Argument, declaration: StructDeclaration, result: bool):
+        layout = self.struct_layout(declaration)
+        arg.attributes.add('noalias')
+        arg.attributes.add('captures(none)')
+        if result:
+            arg.attributes.add('sret')
+        arg.attributes.align = layout.alignment
+        arg.attributes.dereferenceable = layout.size
+
+    def llvm_type(self, t: AccessibleTypeExpression) -> ir.Type:
+        return llvm_type_from_syvora_type(t, self.struct_type)
+
+    # Structs become identified types with their fields in layout order.
+    def struct_type(self, declaration: StructDeclaration) -> ir.IdentifiedStructType:
+        struct_type = self.module.context.get_identified_type(declaration.name)
+        if struct_type.is_opaque:
+            layout = self.struct_layout(declaration)
+            struct_type.set_body(*[self.llvm_type(declaration.fields[index].type) for index in layout.order])
+        return struct_type
+
+    def struct_layout(self, declaration: StructDeclaration) -> StructLayout:
+        layout = self.layouts.get(declaration.name)
+        if layout is None:
+            layout = layout_struct(declaration, self.layouts, self.reorder_fields)
+            self.layouts[declaration.name] = layout
+        return layout
+
+    def passed_by_pointer(self, t: Optional[AccessibleTypeExpression]) -> bool:
+        return (t is not None and t.declaration is not None
+                and self.struct_layout(t.declaration).size > self.max_register_struct_size)
+
+    def function_for_slot(self, slot: int) -> ir.Function:
+        llvm_function = self.functions.get(slot)
+        if llvm_function is None:
+            llvm_function = self.declare_function(self.function_table[slot])
+            self.functions[slot] = llvm_function
+        return llvm_function
 
     def generic_visit(self, node):
         raise Exception(f"No visit_{node.__class__.__name__} method")
 
     def visit_Module(self, node: Module):
-        self.add_print_function()
+        if node.function_table is None:
+            resolve(node)
+        self.function_table = node.function_table
+        if self.print_functions is None:
+            self.add_runtime()
 
         for function in node.functions:
-            self.visit(function)
+            llvm_function = yield function
+            # Only exports and main are visible to other modules.
+            if node.exports is not None and function.name != "main" and function.name not in node.exports:
+                llvm_function.linkage = 'internal'
 
     def visit_FunctionCallExpression(self, node: FunctionCallExpression):
-        func_name = node.low_level_func_name()
-        function_tuple: tuple[FunctionDeclaration,
-                              ir.Function] = self.symbol_table.lookup(func_name)
-
-        if function_tuple is None:
-            raise ValueError(f"Function '{node.function_name}' is not defined")
+        if node.slot == PRINT_SLOT:
+            _, argument = node.arguments[0]
+            value = yield argument
+            return self.builder.call(self.print_functions[argument.value_type], [value])
 
-        function_node, function = function_tuple
+        function = self.function_for_slot(node.slot)
+        declaration = self.function_table[node.slot]
 
         arg_values = []
-        for i, (arg_name, arg_expr) in enumerate(node.arguments):
-            if function_node.arguments[i].identifier.name != arg_name:
-                raise ValueError(
-                    f"Argument '{arg_name}' does not match '{function_node.arguments[i].identifier.name}'")
-            arg_value = self.visit(arg_expr)
+        for (_, arg_expr), argument in zip(node.arguments, declaration.arguments):
+            arg_value = yield arg_expr
+            if self.passed_by_pointer(argument.type):
+                arg_value = self.address_of(arg_value)
             arg_values.append(arg_value)
 
         if node.children is not None:
             for child_expr in node.children:
-                self.visit(child_expr)
-
-        result = self.builder.call(function, arg_values)
-        return result
+                yield child_expr
+
+        if not self.passed_by_pointer(declaration.return_type):
+            return self.builder.call(function, arg_values)
+        # Each call site returns into a stack slot of its own.
+        result = self.alloca(self.struct_type(declaration.return_type.declaration))
+        self.builder.call(function, [result] + arg_values)
+        return self.load_struct(result)
+
+    # Structs are values: an expression of a struct type is an SSA aggregate
+    # like any other value, so a struct that does not leave its function
+    # lives in registers or, when LLVM spills it, on the stack. Memory only
+    # comes in where a large struct crosses a call, and then the caller's
+    # stack frame holds it.
+    def visit_StructExpression(self, node: StructExpression):
+        layout = self.struct_layout(node.declaration)
+        value = ir.Constant(self.struct_type(node.declaration), ir.Undefined)
+        for index, (_, expression) in enumerate(node.fields):
+            field = yield expression
+            value = self.builder.insert_value(value, field, layout.elements[index])
+        return value
+
+    def visit_MemberAccessExpression(self, node: MemberAccessExpression):
+        value = yield node.expression
+        element = self.struct_layout(node.declaration).elements[node.index]
+        address = self.addresses.get(value)
+        if address is None:
+            return self.builder.extract_value(value, element, name=node.member)
+
+        # Only the fields that are used are read from memory.
+        i32 = ir.IntType(32)
+        field = self.builder.gep(address, [ir.Constant(i32, 0), ir.Constant(i32, element)], inbounds=True)
+        if node.declaration.fields[node.index].type.declaration is not None:
+            return self.load_struct(field, name=node.member)
+        return self.builder.load(field, name=node.member)
+
+    # A struct loaded from memory remembers where it came from, so that
+    # member accesses read just their field and calls pass the same pointer
+    # on instead of copying the struct.
+    def load_struct(self, address: ir.Value, name: str = "") -> ir.Value:
+        value = self.builder.load(address, name=name)
+        self.addresses[value] = address
+        return value
+
+    def address_of(self, value: ir.Value) -> ir.Value:
+        address = self.addresses.get(value)
+        if address is None:
+            address = self.alloca(value.type)
+            self.builder.store(value, address)
+        return address
+
+    # Slots go to the top of the entry block, where LLVM can promote them to
+    # registers once it inlined the calls that needed them in memory.
+    def alloca(self, t: ir.Type) -> ir.Value:
+        entry_block = self.builder.function.entry_basic_block
+        builder = ir.IRBuilder()
+        builder.position_at_start(entry_block)
+        slot = builder.alloca(t)
+        if self.builder.block is entry_block:
+            self.builder.position_at_end(entry_block)
+        return slot
+
+    # Puts a direct-mapped table in front of body_function: a hit returns the
+    # cached result, a miss calls the body and overwrites whatever entry the
+    # arguments hash to.
+    def emit_memo_wrapper(self, llvm_function: ir.Function, body_function: ir.Function, capacity: int):
+        i64 = ir.IntType(64)
+        function_type = llvm_function.function_type
+        entry_type = ir.LiteralStructType(
+            [ir.IntType(1)] + [i64] * len(function_type.args) + [function_type.return_type])
+        table_type = ir.ArrayType(entry_type, capacity)
+        table = ir.GlobalVariable(self.module, table_type, f"{llvm_function.name}.memo")
+        table.linkage = 'internal'
+        table.initializer = ir.Constant(table_type, None)
+
+        builder = ir.IRBuilder(llvm_function.append_basic_block('entry'))
+        keys = [arg if arg.type == i64 else builder.zext(arg, i64) for arg in llvm_function.args]
+        hash_value = ir.Constant(i64, 0)
+        for key in keys:
+            hash_value = builder.mul(builder.xor(hash_value, key), ir.Constant(i64, 0x9E3779B97F4A7C15))
+        hash_value = builder.xor(hash_value, builder.lshr(hash_value, ir.Constant(i64, 32)))
+        index = builder.and_(hash_value, ir.Constant(i64, capacity - 1))
+
+        def field(i):
+            return builder.gep(table, [ir.Constant(ir.IntType(32), 0), index, ir.Constant(ir.IntType(32), i)], inbounds=True)
+
+        hit = builder.load(field(0))
+        for i, key in enumerate(keys):
+            hit = builder.and_(hit, builder.icmp_unsigned('==', builder.load(field(i + 1)), key))
+        result_field = field(len(keys) + 1)
+
+        hit_block = llvm_function.append_basic_block('memo.hit')
+        miss_block = llvm_function.append_basic_block('memo.miss')
+        builder.cbranch(hit, hit_block, miss_block)
+
+        builder.position_at_end(hit_block)
+        builder.ret(builder.load(result_field))
+
+        builder.position_at_end(miss_block)
+        result = builder.call(body_function, llvm_function.args)
+        builder.store(ir.Constant(ir.IntType(1), 1), field(0))
+        for i, key in enumerate(keys):
+            builder.store(key, field(i + 1))
+        builder.store(result, result_field)
+        builder.ret(result)
 
     def visit_FunctionDeclaration(self, node: FunctionDeclaration):
-        func_name = node.low_level_func_name()
-
-        ret_type = llvm_type_from_syvora_type(
-            node.return_type, self.symbol_table)
-        arg_types = [llvm_type_from_syvora_type(
-            arg.type, self.symbol_table) for arg in node.arguments]
-        func_type = ir.FunctionType(ret_type, arg_types)
-        llvm_function = ir.Function(self.module, func_type, func_name)
+        # Passes may have replaced expressions since the module was checked.
+        check_types(node, self.function_table)
+        self.float_flags = ('fast',) if node.fast_math else ()
 
-        entry_block = llvm_function.append_basic_block('entry')
+        func_name = node.low_level_func_name()
+        llvm_function = self.declare_function(node)
+
+        # Recursive calls still go through llvm_function and so hit the table.
+        body_function = llvm_function
+        if node.memo_capacity is not None:
+            body_function = ir.Function(self.module, llvm_function.function_type, f"{func_name}.body")
+            body_function.linkage = 'internal'
+            for i, arg in enumerate(llvm_function.args):
+                arg.name = node.arguments[i].identifier.name
+            self.emit_memo_wrapper(llvm_function, body_function, node.memo_capacity)
+
+        entry_block = body_function.append_basic_block('entry')
         self.builder = ir.IRBuilder(entry_block)
 
-        self.symbol_table.enter_scope()
-        for i, arg in enumerate(llvm_function.args):
-            arg.name = node.arguments[i].identifier
-            alloca = self.builder.alloca(arg.type, name=arg.name)
-            self.builder.store(arg, alloca)
-            self.symbol_table.insert(arg.name, alloca)
-
-        self.visit(node.body)
-
-        if (node.return_type == None) != (node.body.return_expression == None):
-            raise RuntimeError(
-                f"Function '{func_name}' must have a return statement.")
-
-        if node.body.return_expression != None:
-            self.builder.ret(self.visit(node.body.return_expression))
-
-        self.symbol_table.exit_scope()
-
-        self.symbol_table.insert(func_name, (node, llvm_function))
+        self.branch_site = 0
+        self.counters = self.add_counters(node) if node.instrumented else None
+        if self.counters is not None:
+            self.count(ir.Constant(ir.IntType(64), 0))
+        self.function_profile = node.profile
+        if node.profile is not None:
+            self.add_entry_count(body_function, node.profile)
+
+        # Values are immutable, so arguments stay in their SSA registers, and
+        # structs passed by pointer are read straight from the caller's copy.
+        self.locals = []
+        self.addresses = {}
+        args = list(body_function.args)
+        self.result = args.pop(0) if self.passed_by_pointer(node.return_type) else None
+        if self.result is not None:
+            self.result.name = "result"
+        for argument, arg in zip(node.arguments, args):
+            arg.name = argument.identifier.name
+            self.locals.append(self.load_struct(arg) if self.passed_by_pointer(argument.type) else arg)
+        self.locals += [None] * (node.local_count - len(node.arguments))
+
+        yield node.body
+
+        if node.body.return_expression == None:
+            self.builder.ret_void()
 
         return llvm_function
 
-    def visit_Block(self, node: Block) -> None:
+    def visit_Block(self, node: Block):
+        value = None
+        for statement in node.statements:
+            value = yield statement
+
+        if node.return_expression != None:
+            value = yield node.return_expression
+            if self.result is None:
+                self.builder.ret(value)
+            else:
+                self.builder.store(value, self.result)
+                self.builder.ret_void()
+            return None
+
+        # A block used as an expression evaluates to its last statement.
+        return value
+
+    def visit_IfExpression(self, node: IfExpression):
+        condition = yield node.condition
+        if condition is None or condition.type != ir.IntType(1):
+            raise TypeError("Condition of 'if' must be a Bool")
+
+        function = self.builder.function
+        then_block = function.append_basic_block("if.then")
+        else_block = function.append_basic_block("if.else") if node.false_block is not None else None
+        end_block = function.append_basic_block("if.end")
+        self.branch(condition, then_block, else_block or end_block)
+
+        incoming = []
+        self.builder.position_at_end(then_block)
+        then_value = yield node.true_block
+        if not self.builder.block.is_terminated:
+            incoming.append((then_value, self.builder.block))
+            self.builder.branch(end_block)
+
+        if else_block is not None:
+            self.builder.position_at_end(else_block)
+            else_value = yield node.false_block
+            if not self.builder.block.is_terminated:
+                incoming.append((else_value, self.builder.block))
+                self.builder.branch(end_block)
+
+        self.builder.position_at_end(end_block)
+
+        # Only an if with an else produces a value, and a branch that returned
+        # early does not contribute one.
+        if else_block is None or len(incoming) == 0 or any(value is None for value, _ in incoming):
+            return None
+        if len(incoming) == 1:
+            return incoming[0][0]
+        if incoming[0][0].type != incoming[1][0].type:
+            raise TypeError("Both branches of 'if' must have the same type")
+
+        phi = self.builder.phi(incoming[0][0].type, name="if.value")
+        for value, block in incoming:
+            phi.add_incoming(value, block)
+        return phi
+
+    # Lowers to a rotated counted loop: a guard skips empty ranges and a single
+    # test at the bottom decides whether to go around again, the shape LLVM's
+    # loop passes expect. The induction variable never steps past the end, so
+    # its increment cannot overflow even for ranges that end at the largest Int.
+    def visit_ForExpression(self, node: ForExpression):
+        start = yield node.range.left
+        end = yield node.range.right
+        initial = (yield node.initial) if node.accumulator is not None else None
+        inclusive = node.range.operator == "..."
+
+        function = self.builder.function
+        preheader = self.builder.block
+        body_block = function.append_basic_block("for.body")
+        end_block = function.append_basic_block("for.end")
+        self.branch(self.builder.icmp_signed("<=" if inclusive else "<", start, end), body_block, end_block)
+
+        self.builder.position_at_end(body_block)
+        index = self.builder.phi(start.type, name=node.variable.name)
+        index.add_incoming(start, preheader)
+        self.locals[node.variable_slot] = index
+        accumulator = None
+        if node.accumulator is not None:
+            accumulator = self.builder.phi(initial.type, name=node.accumulator.name)
+            accumulator.add_incoming(initial, preheader)
+            self.locals[node.accumulator_slot] = accumulator
+
+        value = yield node.body
+        latch = self.builder.block
+        next_index = self.builder.add(index, ir.Constant(index.type, 1), name=f"{node.variable.name}.next", flags=('nsw',))
+        more = self.builder.icmp_signed("<", index if inclusive else next_index, end)
+        branch = self.branch(more, body_block, end_block)
+        branch.set_metadata("llvm.loop", self.loop_metadata(node))
+        index.add_incoming(next_index, latch)
+        if accumulator is not None:
+            accumulator.add_incoming(value, latch)
+
+        self.builder.position_at_end(end_block)
+        if accumulator is None:
+            return None
+        result = self.builder.phi(initial.type, name=f"{node.accumulator.name}.result")
+        result.add_incoming(initial, preheader)
+        result.add_incoming(value, latch)
+        return result
 
-        self.symbol_table.enter_scope()
+    # Every conditional branch of the source is a profile site: instrumented
+    # code counts where it goes, and recorded counts become its weights.
+    def branch(self, condition: ir.Value, first: ir.Block, second: ir.Block) -> ir.Instruction:
+        site = self.branch_site
+        self.branch_site += 1
+        if self.counters is not None:
+            i64 = ir.IntType(64)
+            self.count(self.builder.select(condition, ir.Constant(i64, 1 + 2 * site), ir.Constant(i64, 2 + 2 * site)))
+
+        instruction = self.builder.cbranch(condition, first, second)
+        weights = self.function_profile.branch_weights(site) if self.function_profile is not None else None
+        if weights is not None:
+            instruction.set_metadata("prof", self.module.add_metadata(
+                [ir.MetaDataString(self.module, "branch_weights")] + [ir.Constant(ir.IntType(32), w) for w in weights]))
+        return instruction
+
+    def add_counters(self, node: FunctionDeclaration) -> ir.GlobalVariable:
+        counters_type = ir.ArrayType(ir.IntType(64), counter_count(node))
+        counters = ir.GlobalVariable(self.module, counters_type, counters_name(node))
+        counters.initializer = ir.Constant(counters_type, None)
+        return counters
+
+    def count(self, index: ir.Value):
+        counter = self.builder.gep(self.counters, [ir.Constant(ir.IntType(32), 0), index], inbounds=True)
+        self.builder.store(self.builder.add(self.builder.load(counter), ir.Constant(ir.IntType(64), 1)), counter)
+
+    # Entry counts let LLVM tell hot functions and call sites, which it
+    # inlines more eagerly, from cold ones, which it optimizes for size.
+    def add_entry_count(self, function: ir.Function, profile):
+        function.set_metadata("prof", self.module.add_metadata(
+            [ir.MetaDataString(self.module, "function_entry_count"), ir.Constant(ir.IntType(64), profile.entry)]))
+        if profile.entry == 0:
+            function.attributes.add('cold')
+        if self.profile_summary is None and profile.summary.total > 0:
+            self.add_profile_summary(profile.summary)
+
+    def add_profile_summary(self, summary: ProfileSummary):
+        self.profile_summary = summary
+        i32, i64 = ir.IntType(32), ir.IntType(64)
+
+        def entry(name, value):
+            return self.module.add_metadata([ir.MetaDataString(self.module, name), value])
+
+        detailed = self.module.add_metadata([
+            self.module.add_metadata([ir.Constant(i32, cutoff), ir.Constant(i64, min_count), ir.Constant(i32, count)])
+            for cutoff, min_count, count in summary.detailed])
+        node = self.module.add_metadata([
+            self.module.add_metadata([ir.MetaDataString(self.module, "ProfileFormat"), ir.MetaDataString(self.module, "InstrProf")]),
+            entry("TotalCount", ir.Constant(i64, summary.total)),
+            entry("MaxCount", ir.Constant(i64, summary.max_count)),
+            entry("MaxInternalCount", ir.Constant(i64, summary.max_internal_count)),
+            entry("MaxFunctionCount", ir.Constant(i64, summary.max_function_count)),
+            entry("NumCounts", ir.Constant(i64, summary.count)),
+            entry("NumFunctions", ir.Constant(i64, summary.function_count)),
+            entry("DetailedSummary", detailed),
+        ])
+        # Behavior 1 makes linking units with different summaries an error.
+        self.module.add_named_metadata("llvm.module.flags", [
+            ir.Constant(i32, 1), ir.MetaDataString(self.module, "ProfileSummary"), node])
+
+    def loop_hints(self, node: ForExpression) -> List[list]:
+        # Every loop terminates, so LLVM may delete one whose result is unused.
+        hints = [["llvm.loop.mustprogress"]]
+        # Vectorizing a Float reduction reorders its operations, which only
+        # fast-math allows.
+        if is_reduction(node) and (node.value_type != FLOAT or 'fast' in self.float_flags):
+            hints.append(["llvm.loop.vectorize.enable", ir.Constant(ir.IntType(1), 1)])
+
+        return hints
+
+    def loop_metadata(self, node: ForExpression) -> ir.MDValue:
+        # A loop ID refers to itself first, which keeps the IDs of loops with
+        # the same hints apart. add_metadata cannot build such a cycle.
+        loop_id = ir.values.MDValue(self.module, [], str(len(self.module.metadata)))
+        loop_id.operands = (loop_id,) + tuple(
+            self.module.add_metadata([ir.MetaDataString(self.module, name)] + values)
+            for name, *values in self.loop_hints(node))
+        return loop_id
+
+    def short_circuit(self, node: BinaryExpression):
+        left = yield node.left
+        left_block = self.builder.block
+
+        function = self.builder.function
+        rhs_block = function.append_basic_block("and.rhs" if node.operator == "&&" else "or.rhs")
+        end_block = function.append_basic_block("and.end" if node.operator == "&&" else "or.end")
+        if node.operator == "&&":
+            self.branch(left, rhs_block, end_block)
+        else:
+            self.branch(left, end_block, rhs_block)
 
-        for statement in node.statements:
-            self.visit(statement)
+        self.builder.position_at_end(rhs_block)
+        right = yield node.right
+        rhs_end_block = self.builder.block
+        self.builder.branch(end_block)
 
-        self.symbol_table.exit_scope()
+        self.builder.position_at_end(end_block)
+        phi = self.builder.phi(ir.IntType(1))
+        phi.add_incoming(ir.Constant(ir.IntType(1), 0 if node.operator == "&&" else 1), left_block)
+        phi.add_incoming(right, rhs_end_block)
+        return phi
 
     def visit_BinaryExpression(self, node: BinaryExpression):
-        left = self.visit(node.left)
-        right = self.visit(node.right)
+        if node.operator in ("&&", "||"):
+            return (yield from self.short_circuit(node))
 
+        left = yield node.left
+        right = yield node.right
+
+        if node.left.value_type == FLOAT:
+            return self.float_operation(node.operator, left, right)
         if node.operator == "+":
             return self.builder.add(left, right)
         elif node.operator == "-":
@@ -136,22 +563,62 @@ class LLVMIRGenerator:
             return self.builder.mul(left, right)
         elif node.operator == "/":
             return self.builder.sdiv(left, right)
+        elif node.operator == "%":
+            return self.builder.srem(left, right)
+        elif node.operator in ("==", "!=", "<", "<=", ">", ">="):
+            return self.builder.icmp_signed(node.operator, left, right)
+
+    def float_operation(self, operator: str, left: ir.Value, right: ir.Value) -> ir.Value:
+        flags = self.float_flags
+        if operator == "+":
+            return self.builder.fadd(left, right, flags=flags)
+        elif operator == "-":
+            return self.builder.fsub(left, right, flags=flags)
+        elif operator == "*":
+            return self.builder.fmul(left, right, flags=flags)
+        elif operator == "/":
+            return self.builder.fdiv(left, right, flags=flags)
+        elif operator == "%":
+            return self.builder.frem(left, right, flags=flags)
+        # != is also true when either side is NaN, like in C.
+        elif operator == "!=":
+            return self.builder.fcmp_unordered(operator, left, right, flags=flags)
+        elif operator in ("==", "<", "<=", ">", ">="):
+            return self.builder.fcmp_ordered(operator, left, right, flags=flags)
+
+    def visit_UnaryExpression(self, node: UnaryExpression):
+        value = yield node.expression
+
+        if node.operator == "-" and node.value_type == FLOAT:
+            return self.builder.fneg(value, flags=self.float_flags)
+        elif node.operator == "-":
+            return self.builder.neg(value)
+        elif node.operator == "!":
+            return self.builder.not_(value)
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        return self.locals[node.slot]
 
     def visit_LiteralExpression(self, node: LiteralExpression):
         if node.literal_type == TokenType.INTEGER_LITERAL:
             return ir.Constant(ir.IntType(64), int(node.value))
         elif node.literal_type == TokenType.FLOAT_LITERAL:
-            return ir.Constant(ir.FloatType(), float(node.value))
+            return ir.Constant(ir.DoubleType(), float(node.value))
         elif node.literal_type == TokenType.BOOLEAN_LITERAL:
             return ir.Constant(ir.IntType(1), 1 if node.value == True else 0)
         else:
             raise RuntimeError(f"Unexpected literal type: {node.literal_type}")
 
-    def run_function(self, engine):
-        main_function = self.module.get_global('main')
-        if not main_function:
+    def optimized_module(self, opt_level: int = 0, target_cpu: Optional[str] = None) -> llvm.ModuleRef:
+        target_machine = create_target_machine(opt_level, cpu=target_cpu)
+        llvm_module = create_llvm_module(self.module)
+        optimize(llvm_module, opt_level, target_machine)
+        return llvm_module
+
+    def run_function(self, jit: JIT):
+        if self.main_function is None:
             raise RuntimeError("main function not found in the module")
+        if len(self.main_function.args) != 0:
+            raise RuntimeError("main function must not take arguments")
 
-        func_ptr = engine.get_function_address(str(main_function.name))
-        cfunc = ctypes.CFUNCTYPE(None)(func_ptr)
-        cfunc()
+        return jit.call(self.main_function)
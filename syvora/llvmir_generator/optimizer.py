@@ -0,0 +1,34 @@
+from llvmlite import binding as llvm
+from llvmlite import ir
+from .options import OPT_LEVELS
+
+
+def create_llvm_module(module: ir.Module) -> llvm.ModuleRef:
+    llvm_module = llvm.parse_assembly(str(module))
+    llvm_module.verify()
+    return llvm_module
+
+
+def create_pipeline_tuning_options(opt_level: int) -> llvm.PipelineTuningOptions:
+    if opt_level not in OPT_LEVELS:
+        raise ValueError(f"Unknown optimization level: {opt_level}")
+
+    # Mirrors the defaults clang picks for -O1..-O3.
+    pto = llvm.create_pipeline_tuning_options(speed_level=opt_level)
+    pto.loop_unrolling = opt_level >= 2
+    pto.loop_interleaving = opt_level >= 2
+    pto.loop_vectorization = opt_level >= 2
+    pto.slp_vectorization = opt_level >= 2
+    pto.inlining_threshold = 250 if opt_level >= 3 else 225
+    return pto
+
+
+def optimize(llvm_module: llvm.ModuleRef, opt_level: int, target_machine: llvm.TargetMachine) -> None:
+    llvm_module.triple = target_machine.triple
+    llvm_module.data_layout = str(target_machine.target_data)
+
+    # The default O1-O3 pipelines include SROA/mem2reg, instcombine, GVN,
+    # the CGSCC inliner and the loop pass pipeline.
+    pto = create_pipeline_tuning_options(opt_level)
+    pass_builder = llvm.create_pass_builder(target_machine, pto)
+    pass_builder.getModulePassManager().run(llvm_module, pass_builder)
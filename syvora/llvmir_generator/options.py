@@ -0,0 +1,4 @@
+# Defaults the command line needs before anything imports llvmlite.
+OPT_LEVELS = [0, 1, 2, 3]
+
+DEFAULT_CHUNK_SIZE = 64
@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from llvmlite import binding as llvm
+from syvora.ast_creator import FunctionDeclaration, Module
+from syvora.ast_creator.fingerprint import iter_function_calls
+from syvora.semantic import builtin_functions, resolve
+from .incremental import generate_runtime_unit
+from .llvmir_generator import LLVMIRGenerator
+from .optimizer import create_llvm_module, optimize
+from .options import DEFAULT_CHUNK_SIZE
+from .target import create_target_machine
+
+
+def signature_only(function: FunctionDeclaration) -> FunctionDeclaration:
+    return FunctionDeclaration(function.name, function.arguments, function.return_type, None)
+
+
+def partition(functions: List[FunctionDeclaration], chunk_size: int) -> List[List[FunctionDeclaration]]:
+    # Chunks depend only on the chunk size, never on the worker count, so the
+    # linked module is identical however many workers produced it.
+    return [functions[i:i + chunk_size] for i in range(0, len(functions), chunk_size)]
+
+
+def generate_chunk(functions: List[FunctionDeclaration], function_table: Dict[int, FunctionDeclaration], opt_level: int, target_cpu: Optional[str] = None) -> bytes:
+    generator = LLVMIRGenerator(function_table)
+    generator.add_runtime(declare_only=True)
+    for function in functions:
+        generator.visit(function)
+
+    llvm_module = create_llvm_module(generator.module)
+    optimize(llvm_module, opt_level, create_target_machine(opt_level, cpu=target_cpu))
+    return llvm_module.as_bitcode()
+
+
+class ParallelCompiler:
+    def __init__(self, jobs: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, opt_level: int = 0, target_cpu: Optional[str] = None):
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.opt_level = opt_level
+        self.target_cpu = target_cpu
+
+    # The slice of the function table a chunk needs: its own functions, the
+    # builtins plus signature-only copies of the functions it calls in other
+    # chunks.
+    def chunk_function_table(self, chunk: List[FunctionDeclaration], slots: Dict[int, int], function_table: List[FunctionDeclaration]) -> Dict[int, FunctionDeclaration]:
+        table = dict(enumerate(builtin_functions))
+        table.update({slots[id(function)]: function for function in chunk})
+        for function in chunk:
+            for call in iter_function_calls(function.body):
+                if call.slot not in table:
+                    table[call.slot] = signature_only(function_table[call.slot])
+        return table
+
+    def compile(self, module: Module) -> llvm.ModuleRef:
+        if module.function_table is None:
+            resolve(module)
+        slots = {id(function): slot for slot, function in enumerate(module.function_table)}
+        chunks = partition(module.functions, self.chunk_size)
+        tables = [self.chunk_function_table(chunk, slots, module.function_table) for chunk in chunks]
+
+        linked = create_llvm_module(generate_runtime_unit().module)
+        optimize(linked, self.opt_level, create_target_machine(self.opt_level, cpu=self.target_cpu))
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            bitcodes = executor.map(
+                generate_chunk, chunks, tables, [self.opt_level] * len(chunks), [self.target_cpu] * len(chunks))
+            for bitcode in bitcodes:
+                linked.link_in(llvm.parse_bitcode(bitcode))
+
+        linked.verify()
+        return linked
@@ -0,0 +1,191 @@
+import ctypes
+import hashlib
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+from syvora.ast_creator import function_fingerprint
+from syvora.ast_creator.ast_nodes import *
+
+
+PROFILE_VERSION = 1
+
+# The shares of all counts, in millionths, the summary gives the smallest
+# count needed to reach for. LLVM takes counts within the top 99% as hot and
+# those beyond 99.9999% as cold.
+SUMMARY_CUTOFFS = (10000, 100000, 200000, 300000, 400000, 500000, 600000, 700000,
+                   800000, 900000, 950000, 990000, 999000, 999900, 999990, 999999)
+
+MAX_BRANCH_WEIGHT = 0xFFFFFFFF
+
+
+# The conditional branches code generation emits for a function, which are
+# what an instrumented function counts besides its calls: one per if and per
+# short-circuit operator, a guard and a back edge per for.
+def count_branch_sites(function: FunctionDeclaration) -> int:
+    sites = 0
+    stack = [function.body]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, IfExpression):
+            sites += 1
+        elif isinstance(value, BinaryExpression) and value.operator in ("&&", "||"):
+            sites += 1
+        elif isinstance(value, ForExpression):
+            sites += 2
+        if isinstance(value, ASTNode):
+            stack.extend(child for _, child in iter_fields(value))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return sites
+
+
+# An instrumented function counts into a global array: its calls first, then
+# how often each branch site went to its first and to its second successor.
+def counters_name(function: FunctionDeclaration) -> str:
+    return f"{function.low_level_func_name()}.profile"
+
+
+def counter_count(function: FunctionDeclaration) -> int:
+    return 1 + 2 * count_branch_sites(function)
+
+
+# Counts only apply to the exact tree they were recorded for.
+def profile_hash(function: FunctionDeclaration) -> str:
+    return function_fingerprint(function, {})
+
+
+# What LLVM's ProfileSummaryInfo derives hot and cold thresholds from.
+class ProfileSummary:
+    def __init__(self, function_counts: List[int], branch_counts: List[int]):
+        counts = sorted(function_counts + branch_counts, reverse=True)
+        self.total = sum(counts)
+        self.max_count = counts[0] if len(counts) > 0 else 0
+        self.max_internal_count = max(branch_counts, default=0)
+        self.max_function_count = max(function_counts, default=0)
+        self.count = len(counts)
+        self.function_count = len(function_counts)
+
+        # (cutoff, smallest count, how many counts) per cutoff.
+        self.detailed: List[Tuple[int, int, int]] = []
+        covered = 0
+        i = 0
+        for cutoff in SUMMARY_CUTOFFS:
+            desired = -(-self.total * cutoff // 1000000)
+            while i < len(counts) and covered < desired:
+                covered += counts[i]
+                i += 1
+            self.detailed.append((cutoff, counts[i - 1] if i > 0 else 0, i))
+
+    def key(self) -> str:
+        return json.dumps([self.total, self.max_count, self.max_internal_count, self.max_function_count,
+                           self.count, self.function_count, self.detailed])
+
+
+class FunctionProfile:
+    # branches holds a [first successor, second successor] pair per site, in
+    # the order code generation emits them.
+    def __init__(self, entry: int, branches: List[List[int]], summary: ProfileSummary):
+        self.entry = entry
+        self.branches = branches
+        self.summary = summary
+
+    # branch_weights are 32-bit, so large counts are scaled down. They are
+    # not padded like clang's: LLVM estimates a loop's trip count from the
+    # ratio of its back edge to its exit, which padding would skew for loops
+    # entered rarely.
+    def branch_weights(self, site: int) -> Optional[Tuple[int, int]]:
+        first, second = self.branches[site]
+        if first + second == 0:
+            return None
+        scale = max(first, second) // MAX_BRANCH_WEIGHT + 1
+        return first // scale, second // scale
+
+    def key(self) -> str:
+        data = json.dumps([self.entry, self.branches, self.summary.key()])
+        return hashlib.sha256(data.encode()).hexdigest()
+
+
+def is_count(value) -> bool:
+    return type(value) is int and value >= 0
+
+
+# What read_profile writes for a function.
+def is_record(record) -> bool:
+    return (isinstance(record, dict) and isinstance(record.get("hash"), str) and is_count(record.get("entry"))
+            and isinstance(record.get("branches"), list)
+            and all(isinstance(branch, list) and len(branch) == 2 and all(map(is_count, branch))
+                    for branch in record["branches"]))
+
+
+# Counts of an instrumented run by function, keyed by low-level name.
+class Profile:
+    def __init__(self, functions: Dict[str, dict]):
+        self.functions = functions
+        self.summary = ProfileSummary(
+            [record["entry"] for record in functions.values()],
+            [count for record in functions.values() for branch in record["branches"] for count in branch])
+
+    @staticmethod
+    def load(path: str) -> 'Profile':
+        malformed = ValueError(f"{path}: not a profile written by run --profile-generate")
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except OSError as error:
+            raise ValueError(f"{path}: cannot read the profile: {error.strerror}") from None
+        except ValueError:
+            raise malformed from None
+        if not isinstance(data, dict):
+            raise malformed
+        if data.get("version") != PROFILE_VERSION:
+            raise ValueError(f"{path}: unsupported profile version {data.get('version')}")
+        functions = data.get("functions")
+        if not isinstance(functions, dict) or not all(is_record(record) for record in functions.values()):
+            raise malformed
+        return Profile(functions)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({"version": PROFILE_VERSION, "functions": self.functions}, file)
+
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps(self.functions, sort_keys=True).encode()).hexdigest()
+
+    # Attaches counts to every function the profile has current ones for and
+    # returns the names of the functions that changed since it was recorded.
+    def apply(self, functions: List[FunctionDeclaration]) -> List[str]:
+        stale = []
+        for function in functions:
+            name = function.low_level_func_name()
+            record = self.functions.get(name)
+            if record is None:
+                continue
+            if record["hash"] != profile_hash(function) or len(record["branches"]) != count_branch_sites(function):
+                stale.append(name)
+                continue
+            function.profile = FunctionProfile(record["entry"], record["branches"], self.summary)
+        return stale
+
+
+# Collects the counters of instrumented functions from the JIT that ran them.
+def read_profile(jit, functions: List[FunctionDeclaration]) -> Profile:
+    records = {}
+    for function in functions:
+        if not function.instrumented:
+            continue
+        address = jit.engine.get_global_value_address(counters_name(function))
+        if address == 0:
+            continue
+        counters = (ctypes.c_uint64 * counter_count(function)).from_address(address)
+        records[function.low_level_func_name()] = {
+            "hash": profile_hash(function),
+            "entry": counters[0],
+            "branches": [[counters[1 + 2 * site], counters[2 + 2 * site]]
+                         for site in range(count_branch_sites(function))],
+        }
+    return Profile(records)
+
+
+def use_profile(profile: Profile, functions: List[FunctionDeclaration]) -> None:
+    for name in profile.apply(functions):
+        print(f"syvora: the profile of {name} is out of date and is ignored", file=sys.stderr)
@@ -0,0 +1,386 @@
+from typing import Dict
+import llvmlite.ir as ir
+from syvora.semantic import BOOL, FLOAT, INT
+
+
+# Bump whenever the runtime or the way generated code calls into it changes,
+# so that cached units are rebuilt against the new one.
+RUNTIME_VERSION = 1
+
+OUTPUT_BUFFER_SIZE = 1 << 16
+# The longest line a print can add: a sign, 17 integer digits, a point, 6
+# fraction digits, an exponent of up to 5 characters and the newline.
+MAX_LINE = 64
+FRACTION_DIGITS = 6
+# Floats outside of this range are printed as mantissa and exponent.
+SCIENTIFIC_BELOW = 1e-4
+SCIENTIFIC_FROM = 1e16
+
+FLUSH = "syvora_flush"
+PRINT_FUNCTIONS = {
+    INT: "syvora_print_int",
+    FLOAT: "syvora_print_float",
+    BOOL: "syvora_print_bool",
+}
+
+i1 = ir.IntType(1)
+i8 = ir.IntType(8)
+i32 = ir.IntType(32)
+i64 = ir.IntType(64)
+double = ir.DoubleType()
+byte_pointer = i8.as_pointer()
+
+
+def constant(t: ir.Type, value) -> ir.Constant:
+    return ir.Constant(t, value)
+
+
+def declare_runtime(module: ir.Module) -> Dict[str, ir.Function]:
+    types = {INT: i64, FLOAT: double, BOOL: i1}
+    return {name: ir.Function(module, ir.FunctionType(ir.VoidType(), [types[name]]), function_name)
+            for name, function_name in PRINT_FUNCTIONS.items()}
+
+
+# Emits the runtime that print lowers to. Values are formatted by hand into a
+# single output buffer, which is written to fd 1 when it fills up, when the
+# program's caller flushes it and, in native builds, at exit.
+class RuntimeBuilder:
+    def __init__(self, module: ir.Module):
+        self.module = module
+
+        buffer_type = ir.ArrayType(i8, OUTPUT_BUFFER_SIZE)
+        self.buffer = ir.GlobalVariable(module, buffer_type, "syvora.output")
+        self.buffer.linkage = 'internal'
+        self.buffer.initializer = ir.Constant(buffer_type, None)
+        self.length = ir.GlobalVariable(module, i64, "syvora.output.length")
+        self.length.linkage = 'internal'
+        self.length.initializer = constant(i64, 0)
+
+        self.write = ir.Function(module, ir.FunctionType(i64, [i32, byte_pointer, i64]), "write")
+
+    def internal_function(self, name: str, return_type: ir.Type, argument_types) -> ir.Function:
+        function = ir.Function(self.module, ir.FunctionType(return_type, argument_types), name)
+        function.linkage = 'internal'
+        return function
+
+    def build(self) -> Dict[str, ir.Function]:
+        self.flush = self.build_flush()
+        self.reserve = self.build_reserve()
+        self.digit_count = self.build_digit_count()
+        self.put_digits = self.build_put_digits()
+        functions = declare_runtime(self.module)
+        self.build_print_int(functions[INT])
+        self.build_print_float(functions[FLOAT])
+        self.build_print_bool(functions[BOOL])
+        self.add_destructor(self.flush)
+        return functions
+
+    def byte_at(self, builder: ir.IRBuilder, pointer: ir.Value, offset: ir.Value) -> ir.Value:
+        return builder.gep(pointer, [offset], inbounds=True)
+
+    def put_char(self, builder: ir.IRBuilder, pointer: ir.Value, offset: ir.Value, char: str):
+        builder.store(constant(i8, ord(char)), self.byte_at(builder, pointer, offset))
+
+    # Only used for a few short words, so stores beat a memcpy.
+    def put_string(self, builder: ir.IRBuilder, pointer: ir.Value, text: str) -> ir.Value:
+        for i, char in enumerate(text):
+            self.put_char(builder, pointer, constant(i64, i), char)
+        return constant(i64, len(text))
+
+    def advance(self, builder: ir.IRBuilder, count: ir.Value):
+        builder.store(builder.add(builder.load(self.length), count), self.length)
+
+    # Writes the whole buffer out, retrying short writes, and empties it. What
+    # cannot be written is dropped, like stdio does on errors.
+    def build_flush(self) -> ir.Function:
+        function = ir.Function(self.module, ir.FunctionType(ir.VoidType(), []), FLUSH)
+        entry = function.append_basic_block("entry")
+        loop = function.append_basic_block("write")
+        written = function.append_basic_block("written")
+        done = function.append_basic_block("done")
+
+        builder = ir.IRBuilder(entry)
+        length = builder.load(self.length)
+        builder.cbranch(builder.icmp_signed(">", length, constant(i64, 0)), loop, done)
+
+        builder.position_at_end(loop)
+        offset = builder.phi(i64, "offset")
+        offset.add_incoming(constant(i64, 0), entry)
+        start = builder.gep(self.buffer, [constant(i32, 0), offset], inbounds=True)
+        count = builder.call(self.write, [constant(i32, 1), start, builder.sub(length, offset)])
+        builder.cbranch(builder.icmp_signed(">", count, constant(i64, 0)), written, done)
+
+        builder.position_at_end(written)
+        next_offset = builder.add(offset, count)
+        offset.add_incoming(next_offset, written)
+        builder.cbranch(builder.icmp_signed("<", next_offset, length), loop, done)
+
+        builder.position_at_end(done)
+        builder.store(constant(i64, 0), self.length)
+        builder.ret_void()
+        return function
+
+    # Returns where the next line goes, flushing first unless MAX_LINE bytes
+    # are still free.
+    def build_reserve(self) -> ir.Function:
+        function = self.internal_function("syvora.reserve", byte_pointer, [])
+        entry = function.append_basic_block("entry")
+        full = function.append_basic_block("full")
+        ready = function.append_basic_block("ready")
+
+        builder = ir.IRBuilder(entry)
+        length = builder.load(self.length)
+        builder.cbranch(builder.icmp_signed(">", length, constant(i64, OUTPUT_BUFFER_SIZE - MAX_LINE)), full, ready)
+
+        builder.position_at_end(full)
+        builder.call(self.flush, [])
+        builder.branch(ready)
+
+        builder.position_at_end(ready)
+        offset = builder.phi(i64)
+        offset.add_incoming(length, entry)
+        offset.add_incoming(constant(i64, 0), full)
+        builder.ret(builder.gep(self.buffer, [constant(i32, 0), offset], inbounds=True))
+        return function
+
+    # The number of decimal digits of an unsigned value, at least one.
+    def build_digit_count(self) -> ir.Function:
+        function = self.internal_function("syvora.digit_count", i64, [i64])
+        value = function.args[0]
+        entry = function.append_basic_block("entry")
+        loop = function.append_basic_block("count")
+        done = function.append_basic_block("done")
+
+        builder = ir.IRBuilder(entry)
+        first_rest = builder.udiv(value, constant(i64, 10))
+        builder.branch(loop)
+
+        builder.position_at_end(loop)
+        count = builder.phi(i64, "count")
+        rest = builder.phi(i64, "rest")
+        count.add_incoming(constant(i64, 1), entry)
+        rest.add_incoming(first_rest, entry)
+        count.add_incoming(builder.add(count, constant(i64, 1)), loop)
+        rest.add_incoming(builder.udiv(rest, constant(i64, 10)), loop)
+        builder.cbranch(builder.icmp_unsigned("!=", rest, constant(i64, 0)), loop, done)
+
+        builder.position_at_end(done)
+        builder.ret(count)
+        return function
+
+    # Writes the lowest width decimal digits of an unsigned value, padded with
+    # zeros, from the last digit backwards.
+    def build_put_digits(self) -> ir.Function:
+        function = self.internal_function("syvora.put_digits", ir.VoidType(), [byte_pointer, i64, i64])
+        output, value, width = function.args
+        entry = function.append_basic_block("entry")
+        loop = function.append_basic_block("digit")
+        done = function.append_basic_block("done")
+
+        builder = ir.IRBuilder(entry)
+        builder.branch(loop)
+
+        builder.position_at_end(loop)
+        index = builder.phi(i64, "index")
+        rest = builder.phi(i64, "rest")
+        index.add_incoming(width, entry)
+        rest.add_incoming(value, entry)
+        position = builder.sub(index, constant(i64, 1))
+        digit = builder.trunc(builder.urem(rest, constant(i64, 10)), i8)
+        builder.store(builder.add(digit, constant(i8, ord("0"))), self.byte_at(builder, output, position))
+        index.add_incoming(position, loop)
+        rest.add_incoming(builder.udiv(rest, constant(i64, 10)), loop)
+        builder.cbranch(builder.icmp_unsigned("!=", position, constant(i64, 0)), loop, done)
+
+        builder.position_at_end(done)
+        builder.ret_void()
+        return function
+
+    # A '-' is always written first and overwritten by the first digit of a
+    # non-negative value, which saves a branch.
+    def put_sign(self, builder: ir.IRBuilder, output: ir.Value, negative: ir.Value) -> ir.Value:
+        self.put_char(builder, output, constant(i64, 0), "-")
+        return builder.zext(negative, i64)
+
+    def put_number(self, builder: ir.IRBuilder, output: ir.Value, offset: ir.Value, value: ir.Value) -> ir.Value:
+        count = builder.call(self.digit_count, [value])
+        builder.call(self.put_digits, [self.byte_at(builder, output, offset), value, count])
+        return builder.add(offset, count)
+
+    def finish_line(self, builder: ir.IRBuilder, output: ir.Value, end: ir.Value):
+        self.put_char(builder, output, end, "\n")
+        self.advance(builder, builder.add(end, constant(i64, 1)))
+        builder.ret_void()
+
+    def build_print_int(self, function: ir.Function):
+        value = function.args[0]
+        builder = ir.IRBuilder(function.append_basic_block("entry"))
+        output = builder.call(self.reserve, [])
+
+        negative = builder.icmp_signed("<", value, constant(i64, 0))
+        offset = self.put_sign(builder, output, negative)
+        # Negating as unsigned also gets the magnitude of the smallest Int right.
+        magnitude = builder.select(negative, builder.sub(constant(i64, 0), value), value)
+        self.finish_line(builder, output, self.put_number(builder, output, offset, magnitude))
+
+    def build_print_bool(self, function: ir.Function):
+        value = function.args[0]
+        entry = function.append_basic_block("entry")
+        true_block = function.append_basic_block("true")
+        false_block = function.append_basic_block("false")
+
+        builder = ir.IRBuilder(entry)
+        output = builder.call(self.reserve, [])
+        builder.cbranch(value, true_block, false_block)
+
+        for block, text in [(true_block, "true\n"), (false_block, "false\n")]:
+            builder.position_at_end(block)
+            self.advance(builder, self.put_string(builder, output, text))
+            builder.ret_void()
+
+    # Prints the integer part, a point and up to six rounded fraction digits
+    # without trailing zeros, e.g. 2.5, 3.0 or 0.333333; numbers below 1e-4 or
+    # from 1e16 on as a mantissa in [1, 10) followed by e and the exponent.
+    def build_print_float(self, function: ir.Function):
+        value = function.args[0]
+        block = function.append_basic_block
+        entry = block("entry")
+        nan_block = block("nan")
+        number = block("number")
+        inf_block = block("inf")
+        finite = block("finite")
+        down_head, down_body = block("scale.down"), block("scale.down.body")
+        up_head, up_body = block("scale.up"), block("scale.up.body")
+        format_block = block("format")
+        trim_head, trim_body = block("trim"), block("trim.body")
+        fraction_block = block("fraction")
+        exponent_block = block("exponent")
+        finish = block("finish")
+
+        builder = ir.IRBuilder(entry)
+        output = builder.call(self.reserve, [])
+        builder.cbranch(builder.fcmp_unordered("uno", value, value), nan_block, number)
+
+        builder.position_at_end(nan_block)
+        self.advance(builder, self.put_string(builder, output, "nan\n"))
+        builder.ret_void()
+
+        builder.position_at_end(number)
+        negative = builder.fcmp_ordered("<", value, constant(double, 0.0))
+        offset = self.put_sign(builder, output, negative)
+        magnitude = builder.select(negative, builder.fneg(value), value)
+        builder.cbranch(builder.fcmp_ordered("==", magnitude, constant(double, float("inf"))), inf_block, finite)
+
+        builder.position_at_end(inf_block)
+        length = self.put_string(builder, self.byte_at(builder, output, offset), "inf\n")
+        self.advance(builder, builder.add(offset, length))
+        builder.ret_void()
+
+        builder.position_at_end(finite)
+        scientific = builder.and_(
+            builder.fcmp_ordered("!=", magnitude, constant(double, 0.0)),
+            builder.or_(builder.fcmp_ordered("<", magnitude, constant(double, SCIENTIFIC_BELOW)),
+                        builder.fcmp_ordered(">=", magnitude, constant(double, SCIENTIFIC_FROM))))
+        builder.cbranch(scientific, down_head, format_block)
+
+        # Bring the mantissa into [1, 10) one power of ten at a time.
+        builder.position_at_end(down_head)
+        down_mantissa = builder.phi(double)
+        down_exponent = builder.phi(i64)
+        down_mantissa.add_incoming(magnitude, finite)
+        down_exponent.add_incoming(constant(i64, 0), finite)
+        builder.cbranch(builder.fcmp_ordered(">=", down_mantissa, constant(double, 10.0)), down_body, up_head)
+
+        builder.position_at_end(down_body)
+        down_mantissa.add_incoming(builder.fdiv(down_mantissa, constant(double, 10.0)), down_body)
+        down_exponent.add_incoming(builder.add(down_exponent, constant(i64, 1)), down_body)
+        builder.branch(down_head)
+
+        builder.position_at_end(up_head)
+        up_mantissa = builder.phi(double)
+        up_exponent = builder.phi(i64)
+        up_mantissa.add_incoming(down_mantissa, down_head)
+        up_exponent.add_incoming(down_exponent, down_head)
+        builder.cbranch(builder.fcmp_ordered("<", up_mantissa, constant(double, 1.0)), up_body, format_block)
+
+        builder.position_at_end(up_body)
+        up_mantissa.add_incoming(builder.fmul(up_mantissa, constant(double, 10.0)), up_body)
+        up_exponent.add_incoming(builder.sub(up_exponent, constant(i64, 1)), up_body)
+        builder.branch(up_head)
+
+        builder.position_at_end(format_block)
+        mantissa = builder.phi(double)
+        exponent = builder.phi(i64)
+        mantissa.add_incoming(magnitude, finite)
+        exponent.add_incoming(constant(i64, 0), finite)
+        mantissa.add_incoming(up_mantissa, up_head)
+        exponent.add_incoming(up_exponent, up_head)
+
+        scale = 10 ** FRACTION_DIGITS
+        integer = builder.fptoui(mantissa, i64)
+        fraction = builder.fsub(mantissa, builder.uitofp(integer, double))
+        scaled = builder.fptoui(
+            builder.fadd(builder.fmul(fraction, constant(double, float(scale))), constant(double, 0.5)), i64)
+        # Rounding the fraction up may carry into the integer part, and a
+        # mantissa may round up to 10.
+        carry = builder.icmp_unsigned(">=", scaled, constant(i64, scale))
+        integer = builder.select(carry, builder.add(integer, constant(i64, 1)), integer)
+        scaled = builder.select(carry, builder.sub(scaled, constant(i64, scale)), scaled)
+        renormalize = builder.and_(scientific, builder.icmp_unsigned("==", integer, constant(i64, 10)))
+        integer = builder.select(renormalize, constant(i64, 1), integer)
+        exponent = builder.select(renormalize, builder.add(exponent, constant(i64, 1)), exponent)
+
+        point = self.put_number(builder, output, offset, integer)
+        self.put_char(builder, output, point, ".")
+        fraction_start = builder.add(point, constant(i64, 1))
+        builder.branch(trim_head)
+
+        builder.position_at_end(trim_head)
+        width = builder.phi(i64)
+        digits = builder.phi(i64)
+        width.add_incoming(constant(i64, FRACTION_DIGITS), format_block)
+        digits.add_incoming(scaled, format_block)
+        trailing_zero = builder.and_(
+            builder.icmp_unsigned(">", width, constant(i64, 1)),
+            builder.icmp_unsigned("==", builder.urem(digits, constant(i64, 10)), constant(i64, 0)))
+        builder.cbranch(trailing_zero, trim_body, fraction_block)
+
+        builder.position_at_end(trim_body)
+        width.add_incoming(builder.sub(width, constant(i64, 1)), trim_body)
+        digits.add_incoming(builder.udiv(digits, constant(i64, 10)), trim_body)
+        builder.branch(trim_head)
+
+        builder.position_at_end(fraction_block)
+        builder.call(self.put_digits, [self.byte_at(builder, output, fraction_start), digits, width])
+        fraction_end = builder.add(fraction_start, width)
+        builder.cbranch(scientific, exponent_block, finish)
+
+        builder.position_at_end(exponent_block)
+        self.put_char(builder, output, fraction_end, "e")
+        exponent_output = self.byte_at(builder, output, builder.add(fraction_end, constant(i64, 1)))
+        negative_exponent = builder.icmp_signed("<", exponent, constant(i64, 0))
+        exponent_offset = self.put_sign(builder, exponent_output, negative_exponent)
+        exponent_magnitude = builder.select(negative_exponent, builder.sub(constant(i64, 0), exponent), exponent)
+        exponent_end = self.put_number(builder, exponent_output, exponent_offset, exponent_magnitude)
+        exponent_end = builder.add(exponent_end, builder.add(fraction_end, constant(i64, 1)))
+        builder.branch(finish)
+
+        builder.position_at_end(finish)
+        end = builder.phi(i64)
+        end.add_incoming(fraction_end, fraction_block)
+        end.add_incoming(exponent_end, exponent_block)
+        self.finish_line(builder, output, end)
+
+    # Native builds flush what is left when the program exits. The JIT does
+    # not run destructors and flushes explicitly instead.
+    def add_destructor(self, function: ir.Function):
+        entry_type = ir.LiteralStructType([i32, function.type, byte_pointer])
+        array_type = ir.ArrayType(entry_type, 1)
+        destructors = ir.GlobalVariable(self.module, array_type, "llvm.global_dtors")
+        destructors.linkage = 'appending'
+        destructors.initializer = ir.Constant(array_type, [
+            ir.Constant(entry_type, [constant(i32, 65535), function, ir.Constant(byte_pointer, None)])])
+
+
+def define_runtime(module: ir.Module) -> Dict[str, ir.Function]:
+    return RuntimeBuilder(module).build()
@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List, Set, Tuple
+from llvmlite import binding as llvm
+from syvora.ast_creator import FunctionDeclaration, StructDeclaration
+from syvora.ast_creator.fingerprint import iter_function_calls
+from syvora.semantic import Resolver, builtin_functions
+from .incremental import generate_runtime_unit
+from .llvmir_generator import LLVMIRGenerator
+from .optimizer import create_llvm_module
+from .parallel import signature_only
+
+
+DEFAULT_BATCH_SIZE = 256
+
+
+class StreamingCompiler:
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.resolver = Resolver()
+
+    @property
+    def declarations(self) -> List[FunctionDeclaration]:
+        return self.resolver.function_table[len(builtin_functions):]
+
+    def flush(self, batch: List[Tuple[int, FunctionDeclaration]], linked: llvm.ModuleRef) -> None:
+        function_table = self.resolver.function_table
+        generator = LLVMIRGenerator(function_table)
+        generator.add_runtime(declare_only=True)
+        for _, function in batch:
+            generator.visit(function)
+
+        for slot, function in batch:
+            function_table[slot] = signature_only(function)
+
+        linked.link_in(create_llvm_module(generator.module))
+
+    def compile(self, declarations: Iterable[FunctionDeclaration | StructDeclaration]) -> llvm.ModuleRef:
+        # Batches are lowered into native LLVM modules as soon as they are
+        # parsed, so only signatures outlive their function's batch. A function
+        # that calls functions defined after it waits, whole, until they are
+        # declared. Structs can only be used after they are declared; they are
+        # small and stay.
+        self.resolver = Resolver()
+        linked = create_llvm_module(generate_runtime_unit().module)
+
+        # The names each waiting function still misses, by slot, and the slots
+        # waiting for each name.
+        missing: Dict[int, Set[str]] = {}
+        waiting: Dict[str, List[int]] = {}
+
+        batch: List[Tuple[int, FunctionDeclaration]] = []
+        for function in declarations:
+            if isinstance(function, StructDeclaration):
+                self.resolver.declare_struct(function)
+                self.resolver.visit(function)
+                continue
+            slot = self.resolver.declare(function)
+            names = {call.low_level_func_name() for call in iter_function_calls(function.body)
+                     if self.resolver.symbol_table.lookup(call.low_level_func_name()) is None}
+            ready = []
+            if len(names) > 0:
+                missing[slot] = names
+                for name in names:
+                    waiting.setdefault(name, []).append(slot)
+            else:
+                ready.append(slot)
+            for waiting_slot in waiting.pop(function.low_level_func_name(), []):
+                missing[waiting_slot].discard(function.low_level_func_name())
+                if len(missing[waiting_slot]) == 0:
+                    del missing[waiting_slot]
+                    ready.append(waiting_slot)
+
+            for ready_slot in ready:
+                self.resolver.visit(self.resolver.function_table[ready_slot])
+                batch.append((ready_slot, self.resolver.function_table[ready_slot]))
+            if len(batch) >= self.batch_size:
+                self.flush(batch, linked)
+                batch = []
+        # Resolving a function that still waits reports what it misses.
+        for slot in sorted(missing):
+            self.resolver.visit(self.resolver.function_table[slot])
+        if len(batch) > 0:
+            self.flush(batch, linked)
+
+        linked.verify()
+        return linked
@@ -0,0 +1,73 @@
+from typing import Dict, List
+from syvora.ast_creator.ast_nodes import AccessibleTypeExpression, StructDeclaration
+
+
+# Size and alignment in bytes of the scalars in memory, which are the same on
+# every 64-bit target LLVM supports; a Bool takes a whole byte.
+SCALAR_LAYOUTS = {"Int": (8, 8), "Float": (8, 8), "Bool": (1, 1)}
+
+# The C ABIs of x86-64 and AArch64 pass aggregates of up to two eightbytes in
+# registers and anything larger through memory, so syvora does the same:
+# larger structs are passed as a pointer to the caller's copy and returned
+# through a pointer to where the caller wants them.
+MAX_REGISTER_STRUCT_SIZE = 16
+
+
+def align_to(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+class StructLayout:
+    # order lists the declared indexes of the fields in memory order, and
+    # elements maps every declared index to the field's element index in the
+    # LLVM struct.
+    def __init__(self, order: List[int], offsets: List[int], size: int, alignment: int, field_size: int):
+        self.order = order
+        self.elements = [0] * len(order)
+        for element, index in enumerate(order):
+            self.elements[index] = element
+        self.offsets = offsets
+        self.size = size
+        self.alignment = alignment
+        # The bytes the fields themselves take; the rest is padding.
+        self.field_size = field_size
+
+    @property
+    def padding(self) -> int:
+        return self.size - self.field_size
+
+
+# Lays the fields out in order of decreasing alignment. Every size is a
+# multiple of its alignment, so each field then starts right where the one
+# before it ends and only the tail is padded. Fields with the same alignment
+# keep their declared order.
+def layout_struct(declaration: StructDeclaration, layouts: Dict[str, StructLayout], reorder: bool = True) -> StructLayout:
+    sizes = []
+    alignments = []
+    for field in declaration.fields:
+        size, alignment = field_layout(field.type, layouts, reorder)
+        sizes.append(size)
+        alignments.append(alignment)
+
+    order = list(range(len(declaration.fields)))
+    if reorder:
+        order.sort(key=lambda index: -alignments[index])
+
+    offsets = [0] * len(order)
+    offset = 0
+    for index in order:
+        offset = align_to(offset, alignments[index])
+        offsets[index] = offset
+        offset += sizes[index]
+    alignment = max(alignments, default=1)
+    return StructLayout(order, offsets, align_to(offset, alignment), alignment, sum(sizes))
+
+
+def field_layout(t: AccessibleTypeExpression, layouts: Dict[str, StructLayout], reorder: bool):
+    if t.declaration is None:
+        return SCALAR_LAYOUTS[t.name]
+    layout = layouts.get(t.name)
+    if layout is None:
+        layout = layout_struct(t.declaration, layouts, reorder)
+        layouts[t.name] = layout
+    return layout.size, layout.alignment
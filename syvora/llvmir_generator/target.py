@@ -0,0 +1,85 @@
+import hashlib
+import os
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+from llvmlite import binding as llvm
+from syvora.build_cache import BuildCache
+
+
+NATIVE_CPU = "native"
+
+_initialized = False
+
+# Generates code for an empty function for the CPU named by argv[1].
+CPU_PROBE = """
+import sys
+from llvmlite import binding as llvm
+llvm.initialize_native_target()
+llvm.initialize_native_asmprinter()
+module = llvm.parse_assembly("define void @probe() {\\n  ret void\\n}\\n")
+module.triple = llvm.get_default_triple()
+llvm.Target.from_default_triple().create_target_machine(cpu=sys.argv[1]).emit_object(module)
+"""
+
+# Verdicts of check_cpu by CPU name, for this process.
+_checked_cpus: Dict[str, bool] = {}
+
+
+def initialize_native_target() -> None:
+    global _initialized
+    if _initialized:
+        return
+
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    _initialized = True
+
+
+def default_triple() -> str:
+    return llvm.get_default_triple()
+
+
+# LLVM only warns about a CPU it does not know, then aborts the process once
+# it generates code for it, so every name is first tried out in a child
+# process. Verdicts are kept in the build cache, keyed by LLVM and triple.
+def check_cpu(cpu: str) -> None:
+    known = _checked_cpus.get(cpu)
+    if known is None:
+        cache = BuildCache(os.path.join(BuildCache().cache_dir, "cpus"))
+        key = hashlib.sha256("\0".join(
+            [".".join(map(str, llvm.llvm_version_info)), default_triple(), cpu]).encode()).hexdigest()
+        verdict = cache.load(key, "cpu")
+        if verdict is None:
+            probe = subprocess.run([sys.executable, "-c", CPU_PROBE, cpu], stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE)
+            verdict = b"0" if probe.returncode != 0 or b"not a recognized processor" in probe.stderr else b"1"
+            cache.store(key, "cpu", verdict)
+        known = _checked_cpus[cpu] = verdict == b"1"
+    if not known:
+        raise ValueError(f"'{cpu}' is not a CPU LLVM can generate code for on {default_triple()}")
+
+
+# The CPU name and features code is generated for: None leaves both to the
+# triple's generic model, "native" asks for the host's, anything else names a
+# CPU LLVM knows.
+def cpu_and_features(cpu: Optional[str] = None) -> Tuple[str, str]:
+    if cpu is None:
+        return "", ""
+    if cpu == NATIVE_CPU:
+        initialize_native_target()
+        return llvm.get_host_cpu_name(), llvm.get_host_cpu_features().flatten()
+    check_cpu(cpu)
+    return cpu, ""
+
+
+# Identifies what cached machine code was generated for.
+def target_key(cpu: Optional[str] = None) -> str:
+    return "/".join((default_triple(),) + cpu_and_features(cpu))
+
+
+def create_target_machine(opt_level: int = 0, reloc: str = "default", cpu: Optional[str] = None) -> llvm.TargetMachine:
+    initialize_native_target()
+    target = llvm.Target.from_default_triple()
+    name, features = cpu_and_features(cpu)
+    return target.create_target_machine(cpu=name, features=features, opt=opt_level, reloc=reloc)
@@ -1,38 +1,397 @@
+import argparse
+import os
 import sys
-from llvmlite import binding as llvm
-from llvmlite.binding.module import parse_assembly
-from .ast_creator import createAst
-from .llvmir_generator import LLVMIRGenerator
+from functools import partial
+from typing import List
+from .ast_creator import FunctionDeclaration, Module, createAst, createFunctionStream, loadAst
+from .ast_creator.lexer import DEFAULT_WINDOW_SIZE
+from .ast_optimizer import fold_constants, mark_memoizable, optimize_ast
+from .ast_optimizer.evaluator import DEFAULT_MAX_DEPTH, DEFAULT_MAX_STEPS
+from .ast_optimizer.memoize import DEFAULT_MEMO_CAPACITY
+from .build_cache import BuildCache
+from .llvmir_generator.options import DEFAULT_CHUNK_SIZE, OPT_LEVELS
+from .project import resolve_module
+from .semantic import check_types
+from .vm import DEFAULT_HOT_THRESHOLD, VM
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: syvora <filename>")
-        return
+# Everything that touches llvmlite is imported inside the commands that need
+# it, so check, ast and interpreted runs never load LLVM.
+COMMANDS = ["check", "ast", "ir", "run", "build", "serve"]
 
-    file_path = sys.argv[1]
-    with open(file_path, "r") as file:
-        source_code = file.read()
 
-    ast = createAst(source_code, file_path)
+# Options that cannot be used together, or with the file given. Reported
+# like argparse's own errors, without a traceback.
+class UsageError(ValueError):
+    pass
 
-    # print(ast)
 
+# Unchanged files are loaded from their serialized tree in ast_cache.
+def read_ast(file_path: str, source_code: str = None, ast_cache: BuildCache = None) -> Module:
+    if source_code is None:
+        return loadAst(file_path, ast_cache)
+
+    return createAst(source_code, file_path)
+
+
+def generate(ast: Module):
+    from .llvmir_generator import LLVMIRGenerator
     llvm_ir_generator = LLVMIRGenerator()
     llvm_ir_generator.visit(ast)
+    return llvm_ir_generator
+
+
+def entry_point(functions: List[FunctionDeclaration]):
+    from .llvmir_generator import LLVMIRGenerator
+    llvm_ir_generator = LLVMIRGenerator()
+    for function in functions:
+        llvm_ir_generator.declare_function(function)
+    return llvm_ir_generator
+
+
+# Returns the LLVM module, whether it still has to go through the pass
+# pipeline and the declarations of the functions it defines. An already parsed
+# ast is used instead of reading args.file, except in --stream mode.
+def lower(args, cache: BuildCache = None, ast: Module = None):
+    profile = load_profile(args)
+    instrument = getattr(args, "profile_generate", None) is not None
+    if args.stream:
+        from .llvmir_generator.streaming import StreamingCompiler
+        if instrument:
+            raise UsageError("--profile-generate does not support --stream")
+        compiler = StreamingCompiler()
+        # Functions are gone by the time the whole module is known, so only
+        # folding applies here. Structs stream past to the compiler as they are.
+        declarations = map(fold_constants, createFunctionStream(args.file, args.window_size))
+        if args.fast_math:
+            declarations = map(partial(functions_only, with_fast_math), declarations)
+        if profile is not None:
+            declarations = map(partial(functions_only, partial(with_profile, profile)), declarations)
+        llvm_module = compiler.compile(declarations)
+        return llvm_module, True, compiler.declarations
+
+    if ast is None:
+        ast = read_ast(args.file, ast_cache=ast_cache(cache, not getattr(args, "no_cache", False)))
+    if len(ast.imports) > 0:
+        if instrument:
+            raise UsageError("--profile-generate does not support modules with imports")
+        return lower_project(args, cache, profile)
+
+    ast = optimize_ast(ast, args.eval_steps, args.eval_depth)
+    if args.memoize:
+        mark_memoizable(ast, args.memo_capacity)
+    for function in ast.functions:
+        if args.fast_math:
+            with_fast_math(function)
+        if profile is not None:
+            with_profile(profile, function)
+        function.instrumented = instrument
+    if args.jobs > 1:
+        from .llvmir_generator.parallel import ParallelCompiler
+        # Chunks are already optimized by the workers.
+        compiler = ParallelCompiler(args.jobs, args.chunk_size, args.opt_level, args.target_cpu)
+        return compiler.compile(ast), False, ast.functions
+    elif cache is not None:
+        from .llvmir_generator.incremental import IncrementalCompiler
+        # Reuse the bitcode of every function whose fingerprint is unchanged.
+        compiler = IncrementalCompiler(BuildCache(os.path.join(cache.cache_dir, "functions")))
+        return compiler.compile(ast), True, ast.functions
+    else:
+        from .llvmir_generator.optimizer import create_llvm_module
+        return create_llvm_module(generate(ast).module), True, ast.functions
+
+
+# Lets LLVM reassociate the function's Float arithmetic and assume it never
+# sees NaNs, infinities or signed zeros.
+def with_fast_math(function: FunctionDeclaration) -> FunctionDeclaration:
+    function.fast_math = True
+    return function
+
+
+def functions_only(transform, declaration):
+    return transform(declaration) if isinstance(declaration, FunctionDeclaration) else declaration
+
+
+def load_profile(args):
+    if args.profile_use is None:
+        return None
+    from .llvmir_generator.profile import Profile
+    try:
+        return Profile.load(args.profile_use)
+    except ValueError as error:
+        raise UsageError(f"--profile-use: {error}") from None
+
+
+# Attaches the counts --profile-use recorded for the function, unless it
+# changed since.
+def with_profile(profile, function: FunctionDeclaration) -> FunctionDeclaration:
+    from .llvmir_generator.profile import use_profile
+    use_profile(profile, [function])
+    return function
+
+
+def cache_subdirectory(name: str, cache: BuildCache = None, enabled: bool = True) -> BuildCache:
+    if not enabled:
+        return None
+    return BuildCache(os.path.join((cache or BuildCache()).cache_dir, name))
+
+
+def ast_cache(cache: BuildCache = None, enabled: bool = True) -> BuildCache:
+    return cache_subdirectory("ast", cache, enabled)
+
+
+def module_cache(cache: BuildCache = None, enabled: bool = True) -> BuildCache:
+    return cache_subdirectory("modules", cache, enabled)
+
+
+# Every module of the project is compiled on its own into a cached unit; a
+# module is only recompiled when its source or the interfaces it imports
+# change.
+def lower_project(args, cache: BuildCache = None, profile=None):
+    from .project.builder import ProjectBuilder
+
+    builder = ProjectBuilder(module_cache(cache, not getattr(args, "no_cache", False)), args.jobs,
+                             module_options(args, profile))
+    llvm_module, functions = builder.compile(args.file)
+    return llvm_module, False, functions
+
+
+def module_options(args, profile=None):
+    from .project.builder import ModuleOptions
+    return ModuleOptions(args.opt_level, args.eval_steps, args.eval_depth,
+                         args.memo_capacity if args.memoize else None, args.fast_math,
+                         args.target_cpu, profile)
+
+
+def check_command(args) -> int:
+    # Lexing, parsing, name resolution and type checking only; reports every
+    # broken file.
+    status = 0
+    for file_path in args.files:
+        try:
+            check_types(resolve_module(read_ast(file_path, ast_cache=ast_cache()), file_path, module_cache()))
+        except (SyntaxError, ValueError, TypeError) as error:
+            print(f"{file_path}: {error}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def ast_command(args) -> int:
+    ast = read_ast(args.file, ast_cache=ast_cache())
+    if args.optimize:
+        ast = optimize_ast(resolve_module(ast, args.file, module_cache()), args.eval_steps, args.eval_depth)
+    print(ast)
+    return 0
+
+
+def ir_command(args) -> int:
+    from .llvmir_generator.optimizer import optimize
+    from .llvmir_generator.target import create_target_machine
+
+    llvm_module, run_pipeline, _ = lower(args)
+    if run_pipeline:
+        optimize(llvm_module, args.opt_level, create_target_machine(args.opt_level, cpu=args.target_cpu))
+    print(str(llvm_module))
+    return 0
+
+
+def run_tiered(args) -> int:
+    if args.profile_generate is not None:
+        raise UsageError("--profile-generate does not support --tiered")
+    ast = read_ast(args.file, ast_cache=ast_cache())
+    if len(ast.imports) > 0:
+        raise UsageError("--tiered does not support modules with imports")
+    ast = optimize_ast(ast, args.eval_steps, args.eval_depth)
+    profile = load_profile(args)
+    for function in ast.functions:
+        if args.fast_math:
+            with_fast_math(function)
+        if profile is not None:
+            with_profile(profile, function)
+    vm = VM(ast, args.hot_threshold, args.opt_level, args.target_cpu)
+    result = vm.run()
+
+    if args.time:
+        for promotion in vm.promotions:
+            print(f"promoted {promotion.name} after {promotion.calls} calls: "
+                  f"{promotion.compile_time * 1000:.3f} ms", file=sys.stderr)
+        print(f"execute: {vm.execution_time * 1000:.3f} ms", file=sys.stderr)
+
+    return result
+
+
+def run_command(args) -> int:
+    if args.tiered:
+        return run_tiered(args)
+
+    from .llvmir_generator.jit import JIT
+
+    llvm_module, run_pipeline, functions = lower(args)
+    jit = JIT(llvm_module, args.opt_level, run_pipeline, args.target_cpu)
+    result = entry_point(functions).run_function(jit)
+    if args.profile_generate is not None:
+        save_profile(jit, functions, args.profile_generate)
+
+    if args.time:
+        print(f"compile: {jit.compile_time * 1000:.3f} ms", file=sys.stderr)
+        print(f"execute: {jit.execution_time * 1000:.3f} ms", file=sys.stderr)
+
+    return result
+
+
+def save_profile(jit, functions: List[FunctionDeclaration], path: str) -> None:
+    from .llvmir_generator.profile import read_profile
+    read_profile(jit, functions).save(path)
+
+
+# What, besides the sources, the output depends on. Single files, projects
+# and the server all key on the options a project module is compiled with.
+def build_options(args) -> str:
+    return module_options(args, load_profile(args)).key()
+
+
+# The whole-output cache key. For a project it covers the sources of every
+# module the file imports, directly or not.
+def build_key(args, cache: BuildCache, kind: str) -> str:
+    from .project import DependencyGraph
+
+    graph = DependencyGraph(args.file, module_cache(cache))
+    if len(graph.modules) == 1:
+        return BuildCache.file_key(args.file, args.opt_level, build_options(args), kind)
+    sources = "\0".join(info.source_key for info in graph.modules.values())
+    return BuildCache.key(sources.encode(), args.opt_level, build_options(args), kind)
+
+
+def build_command(args) -> int:
+    from .llvmir_generator import emitter
+
+    output = args.output
+    if output is None:
+        output = os.path.splitext(args.file)[0] + ".o"
+    kind = emitter.SHARED_LIBRARY if output.endswith(".so") else emitter.OBJECT
+
+    cache = None if args.no_cache else BuildCache(args.cache_dir)
+    key = build_key(args, cache, kind) if cache is not None else None
+    if cache is not None and cache.fetch(key, kind, output):
+        return 0
+
+    llvm_module, run_pipeline, _ = lower(args, cache)
+    data = emitter.emit(llvm_module, kind, args.opt_level, run_pipeline, args.target_cpu)
+    if cache is not None:
+        cache.store(key, kind, data)
+
+    with open(output, "wb") as file:
+        file.write(data)
+    return 0
+
+
+def serve_command(args) -> int:
+    from .server import serve
+    return serve(args.socket, args.cache_size, args.verbose)
+
+
+def add_codegen_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("-O", dest="opt_level", type=int, choices=OPT_LEVELS, default=0,
+                        help="optimization level (default: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="generate and optimize function chunks, or the modules of a project, in this many worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"functions per parallel codegen chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--stream", action="store_true",
+                        help="memory-map the source and lower functions as soon as they are parsed")
+    parser.add_argument("--window-size", type=int, default=DEFAULT_WINDOW_SIZE,
+                        help="bytes tokenized per window in --stream mode")
+    parser.add_argument("--eval-steps", type=int, default=DEFAULT_MAX_STEPS,
+                        help=f"steps a pure call with literal arguments may take to be evaluated at compile time (default: {DEFAULT_MAX_STEPS}, 0 disables)")
+    parser.add_argument("--eval-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f"call depth allowed during compile-time evaluation (default: {DEFAULT_MAX_DEPTH})")
+    parser.add_argument("--memoize", action="store_true",
+                        help="cache the results of pure recursive Int/Bool functions in generated code (ignored with --stream)")
+    parser.add_argument("--fast-math", action="store_true",
+                        help="allow LLVM to reassociate Float arithmetic and assume it has no NaNs, infinities or signed zeros")
+    parser.add_argument("--memo-capacity", type=int, default=DEFAULT_MEMO_CAPACITY,
+                        help=f"entries per memoized function, a power of two (default: {DEFAULT_MEMO_CAPACITY})")
+    parser.add_argument("--target-cpu", metavar="CPU",
+                        help="generate code for this CPU and its features, 'native' for the host's (default: the generic CPU of the target)")
+    parser.add_argument("--profile-use", metavar="PATH",
+                        help="optimize with the branch and call counts of a profile written by run --profile-generate")
+
+
+def create_argument_parser(parser_class=argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser = parser_class(prog="syvora")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = subparsers.add_parser(
+        "check", help="parse and resolve files without generating code")
+    check_parser.add_argument("files", nargs="+")
+    check_parser.set_defaults(func=check_command)
+
+    ast_parser = subparsers.add_parser("ast", help="print the syntax tree")
+    ast_parser.add_argument("file")
+    ast_parser.add_argument("--optimize", action="store_true",
+                            help="print the tree after the AST optimization passes")
+    ast_parser.add_argument("--eval-steps", type=int, default=DEFAULT_MAX_STEPS)
+    ast_parser.add_argument("--eval-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    ast_parser.set_defaults(func=ast_command)
+
+    ir_parser = subparsers.add_parser("ir", help="print the generated LLVM IR")
+    ir_parser.add_argument("file")
+    add_codegen_arguments(ir_parser)
+    ir_parser.set_defaults(func=ir_command)
+
+    run_parser = subparsers.add_parser("run", help="JIT-compile and run main")
+    run_parser.add_argument("file")
+    run_parser.add_argument("--time", action="store_true",
+                            help="report compile and execution time to stderr")
+    run_parser.add_argument("--tiered", action="store_true",
+                            help="start in the bytecode interpreter and JIT-compile hot functions")
+    run_parser.add_argument("--hot-threshold", type=int, default=DEFAULT_HOT_THRESHOLD,
+                            help=f"calls after which --tiered compiles a function natively, 0 never does (default: {DEFAULT_HOT_THRESHOLD})")
+    run_parser.add_argument("--profile-generate", metavar="PATH",
+                            help="count the calls and branches of every function and write them to a profile at PATH")
+    add_codegen_arguments(run_parser)
+    run_parser.set_defaults(func=run_command)
+
+    build_parser = subparsers.add_parser(
+        "build", help="emit a native object file or shared library")
+    build_parser.add_argument("file")
+    build_parser.add_argument("-o", dest="output",
+                              help="output path; a .so suffix links a shared library")
+    build_parser.add_argument("--cache-dir", help="build cache directory")
+    build_parser.add_argument("--no-cache", action="store_true",
+                              help="always rebuild and do not update the cache")
+    add_codegen_arguments(build_parser)
+    build_parser.set_defaults(func=build_command)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="keep a compiler with warm caches running behind a Unix socket")
+    serve_parser.add_argument("--socket", help="socket path (default: $SYVORA_SOCKET, else $XDG_RUNTIME_DIR/syvora.sock)")
+    serve_parser.add_argument("--cache-size", type=int, default=256,
+                              help="files whose ASTs and IR are kept per cache (default: 256)")
+    serve_parser.add_argument("-v", "--verbose", action="store_true", help="log every request to stderr")
+    serve_parser.set_defaults(func=serve_command)
+
+    return parser
+
 
-    print(str(llvm_ir_generator.module))
+def normalize_argv(argv: List[str]) -> List[str]:
+    # A bare `syvora file.syv` prints the IR.
+    if len(argv) > 0 and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        return ["ir"] + argv
+    return argv
 
-    # llvm.initialize()
-    # llvm.initialize_native_target()
-    # llvm.initialize_native_asmprinter()
 
-    # target_machine = llvm.Target.from_default_triple().create_target_machine()
-    # llvm_module = parse_assembly(str(llvm_ir_generator.module))
-    # engine = llvm.create_mcjit_compiler(llvm_module, target_machine)
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
 
-    # llvm_ir_generator.run_function(engine)
+    parser = create_argument_parser()
+    args = parser.parse_args(normalize_argv(argv))
+    try:
+        return args.func(args)
+    except UsageError as error:
+        parser.exit(2, f"syvora {args.command}: error: {error}\n")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
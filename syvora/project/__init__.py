@@ -0,0 +1,2 @@
+from .graph import DependencyGraph, ModuleInfo, resolve_module
+from .interface import INTERFACE, Interface
@@ -0,0 +1,116 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from llvmlite import binding as llvm
+from syvora.ast_creator import FunctionDeclaration, Module, createAst
+from syvora.ast_optimizer import mark_memoizable, optimize_ast
+from syvora.ast_optimizer.evaluator import DEFAULT_MAX_DEPTH, DEFAULT_MAX_STEPS
+from syvora.build_cache import BuildCache
+from syvora.llvmir_generator import LLVMIRGenerator
+from syvora.llvmir_generator.incremental import generate_runtime_unit
+from syvora.llvmir_generator.optimizer import create_llvm_module, optimize
+from syvora.llvmir_generator.profile import Profile, use_profile
+from syvora.llvmir_generator.runtime import RUNTIME_VERSION
+from syvora.llvmir_generator.target import create_target_machine, target_key
+from syvora.semantic import resolve
+from .graph import DependencyGraph, ModuleInfo
+from .interface import declaration
+
+
+MODULE_UNIT = "bc"
+
+
+class ModuleOptions:
+    def __init__(self, opt_level: int = 0, eval_steps: int = DEFAULT_MAX_STEPS, eval_depth: int = DEFAULT_MAX_DEPTH, memo_capacity: Optional[int] = None, fast_math: bool = False,
+                 target_cpu: Optional[str] = None, profile: Optional[Profile] = None):
+        self.opt_level = opt_level
+        self.eval_steps = eval_steps
+        self.eval_depth = eval_depth
+        self.memo_capacity = memo_capacity
+        self.fast_math = fast_math
+        self.target_cpu = target_cpu
+        self.profile = profile
+
+    def key(self) -> str:
+        profile = self.profile.digest() if self.profile is not None else None
+        return f"{RUNTIME_VERSION}/{self.opt_level}/{self.eval_steps}/{self.eval_depth}/{self.memo_capacity}/{self.fast_math}/{profile}/{target_key(self.target_cpu)}"
+
+
+# Compiles one module against the exported signatures of its imports, which is
+# all it needs, so every module of a project can be compiled at the same time.
+def compile_module(path: str, interfaces: Dict[str, List[list]], options: ModuleOptions, module: Optional[Module] = None) -> bytes:
+    if module is None:
+        with open(path, "r") as file:
+            module = createAst(file.read(), path)
+    resolve(module, {written: [declaration(signature) for signature in signatures]
+                     for written, signatures in interfaces.items()})
+    optimize_ast(module, options.eval_steps, options.eval_depth)
+    if options.memo_capacity is not None:
+        mark_memoizable(module, options.memo_capacity)
+    for function in module.functions:
+        function.fast_math = options.fast_math
+    if options.profile is not None:
+        use_profile(options.profile, module.functions)
+
+    generator = LLVMIRGenerator()
+    generator.add_runtime(declare_only=True)
+    generator.visit(module)
+
+    llvm_module = create_llvm_module(generator.module)
+    optimize(llvm_module, options.opt_level, create_target_machine(options.opt_level, cpu=options.target_cpu))
+    return llvm_module.as_bitcode()
+
+
+class ProjectBuilder:
+    def __init__(self, cache: Optional[BuildCache] = None, jobs: int = 1, options: Optional[ModuleOptions] = None):
+        self.cache = cache
+        self.jobs = jobs
+        self.options = options if options is not None else ModuleOptions()
+        self.rebuilt: List[str] = []
+
+    # A module's unit only changes with its own source, the interfaces of the
+    # modules it imports and the options, not with their bodies.
+    def unit_key(self, graph: DependencyGraph, info: ModuleInfo) -> str:
+        h = hashlib.sha256(info.source_key.encode())
+        for written, dependency in sorted(info.dependencies.items()):
+            h.update(b"\0" + written.encode() + b"\0" + graph.modules[dependency].interface.exports_hash().encode())
+        h.update(b"\0" + self.options.key().encode())
+        return h.hexdigest()
+
+    def compile(self, entry_path: str) -> Tuple[llvm.ModuleRef, List[FunctionDeclaration]]:
+        graph = DependencyGraph(entry_path, self.cache)
+
+        units: Dict[str, bytes] = {}
+        pending: List[Tuple[ModuleInfo, str]] = []
+        for path, info in graph.modules.items():
+            key = self.unit_key(graph, info)
+            bitcode = self.cache.load(key, MODULE_UNIT) if self.cache is not None else None
+            if bitcode is None:
+                pending.append((info, key))
+            else:
+                units[path] = bitcode
+
+        interfaces = [{written: graph.modules[dependency].interface.exports
+                       for written, dependency in info.dependencies.items()} for info, _ in pending]
+        if self.jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                bitcodes = list(executor.map(
+                    compile_module, [info.path for info, _ in pending], interfaces, [self.options] * len(pending)))
+        else:
+            bitcodes = [compile_module(info.path, interface, self.options, info.module)
+                        for (info, _), interface in zip(pending, interfaces)]
+
+        self.rebuilt = []
+        for (info, key), bitcode in zip(pending, bitcodes):
+            units[info.path] = bitcode
+            self.rebuilt.append(info.path)
+            if self.cache is not None:
+                self.cache.store(key, MODULE_UNIT, bitcode)
+
+        linked = create_llvm_module(generate_runtime_unit().module)
+        optimize(linked, self.options.opt_level, create_target_machine(self.options.opt_level, cpu=self.options.target_cpu))
+        for path in graph.modules:
+            linked.link_in(llvm.parse_bitcode(units[path]))
+        linked.verify()
+
+        return linked, graph.entry.interface.entry_declarations()
@@ -0,0 +1,95 @@
+import hashlib
+import os
+from typing import Dict, List, Optional
+from syvora import __version__
+from syvora.ast_creator import Module, createAst
+from syvora.build_cache import BuildCache
+from syvora.semantic import resolve
+from .interface import INTERFACE, Interface
+
+
+def source_key(source: bytes) -> str:
+    h = hashlib.sha256(__version__.encode())
+    h.update(b"\0")
+    h.update(source)
+    return h.hexdigest()
+
+
+def import_path(importer: str, path: str) -> str:
+    # Imports are relative to the importing file.
+    return os.path.normpath(os.path.join(os.path.dirname(importer), path))
+
+
+class ModuleInfo:
+    def __init__(self, path: str, source_key: str, interface: Interface, module: Optional[Module]):
+        self.path = path
+        self.source_key = source_key
+        self.interface = interface
+        # Only set when the module had to be parsed for its interface.
+        self.module = module
+        # Import path as written -> path of the imported file.
+        self.dependencies: Dict[str, str] = {}
+
+
+def load_module(path: str, cache: Optional[BuildCache] = None) -> ModuleInfo:
+    with open(path, "rb") as file:
+        source = file.read()
+    key = source_key(source)
+
+    if cache is not None:
+        data = cache.load(key, INTERFACE)
+        interface = Interface.from_bytes(data) if data is not None else None
+        if interface is not None:
+            return ModuleInfo(path, key, interface, None)
+
+    module = createAst(source.decode("utf-8"), path)
+    interface = Interface.from_module(module)
+    if cache is not None:
+        cache.store(key, INTERFACE, interface.to_bytes())
+    return ModuleInfo(path, key, interface, module)
+
+
+# The modules reachable from an entry file through imports. Unchanged files
+# are read from their cached interface instead of being parsed. modules is
+# ordered so that every module comes after the modules it imports.
+class DependencyGraph:
+    def __init__(self, entry_path: str, cache: Optional[BuildCache] = None):
+        self.cache = cache
+        self.entry_path = os.path.abspath(entry_path)
+        self.modules: Dict[str, ModuleInfo] = {}
+        self.add(self.entry_path, [])
+
+    def add(self, path: str, chain: List[str]) -> None:
+        if path in chain:
+            cycle = chain[chain.index(path):] + [path]
+            raise ValueError(f"Import cycle: {' -> '.join(cycle)}")
+        if path in self.modules:
+            return
+
+        try:
+            info = load_module(path, self.cache)
+        except FileNotFoundError:
+            importer = f", imported by {chain[-1]}" if chain else ""
+            raise ValueError(f"Module '{path}' could not be found{importer}")
+        for statement in info.interface.imports:
+            dependency = import_path(path, statement.path)
+            info.dependencies[statement.path] = dependency
+            self.add(dependency, chain + [path])
+        self.modules[path] = info
+
+    @property
+    def entry(self) -> ModuleInfo:
+        return self.modules[self.entry_path]
+
+    def interfaces_for(self, path: str):
+        info = self.modules[path]
+        return {written: self.modules[dependency].interface.declarations()
+                for written, dependency in info.dependencies.items()}
+
+
+# Resolves a module that may import others, reading their interfaces.
+def resolve_module(module: Module, path: str, cache: Optional[BuildCache] = None) -> Module:
+    if len(module.imports) == 0:
+        return resolve(module)
+    graph = DependencyGraph(path, cache)
+    return resolve(module, graph.interfaces_for(graph.entry_path))
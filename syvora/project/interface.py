@@ -0,0 +1,78 @@
+import hashlib
+import json
+from typing import List, Optional
+from syvora.ast_creator.ast_nodes import *
+
+
+INTERFACE = "syi"
+INTERFACE_VERSION = 1
+
+
+def encode_type(t: Optional[AccessibleTypeExpression]) -> Optional[str]:
+    return None if t is None else repr(t)
+
+
+def decode_type(text: Optional[str]) -> Optional[AccessibleTypeExpression]:
+    if text is None:
+        return None
+    t = None
+    for name in reversed(text.split(".")):
+        t = AccessibleTypeExpression(name, t)
+    return t
+
+
+def signature(function: FunctionDeclaration) -> list:
+    return [function.name,
+            [[arg.identifier.name, encode_type(arg.type)] for arg in function.arguments],
+            encode_type(function.return_type)]
+
+
+def declaration(signature: list) -> FunctionDeclaration:
+    name, arguments, return_type = signature
+    return FunctionDeclaration(
+        name, [Argument(Identifier(label), decode_type(t)) for label, t in arguments], decode_type(return_type), None)
+
+
+# What other modules and the build need to know about a module without
+# parsing it: what it imports, the signatures it exports and its main.
+class Interface:
+    def __init__(self, imports: List[ImportStatement], exports: List[list], entry: List[list]):
+        self.imports = imports
+        self.exports = exports
+        self.entry = entry
+
+    @staticmethod
+    def from_module(module: Module) -> 'Interface':
+        exported = set(module.exports or [])
+        return Interface(
+            module.imports,
+            [signature(function) for function in module.functions if function.name in exported],
+            [signature(function) for function in module.functions if function.name == "main"])
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({
+            "version": INTERFACE_VERSION,
+            "imports": [[statement.path, statement.names] for statement in self.imports],
+            "exports": self.exports,
+            "entry": self.entry,
+        }, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Optional['Interface']:
+        content = json.loads(data)
+        if content.get("version") != INTERFACE_VERSION:
+            return None
+        imports = [ImportStatement(path, None if names is None else [tuple(pair) for pair in names])
+                   for path, names in content["imports"]]
+        return Interface(imports, content["exports"], content["entry"])
+
+    # Dependents only see the exported signatures, so only they decide
+    # whether a dependent has to be rebuilt.
+    def exports_hash(self) -> str:
+        return hashlib.sha256(json.dumps(self.exports, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def declarations(self) -> List[FunctionDeclaration]:
+        return [declaration(exported) for exported in self.exports]
+
+    def entry_declarations(self) -> List[FunctionDeclaration]:
+        return [declaration(entry) for entry in self.entry]
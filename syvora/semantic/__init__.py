@@ -0,0 +1,4 @@
+from .builtins import PRINT_SLOT, builtin_functions, format_value
+from .resolver import Resolver, resolve
+from .symbol_table import SymbolTable
+from .type_checker import BOOL, FLOAT, INT, SCALAR_TYPES, TypeChecker, check_types
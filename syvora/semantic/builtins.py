@@ -0,0 +1,52 @@
+import math
+from syvora.ast_creator.ast_nodes import AccessibleTypeExpression, Argument, Block, FunctionDeclaration, Identifier
+
+
+PRINT = FunctionDeclaration(
+    "print", [Argument(Identifier("arg"), AccessibleTypeExpression("Int", None))], None, Block([], None))
+
+builtin_functions = [PRINT]
+PRINT_SLOT = 0
+
+
+# The text print writes for a value, without the newline. Native code formats
+# with the runtime in llvmir_generator/runtime.py, which performs the same
+# floating-point steps so both print identical digits.
+def format_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, int):
+        return str(value)
+    return format_float(value)
+
+
+def format_float(value: float) -> str:
+    if value != value:
+        return "nan"
+    sign = "-" if value < 0 else ""
+    magnitude = -value if value < 0 else value
+    if magnitude == math.inf:
+        return f"{sign}inf"
+
+    exponent = 0
+    scientific = magnitude != 0 and (magnitude < 1e-4 or magnitude >= 1e16)
+    if scientific:
+        while magnitude >= 10:
+            magnitude /= 10
+            exponent += 1
+        while magnitude < 1:
+            magnitude *= 10
+            exponent -= 1
+
+    integer = int(magnitude)
+    scaled = int((magnitude - float(integer)) * 1000000.0 + 0.5)
+    if scaled >= 1000000:
+        integer += 1
+        scaled -= 1000000
+    if scientific and integer == 10:
+        integer = 1
+        exponent += 1
+
+    fraction = f"{scaled:06d}".rstrip("0") or "0"
+    text = f"{sign}{integer}.{fraction}"
+    return f"{text}e{exponent}" if scientific else text
@@ -0,0 +1,201 @@
+from typing import Dict, List, Optional
+from syvora.ast_creator.ast_nodes import *
+from syvora.visitor import NodeVisitor
+from .builtins import builtin_functions
+from .symbol_table import SymbolTable
+from .type_checker import SCALAR_TYPES
+
+
+# Binds every FunctionCallExpression to the slot of its callee in the module's
+# function table and every IdentifierExpression to the slot of its variable in
+# the enclosing function, so code generation never looks names up. Arguments
+# take the first slots and every variable a loop binds gets the next free one.
+# Type expressions and struct expressions get the StructDeclaration they name.
+#
+# interfaces maps the path of every import, as written, to the signature-only
+# declarations that module exports.
+class Resolver(NodeVisitor):
+    def __init__(self, interfaces: Optional[Dict[str, List[FunctionDeclaration]]] = None):
+        self.symbol_table = SymbolTable()
+        self.function_table: List[FunctionDeclaration] = []
+        self.structs: Dict[str, StructDeclaration] = {}
+        self.interfaces = interfaces if interfaces is not None else {}
+        self.local_count = 0
+        for function in builtin_functions:
+            self.declare(function)
+
+    def declare(self, function: FunctionDeclaration, name: Optional[str] = None) -> int:
+        key = function.low_level_func_name(name)
+        existing = self.symbol_table.lookup(key)
+        if existing is not None and existing >= len(builtin_functions):
+            raise ValueError(f"Function '{name or function.name}' is declared more than once")
+
+        slot = len(self.function_table)
+        self.function_table.append(function)
+        self.symbol_table.insert(key, slot)
+        return slot
+
+    def declare_struct(self, struct: StructDeclaration):
+        if struct.name in SCALAR_TYPES:
+            raise ValueError(f"Type '{struct.name}' is built in and cannot be declared")
+        if struct.name in self.structs:
+            raise ValueError(f"Type '{struct.name}' is declared more than once")
+        self.structs[struct.name] = struct
+
+    def resolve_type(self, t: Optional[AccessibleTypeExpression]):
+        if t is None or (t.child is None and t.name in SCALAR_TYPES):
+            return
+        declaration = self.structs.get(t.name) if t.child is None else None
+        if declaration is None:
+            raise ValueError(f"Type '{t}' is not defined")
+        t.declaration = declaration
+
+    def import_functions(self, statement: ImportStatement):
+        exported = self.interfaces.get(statement.path)
+        if exported is None:
+            raise ValueError(f"Module '{statement.path}' could not be found")
+
+        if statement.names is None:
+            for function in exported:
+                self.declare(function)
+            return
+        for name, local_name in statement.names:
+            functions = [function for function in exported if function.name == name]
+            if len(functions) == 0:
+                raise ValueError(f"Module '{statement.path}' does not export '{name}'")
+            for function in functions:
+                self.declare(function, local_name)
+
+    def visit_Module(self, node: Module):
+        for statement in node.imports:
+            self.import_functions(statement)
+
+        # Structs and functions are visible to each other regardless of their
+        # order.
+        for struct in node.structs:
+            self.declare_struct(struct)
+        for function in node.functions:
+            self.declare(function)
+        if node.exports is not None:
+            defined = {function.name for function in node.functions}
+            for name in node.exports:
+                if name not in defined:
+                    raise ValueError(f"Exported function '{name}' is not defined")
+        for struct in node.structs:
+            yield struct
+        for function in node.functions:
+            yield function
+            # Interfaces only describe scalar signatures so far.
+            if node.exports is not None and function.name in node.exports and any(
+                    t is not None and t.declaration is not None
+                    for t in [function.return_type] + [argument.type for argument in function.arguments]):
+                raise ValueError(f"Exported function '{function.name}' cannot take or return a struct yet")
+        node.function_table = self.function_table
+
+    def visit_StructDeclaration(self, node: StructDeclaration):
+        names = set()
+        for field in node.fields:
+            if field.identifier.name in names:
+                raise ValueError(f"Field '{field.identifier.name}' of '{node.name}' is declared more than once")
+            names.add(field.identifier.name)
+            self.resolve_type(field.type)
+
+        # Fields are stored inline, so a struct cannot contain itself. Fields
+        # of structs that are not resolved yet are skipped, but a cycle is
+        # still found once its last struct is.
+        stack = [field.type.declaration for field in node.fields]
+        seen = set()
+        while stack:
+            declaration = stack.pop()
+            if declaration is None or id(declaration) in seen:
+                continue
+            if declaration is node:
+                raise ValueError(f"Struct '{node.name}' contains itself")
+            seen.add(id(declaration))
+            stack.extend(field.type.declaration for field in declaration.fields)
+
+    def visit_FunctionDeclaration(self, node: FunctionDeclaration):
+        if (node.return_type is None) != (node.body.return_expression is None):
+            raise ValueError(
+                f"Function '{node.low_level_func_name()}' must have a return statement.")
+
+        self.resolve_type(node.return_type)
+        self.symbol_table.enter_scope()
+        for slot, argument in enumerate(node.arguments):
+            self.resolve_type(argument.type)
+            self.symbol_table.insert(argument.identifier.name, slot)
+        self.local_count = len(node.arguments)
+
+        yield node.body
+
+        self.symbol_table.exit_scope()
+        node.local_count = self.local_count
+
+    def bind_local(self, identifier: Identifier) -> int:
+        slot = self.local_count
+        self.local_count += 1
+        self.symbol_table.insert(identifier.name, slot)
+        return slot
+
+    def visit_Block(self, node: Block):
+        self.symbol_table.enter_scope()
+        for statement in node.statements:
+            yield statement
+        if node.return_expression is not None:
+            yield node.return_expression
+        self.symbol_table.exit_scope()
+
+    def visit_ForExpression(self, node: ForExpression):
+        # The bounds and the initial value cannot see the loop's own variables.
+        yield node.range
+        if node.initial is not None:
+            yield node.initial
+
+        self.symbol_table.enter_scope()
+        node.variable_slot = self.bind_local(node.variable)
+        if node.accumulator is not None:
+            node.accumulator_slot = self.bind_local(node.accumulator)
+        yield node.body
+        self.symbol_table.exit_scope()
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        slot = self.symbol_table.lookup(node.name)
+        if slot is None:
+            raise ValueError(f"Variable '{node.name}' is not defined")
+        node.slot = slot
+
+    # Like arguments, fields are passed by name in the order they are declared.
+    def visit_StructExpression(self, node: StructExpression):
+        declaration = self.structs.get(node.type_name)
+        if declaration is None:
+            raise ValueError(f"Type '{node.type_name}' is not defined")
+        node.declaration = declaration
+
+        names = [name for name, _ in node.fields]
+        expected = [field.identifier.name for field in declaration.fields]
+        if names != expected:
+            raise ValueError(f"'{node.type_name}' takes the fields ({', '.join(expected)}), not ({', '.join(names)})")
+        for _, expression in node.fields:
+            yield expression
+
+    def visit_FunctionCallExpression(self, node: FunctionCallExpression):
+        slot = self.symbol_table.lookup(node.low_level_func_name())
+        if slot is None:
+            raise ValueError(f"Function '{node.function_name}' is not defined")
+        node.slot = slot
+
+        function = self.function_table[slot]
+        for i, (arg_name, arg_expr) in enumerate(node.arguments):
+            if function.arguments[i].identifier.name != arg_name:
+                raise ValueError(
+                    f"Argument '{arg_name}' does not match '{function.arguments[i].identifier.name}'")
+            yield arg_expr
+
+        if node.children is not None:
+            for child_expr in node.children:
+                yield child_expr
+
+
+def resolve(module: Module, interfaces: Optional[Dict[str, List[FunctionDeclaration]]] = None) -> Module:
+    Resolver(interfaces).visit(module)
+    return module
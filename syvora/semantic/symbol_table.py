@@ -0,0 +1,27 @@
+from typing import Any, Dict, List, Optional
+
+
+class SymbolTable:
+    # Every name maps to a stack of its bindings, innermost last, so lookups
+    # are a single dict access no matter how deeply scopes are nested.
+    def __init__(self):
+        self.bindings: Dict[str, List[Any]] = {}
+        self.scopes: List[List[str]] = [[]]
+
+    def insert(self, name: str, value: Any) -> None:
+        self.bindings.setdefault(name, []).append(value)
+        self.scopes[-1].append(name)
+
+    def lookup(self, name: str) -> Optional[Any]:
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
+
+    def enter_scope(self) -> None:
+        self.scopes.append([])
+
+    def exit_scope(self) -> None:
+        for name in self.scopes.pop():
+            stack = self.bindings[name]
+            stack.pop()
+            if not stack:
+                del self.bindings[name]
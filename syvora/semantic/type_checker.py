@@ -0,0 +1,223 @@
+from typing import Dict, List, Optional
+from syvora.ast_creator.ast_nodes import *
+from syvora.visitor import NodeVisitor
+from .builtins import PRINT_SLOT
+
+
+INT = "Int"
+FLOAT = "Float"
+BOOL = "Bool"
+SCALAR_TYPES = (INT, FLOAT, BOOL)
+NUMERIC_TYPES = (INT, FLOAT)
+PRINTABLE_TYPES = SCALAR_TYPES
+
+ARITHMETIC_OPERATORS = ("+", "-", "*", "/", "%")
+ORDERING_OPERATORS = ("<", "<=", ">", ">=")
+EQUALITY_OPERATORS = ("==", "!=")
+LOGICAL_OPERATORS = ("&&", "||")
+RANGE_OPERATORS = ("...", "..<")
+
+
+def type_name(t: Optional[AccessibleTypeExpression]) -> Optional[str]:
+    return None if t is None else repr(t)
+
+
+# Annotates every expression with the name of its Syvora type in value_type,
+# None for expressions without a value, so code generation can pick integer
+# or floating-point instructions. There are no implicit conversions: both
+# operands of an operator and both branches of an if have the same type. A
+# struct's type is its name.
+#
+# Runs on resolved functions; function_table is the one their call slots
+# index into.
+class TypeChecker(NodeVisitor):
+    def __init__(self, function_table):
+        self.function_table = function_table
+        self.function: Optional[FunctionDeclaration] = None
+        self.local_types: List[str] = []
+        # The structs of the types seen so far, so that member accesses can
+        # find their fields.
+        self.structs: Dict[str, StructDeclaration] = {}
+
+    def type_name(self, t: Optional[AccessibleTypeExpression]) -> Optional[str]:
+        if t is not None and t.declaration is not None:
+            self.structs[t.name] = t.declaration
+        return type_name(t)
+
+    def generic_visit(self, node):
+        raise TypeError(f"Unexpected node: {node.__class__.__name__}")
+
+    def visit_Module(self, node: Module):
+        for function in node.functions:
+            yield function
+
+    def visit_FunctionDeclaration(self, node: FunctionDeclaration):
+        self.function = node
+        self.local_types = [self.type_name(argument.type) for argument in node.arguments]
+        self.local_types += [None] * (node.local_count - len(node.arguments))
+        yield node.body
+
+    def visit_Block(self, node: Block):
+        value_type = None
+        for statement in node.statements:
+            value_type = yield statement
+
+        if node.return_expression is not None:
+            return_type = yield node.return_expression
+            expected = self.type_name(self.function.return_type)
+            if return_type != expected:
+                raise TypeError(
+                    f"Function '{self.function.name}' returns {return_type} but is declared to return {expected}")
+            value_type = None
+
+        node.value_type = value_type
+        return value_type
+
+    def visit_IfExpression(self, node: IfExpression):
+        condition_type = yield node.condition
+        if condition_type != BOOL:
+            raise TypeError(f"Condition of 'if' must be a Bool, not {condition_type}")
+
+        branches = [node.true_block] if node.false_block is None else [node.true_block, node.false_block]
+        types = []
+        for branch in branches:
+            branch_type = yield branch
+            # A branch that returns does not contribute a value.
+            if not (isinstance(branch, Block) and branch.return_expression is not None):
+                types.append(branch_type)
+
+        value_type = None
+        if node.false_block is not None and len(types) > 0 and None not in types:
+            if any(t != types[0] for t in types):
+                raise TypeError(f"Both branches of 'if' must have the same type, not {types[0]} and {types[1]}")
+            value_type = types[0]
+
+        node.value_type = value_type
+        return value_type
+
+    # Ranges are not values: they only exist as what a for iterates over.
+    def visit_ForExpression(self, node: ForExpression):
+        if not (isinstance(node.range, BinaryExpression) and node.range.operator in RANGE_OPERATORS):
+            raise TypeError("'for' can only iterate over a range")
+        for bound in (node.range.left, node.range.right):
+            bound_type = yield bound
+            if bound_type != INT:
+                raise TypeError(f"Bounds of a range must be Int, not {bound_type}")
+        self.local_types[node.variable_slot] = INT
+
+        accumulator_type = None
+        if node.accumulator is not None:
+            accumulator_type = yield node.initial
+            if accumulator_type is None:
+                raise TypeError(f"Accumulator '{node.accumulator.name}' must start with a value")
+            self.local_types[node.accumulator_slot] = accumulator_type
+
+        if node.body.return_expression is not None:
+            raise TypeError("The body of 'for' cannot end with a return")
+        body_type = yield node.body
+        if node.accumulator is not None and body_type != accumulator_type:
+            raise TypeError(
+                f"The body of 'for' must evaluate to the {accumulator_type} accumulator '{node.accumulator.name}', not {body_type}")
+
+        node.value_type = accumulator_type
+        return accumulator_type
+
+    def visit_FunctionCallExpression(self, node: FunctionCallExpression):
+        function = self.function_table[node.slot]
+        for (name, expression), argument in zip(node.arguments, function.arguments):
+            argument_type = yield expression
+            expected = type_name(argument.type)
+            # print is the one function that takes any value it can format.
+            if node.slot == PRINT_SLOT and argument_type in PRINTABLE_TYPES:
+                continue
+            if argument_type != expected:
+                raise TypeError(
+                    f"Argument '{name}' of '{function.name}' must be {expected}, not {argument_type}")
+
+        if node.children is not None:
+            for child in node.children:
+                yield child
+
+        node.value_type = self.type_name(function.return_type)
+        return node.value_type
+
+    def visit_StructExpression(self, node: StructExpression):
+        declaration = node.declaration
+        for (name, expression), field in zip(node.fields, declaration.fields):
+            value_type = yield expression
+            expected = self.type_name(field.type)
+            if value_type != expected:
+                raise TypeError(f"Field '{name}' of '{declaration.name}' must be {expected}, not {value_type}")
+
+        self.structs[declaration.name] = declaration
+        node.value_type = declaration.name
+        return node.value_type
+
+    def visit_MemberAccessExpression(self, node: MemberAccessExpression):
+        value_type = yield node.expression
+        declaration = self.structs.get(value_type)
+        fields = declaration.fields if declaration is not None else []
+        index = next((i for i, field in enumerate(fields) if field.identifier.name == node.member), None)
+        if index is None:
+            raise TypeError(f"{value_type} has no field '{node.member}'")
+
+        node.declaration = declaration
+        node.index = index
+        node.value_type = self.type_name(fields[index].type)
+        return node.value_type
+
+    def visit_BinaryExpression(self, node: BinaryExpression):
+        left = yield node.left
+        right = yield node.right
+        operator = node.operator
+
+        if operator in LOGICAL_OPERATORS:
+            allowed = left == BOOL and right == BOOL
+            value_type = BOOL
+        elif operator in EQUALITY_OPERATORS:
+            allowed = left == right and left in SCALAR_TYPES
+            value_type = BOOL
+        elif operator in ORDERING_OPERATORS:
+            allowed = left == right and left in NUMERIC_TYPES
+            value_type = BOOL
+        elif operator in ARITHMETIC_OPERATORS:
+            allowed = left == right and left in NUMERIC_TYPES
+            value_type = left
+        elif operator in RANGE_OPERATORS:
+            raise TypeError("A range can only be iterated over by 'for'")
+        else:
+            raise TypeError(f"Operator '{operator}' is not supported")
+
+        if not allowed:
+            raise TypeError(f"Operator '{operator}' cannot be applied to {left} and {right}")
+        node.value_type = value_type
+        return value_type
+
+    def visit_UnaryExpression(self, node: UnaryExpression):
+        operand = yield node.expression
+        if (node.operator == "-" and operand not in NUMERIC_TYPES) or (node.operator == "!" and operand != BOOL):
+            raise TypeError(f"Operator '{node.operator}' cannot be applied to {operand}")
+        node.value_type = operand
+        return operand
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        node.value_type = self.local_types[node.slot]
+        return node.value_type
+
+    def visit_LiteralExpression(self, node: LiteralExpression):
+        if node.literal_type == TokenType.INTEGER_LITERAL:
+            node.value_type = INT
+        elif node.literal_type == TokenType.FLOAT_LITERAL:
+            node.value_type = FLOAT
+        elif node.literal_type == TokenType.BOOLEAN_LITERAL:
+            node.value_type = BOOL
+        else:
+            raise TypeError(f"Unexpected literal type: {node.literal_type}")
+        return node.value_type
+
+
+def check_types(node: ASTNode, function_table=None) -> ASTNode:
+    if isinstance(node, Module):
+        function_table = node.function_table
+    TypeChecker(function_table).visit(node)
+    return node
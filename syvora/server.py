@@ -0,0 +1,328 @@
+import argparse
+import copy
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+from .ast_creator import Module
+from .build_cache import BuildCache
+from .client import default_socket_path, receive, send
+from .llvmir_generator.jit import JIT
+# entry_point and save_profile import these lazily, but run_child, which
+# calls them, must not import anything.
+from .llvmir_generator import LLVMIRGenerator, profile
+from .main import UsageError, ast_cache, build_key, build_options, create_argument_parser, entry_point, lower, module_cache, normalize_argv, read_ast, save_profile
+from .project import resolve_module
+from .semantic import check_types
+
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class RequestError(Exception):
+    pass
+
+
+class RequestArgumentParser(argparse.ArgumentParser):
+    # argparse would print to the server's stderr and exit the process.
+    def error(self, message):
+        raise RequestError(f"{self.prog}: error: {message}")
+
+    def exit(self, status=0, message=None):
+        raise RequestError(message or "")
+
+
+# An LRU cache of values derived from a file. Entries remember the mtime and
+# size the file had when they were built and are rebuilt once either changes.
+class FileCache:
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, key: Hashable, build: Callable[[], Any]) -> Any:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Built outside the lock so that other files are served meanwhile; two
+        # requests racing for the same file just build it twice.
+        value = build()
+        with self.lock:
+            self.entries[key] = (version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return value
+
+
+# Options that change what lower() produces for a file: those of a build
+# and how the module is put together.
+def lowering_options(args) -> Tuple:
+    return (build_options(args), args.jobs, args.chunk_size, args.stream, args.window_size,
+            getattr(args, "profile_generate", None) is not None)
+
+
+class Session:
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        from .llvmir_generator.target import initialize_native_target
+        initialize_native_target()
+
+        self.asts = FileCache(cache_size)
+        self.lowered = FileCache(cache_size)
+        # llvmlite shares one LLVM context between threads, so it is used by
+        # one request at a time. Parsing, checking and running programs, which
+        # happens in child processes, go on concurrently.
+        self.llvm_lock = threading.Lock()
+
+    # Modules that import others are cached unresolved, because the cache
+    # only notices changes to the file itself; they are resolved per request.
+    def ast(self, path: str) -> Module:
+        def build():
+            module = read_ast(path, ast_cache=ast_cache())
+            if len(module.imports) == 0:
+                resolve_module(module, path)
+            return module
+
+        module = self.asts.get(path, path, build)
+        if len(module.imports) > 0:
+            module = resolve_module(copy.deepcopy(module), path, module_cache())
+        return module
+
+    # Passes rewrite the tree in place, so they get a private copy of the
+    # cached one.
+    def private_ast(self, path: str) -> Module:
+        return copy.deepcopy(self.ast(path))
+
+    def lower(self, args):
+        from llvmlite import binding as llvm
+
+        # Projects are cached per module on disk by the project builder.
+        if not args.stream and len(self.ast(args.file).imports) > 0:
+            with self.llvm_lock:
+                return lower(args)
+
+        def build():
+            ast = None if args.stream else self.private_ast(args.file)
+            with self.llvm_lock:
+                llvm_module, run_pipeline, functions = lower(args, None, ast)
+                return str(llvm_module), run_pipeline, functions
+
+        text, run_pipeline, functions = self.lowered.get(
+            args.file, (args.file, lowering_options(args)), build)
+        with self.llvm_lock:
+            llvm_module = llvm.parse_assembly(text)
+        return llvm_module, run_pipeline, functions
+
+    def handle(self, argv, cwd: str, out: io.StringIO, err: io.StringIO) -> int:
+        try:
+            args = create_argument_parser(RequestArgumentParser).parse_args(normalize_argv(argv))
+        except RequestError as error:
+            err.write(f"{error}\n")
+            return 2
+
+        # Paths are relative to the client's working directory.
+        for name in ["file", "output", "cache_dir", "profile_use", "profile_generate"]:
+            if getattr(args, name, None) is not None:
+                setattr(args, name, os.path.join(cwd, getattr(args, name)))
+        if getattr(args, "files", None) is not None:
+            args.files = [os.path.join(cwd, path) for path in args.files]
+
+        command = getattr(self, f"{args.command}_command", None)
+        if command is None:
+            err.write(f"syvora server: '{args.command}' is not supported\n")
+            return 2
+        # Whatever goes wrong with a request is reported to its client; the
+        # server itself keeps going.
+        try:
+            return command(args, out, err)
+        except UsageError as error:
+            err.write(f"syvora {args.command}: error: {error}\n")
+            return 2
+        except Exception as error:
+            err.write(f"{type(error).__name__}: {error}\n")
+            return 1
+
+    def check_command(self, args, out, err) -> int:
+        status = 0
+        for path in args.files:
+            try:
+                check_types(self.ast(path))
+            except (SyntaxError, ValueError, TypeError) as error:
+                err.write(f"{path}: {error}\n")
+                status = 1
+        return status
+
+    def ast_command(self, args, out, err) -> int:
+        from .ast_optimizer import optimize_ast
+        if args.optimize:
+            out.write(f"{optimize_ast(self.private_ast(args.file), args.eval_steps, args.eval_depth)}\n")
+        else:
+            out.write(f"{self.ast(args.file)}\n")
+        return 0
+
+    def ir_command(self, args, out, err) -> int:
+        from .llvmir_generator.optimizer import optimize
+        from .llvmir_generator.target import create_target_machine
+
+        llvm_module, run_pipeline, _ = self.lower(args)
+        with self.llvm_lock:
+            if run_pipeline:
+                optimize(llvm_module, args.opt_level, create_target_machine(args.opt_level, cpu=args.target_cpu))
+            out.write(f"{llvm_module}\n")
+        return 0
+
+    def run_command(self, args, out, err) -> int:
+        if args.tiered:
+            err.write("syvora server: --tiered is not supported\n")
+            return 2
+
+        llvm_module, run_pipeline, functions = self.lower(args)
+        with tempfile.TemporaryFile() as output:
+            # The program runs in a forked child, so that a fault in it only
+            # ends the child and the server keeps its caches. Forking with the
+            # lock held leaves LLVM in a consistent state in the child.
+            reader, writer = os.pipe()
+            with self.llvm_lock:
+                pid = os.fork()
+            if pid == 0:
+                os.close(reader)
+                run_child(args, llvm_module, run_pipeline, functions, output, writer)
+            os.close(writer)
+            with os.fdopen(reader, "r") as pipe:
+                report = pipe.read()
+            _, status = os.waitpid(pid, 0)
+
+            output.seek(0)
+            out.write(output.read().decode("utf-8", "replace"))
+
+        if os.WIFSIGNALED(status):
+            signum = os.WTERMSIG(status)
+            err.write(f"syvora server: the program was killed by {signal.Signals(signum).name}\n")
+            return 128 + signum
+        report = json.loads(report) if report else {"error": "the program exited without a result"}
+        if "error" in report:
+            err.write(f"{report['error']}\n")
+            return 1
+
+        if args.time:
+            err.write(f"compile: {report['compile_time'] * 1000:.3f} ms\n")
+            err.write(f"execute: {report['execution_time'] * 1000:.3f} ms\n")
+        return report["status"]
+
+    def build_command(self, args, out, err) -> int:
+        from .llvmir_generator import emitter
+
+        output = args.output
+        if output is None:
+            output = os.path.splitext(args.file)[0] + ".o"
+        kind = emitter.SHARED_LIBRARY if output.endswith(".so") else emitter.OBJECT
+
+        cache = None if args.no_cache else BuildCache(args.cache_dir)
+        key = build_key(args, cache, kind) if cache is not None else None
+        if cache is not None and cache.fetch(key, kind, output):
+            return 0
+
+        llvm_module, run_pipeline, _ = self.lower(args)
+        with self.llvm_lock:
+            data = emitter.emit(llvm_module, kind, args.opt_level, run_pipeline, args.target_cpu)
+        if cache is not None:
+            cache.store(key, kind, data)
+
+        with open(output, "wb") as file:
+            file.write(data)
+        return 0
+
+
+# JIT-compiles and runs the program in the child run_command forks, with its
+# stdout pointed at output, and reports how it went as JSON through the pipe.
+# Never returns.
+#
+# Only the forking thread survives in the child, and locks other request
+# threads held stay locked there, so the child imports nothing and touches
+# none of the server's state. It keeps no descriptor but stdio and the pipe,
+# so that neither the listening socket nor other clients' connections stay
+# open while the program runs.
+def run_child(args, llvm_module, run_pipeline: bool, functions, output, pipe: int):
+    report = {}
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.dup2(output.fileno(), 1)
+        os.closerange(3, pipe)
+        os.closerange(pipe + 1, os.sysconf("SC_OPEN_MAX"))
+        jit = JIT(llvm_module, args.opt_level, run_pipeline, args.target_cpu)
+        try:
+            report["status"] = entry_point(functions).run_function(jit)
+        finally:
+            jit.flush_output()
+        if args.profile_generate is not None:
+            save_profile(jit, functions, args.profile_generate)
+        report["compile_time"] = jit.compile_time
+        report["execution_time"] = jit.execution_time
+    except Exception as error:
+        report = {"error": f"{type(error).__name__}: {error}"}
+    finally:
+        with os.fdopen(pipe, "w") as file:
+            json.dump(report, file)
+        os._exit(0)
+
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        message = receive(self.request)
+        if message is None:
+            return
+
+        out, err = io.StringIO(), io.StringIO()
+        start = time.perf_counter()
+        status = self.server.session.handle(message.get("argv", []), message.get("cwd", "/"), out, err)
+        if self.server.verbose:
+            print(f"{' '.join(message.get('argv', []))}: {status} in "
+                  f"{(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        send(self.request, {"status": status, "stdout": out.getvalue(), "stderr": err.getvalue()})
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, session: Session, verbose: bool = False):
+        self.session = session
+        self.verbose = verbose
+        super().__init__(socket_path, RequestHandler)
+
+
+def serve(socket_path: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE, verbose: bool = False) -> int:
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = Server(socket_path, Session(cache_size), verbose)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"syvora server listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+    return 0
@@ -0,0 +1,103 @@
+from inspect import isgeneratorfunction
+from typing import Any, Callable, Dict, Tuple
+from .ast_creator.ast_nodes import ASTNode, iter_fields
+
+
+Handler = Tuple[Callable[[Any, ASTNode], Any], bool]
+
+
+# Handlers are looked up once per (visitor class, node type) and cached, so a
+# visit is a single dict lookup instead of building a method name.
+#
+# A handler that is a generator function is traversed with an explicit stack:
+# it yields child nodes and receives their results back, e.g.
+#
+#     def visit_BinaryExpression(self, node):
+#         left = yield node.left
+#         right = yield node.right
+#         return self.builder.add(left, right)
+#
+# so arbitrarily deep trees never hit the recursion limit. Plain handlers are
+# simply called and may recurse through self.visit as usual.
+class NodeVisitor:
+    _dispatch: Dict[type, Handler] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    @classmethod
+    def _resolve(cls, node_type: type) -> Handler:
+        handler = None
+        for base in node_type.__mro__:
+            handler = getattr(cls, f"visit_{base.__name__}", None)
+            if handler is not None:
+                break
+        if handler is None:
+            handler = cls.generic_visit
+
+        entry = (handler, isgeneratorfunction(handler))
+        cls._dispatch[node_type] = entry
+        return entry
+
+    def visit(self, node: ASTNode):
+        handler, is_generator = self._dispatch.get(type(node)) or self._resolve(type(node))
+        if not is_generator:
+            return handler(self, node)
+        return self._run(handler(self, node))
+
+    def _run(self, generator):
+        dispatch = self._dispatch
+        stack = [generator]
+        value = None
+
+        while stack:
+            try:
+                child = stack[-1].send(value)
+            except StopIteration as stop:
+                stack.pop()
+                value = stop.value
+                continue
+
+            handler, is_generator = dispatch.get(type(child)) or self._resolve(type(child))
+            if is_generator:
+                stack.append(handler(self, child))
+                value = None
+            else:
+                value = handler(self, child)
+
+        return value
+
+    def generic_visit(self, node: ASTNode):
+        for _, value in iter_fields(node):
+            yield from self._visit_value(value)
+
+    def _visit_value(self, value):
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                yield from self._visit_value(item)
+
+
+# Replaces every visited node with whatever its handler returns.
+class NodeTransformer(NodeVisitor):
+    def generic_visit(self, node: ASTNode):
+        for name, value in iter_fields(node):
+            setattr(node, name, (yield from self._transform_value(value)))
+        return node
+
+    def _transform_value(self, value):
+        if isinstance(value, ASTNode):
+            return (yield value)
+        elif isinstance(value, list):
+            items = []
+            for item in value:
+                items.append((yield from self._transform_value(item)))
+            return items
+        elif isinstance(value, tuple):
+            items = []
+            for item in value:
+                items.append((yield from self._transform_value(item)))
+            return tuple(items)
+        return value
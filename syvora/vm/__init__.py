@@ -0,0 +1,2 @@
+from .bytecode import BytecodeCompiler, Code, compile_function
+from .interpreter import DEFAULT_HOT_THRESHOLD, VM
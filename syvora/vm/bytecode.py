@@ -0,0 +1,225 @@
+from typing import Any, List
+from syvora.ast_creator.ast_nodes import *
+from syvora.visitor import NodeVisitor
+
+
+# Every instruction is an opcode followed by one operand, so the interpreter
+# always advances by two. Operands are constant indices, local slots,
+# function slots, jump targets, field counts or field indices; unused ones
+# are 0. Structs are tuples of their fields in declared order.
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+ADD = 2
+SUB = 3
+MUL = 4
+DIV = 5
+MOD = 6
+EQ = 7
+NE = 8
+LT = 9
+LE = 10
+GT = 11
+GE = 12
+NEG = 13
+NOT = 14
+JUMP = 15
+JUMP_IF_FALSE = 16
+CALL = 17
+POP = 18
+RETURN = 19
+STORE_LOCAL = 20
+MAKE_STRUCT = 21
+LOAD_FIELD = 22
+
+binary_opcodes = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV, "%": MOD,
+    "==": EQ, "!=": NE, "<": LT, "<=": LE, ">": GT, ">=": GE,
+}
+
+unary_opcodes = {"-": NEG, "!": NOT}
+
+
+class Code:
+    __slots__ = ('name', 'arg_count', 'local_count', 'instructions', 'constants')
+
+    def __init__(self, name: str, arg_count: int, local_count: int, instructions: List[int], constants: List[Any]):
+        self.name = name
+        self.arg_count = arg_count
+        self.local_count = local_count
+        self.instructions = instructions
+        self.constants = constants
+
+    def __repr__(self):
+        lines = [f"{self.name}:"]
+        for pc in range(0, len(self.instructions), 2):
+            lines.append(f"{pc:6} {opcode_names[self.instructions[pc]]:14} {self.instructions[pc + 1]}")
+        return "\n".join(lines)
+
+
+opcode_names = {value: name for name, value in globals().items() if name.isupper() and isinstance(value, int)}
+
+
+# Lowers one resolved function to stack code. Every expression leaves exactly
+# one value on the stack; a block evaluates to its last statement, or None.
+class BytecodeCompiler(NodeVisitor):
+    def __init__(self):
+        self.instructions: List[int] = []
+        self.constants: List[Any] = []
+        self.constant_indices = {}
+        self.local_count = 0
+
+    def emit(self, opcode: int, operand: int = 0) -> int:
+        self.instructions.append(opcode)
+        self.instructions.append(operand)
+        return len(self.instructions) - 2
+
+    def patch(self, at: int):
+        self.instructions[at + 1] = len(self.instructions)
+
+    def constant(self, value) -> int:
+        # bool and int compare equal, so the type is part of the key, and so
+        # do 0.0 and -0.0, so floats are keyed by their repr.
+        key = (type(value), repr(value) if isinstance(value, float) else value)
+        index = self.constant_indices.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constant_indices[key] = index
+        return index
+
+    def generic_visit(self, node):
+        raise RuntimeError(f"Cannot compile {node.__class__.__name__} to bytecode")
+
+    # A slot past the function's own locals for values the code keeps around.
+    def temporary(self) -> int:
+        self.local_count += 1
+        return self.local_count - 1
+
+    def visit_FunctionDeclaration(self, node: FunctionDeclaration):
+        self.local_count = node.local_count
+        yield node.body
+        self.emit(RETURN)
+        return Code(node.low_level_func_name(), len(node.arguments), self.local_count, self.instructions, self.constants)
+
+    def visit_Block(self, node: Block):
+        for i, statement in enumerate(node.statements):
+            yield statement
+            if i < len(node.statements) - 1 or node.return_expression is not None:
+                self.emit(POP)
+
+        if node.return_expression is not None:
+            yield node.return_expression
+            self.emit(RETURN)
+        elif len(node.statements) == 0:
+            self.emit(LOAD_CONST, self.constant(None))
+
+    def visit_IfExpression(self, node: IfExpression):
+        yield node.condition
+        to_else = self.emit(JUMP_IF_FALSE)
+        yield node.true_block
+        to_end = self.emit(JUMP)
+        self.patch(to_else)
+        if node.false_block is not None:
+            yield node.false_block
+        else:
+            self.emit(LOAD_CONST, self.constant(None))
+        self.patch(to_end)
+
+    def emit_bound_test(self, slot: int, end: int, opcode: int) -> int:
+        self.emit(LOAD_LOCAL, slot)
+        self.emit(LOAD_LOCAL, end)
+        self.emit(opcode)
+        return self.emit(JUMP_IF_FALSE)
+
+    # The same rotated loop as the native code: the end is evaluated once, and
+    # the test at the bottom never steps the variable past it.
+    def visit_ForExpression(self, node: ForExpression):
+        inclusive = node.range.operator == "..."
+        end = self.temporary()
+        yield node.range.left
+        self.emit(STORE_LOCAL, node.variable_slot)
+        yield node.range.right
+        self.emit(STORE_LOCAL, end)
+        if node.accumulator is not None:
+            yield node.initial
+            self.emit(STORE_LOCAL, node.accumulator_slot)
+
+        to_end = self.emit_bound_test(node.variable_slot, end, LE if inclusive else LT)
+
+        body = len(self.instructions)
+        yield node.body
+        if node.accumulator is None:
+            self.emit(POP)
+        else:
+            self.emit(STORE_LOCAL, node.accumulator_slot)
+        if inclusive:
+            to_exit = self.emit_bound_test(node.variable_slot, end, LT)
+        self.emit(LOAD_LOCAL, node.variable_slot)
+        self.emit(LOAD_CONST, self.constant(1))
+        self.emit(ADD)
+        self.emit(STORE_LOCAL, node.variable_slot)
+        if not inclusive:
+            to_exit = self.emit_bound_test(node.variable_slot, end, LT)
+        self.emit(JUMP, body)
+
+        self.patch(to_end)
+        self.patch(to_exit)
+        if node.accumulator is None:
+            self.emit(LOAD_CONST, self.constant(None))
+        else:
+            self.emit(LOAD_LOCAL, node.accumulator_slot)
+
+    def visit_BinaryExpression(self, node: BinaryExpression):
+        yield node.left
+        if node.operator == "&&":
+            to_false = self.emit(JUMP_IF_FALSE)
+            yield node.right
+            to_end = self.emit(JUMP)
+            self.patch(to_false)
+            self.emit(LOAD_CONST, self.constant(False))
+            self.patch(to_end)
+        elif node.operator == "||":
+            to_right = self.emit(JUMP_IF_FALSE)
+            self.emit(LOAD_CONST, self.constant(True))
+            to_end = self.emit(JUMP)
+            self.patch(to_right)
+            yield node.right
+            self.patch(to_end)
+        else:
+            yield node.right
+            opcode = binary_opcodes.get(node.operator)
+            if opcode is None:
+                raise RuntimeError(f"Cannot compile operator '{node.operator}' to bytecode")
+            self.emit(opcode)
+
+    def visit_UnaryExpression(self, node: UnaryExpression):
+        yield node.expression
+        self.emit(unary_opcodes[node.operator])
+
+    def visit_FunctionCallExpression(self, node: FunctionCallExpression):
+        for _, arg_expr in node.arguments:
+            yield arg_expr
+        if node.children is not None:
+            for child_expr in node.children:
+                yield child_expr
+                self.emit(POP)
+        self.emit(CALL, node.slot)
+
+    def visit_StructExpression(self, node: StructExpression):
+        for _, expression in node.fields:
+            yield expression
+        self.emit(MAKE_STRUCT, len(node.fields))
+
+    def visit_MemberAccessExpression(self, node: MemberAccessExpression):
+        yield node.expression
+        self.emit(LOAD_FIELD, node.index)
+
+    def visit_IdentifierExpression(self, node: IdentifierExpression):
+        self.emit(LOAD_LOCAL, node.slot)
+
+    def visit_LiteralExpression(self, node: LiteralExpression):
+        self.emit(LOAD_CONST, self.constant(node.value))
+
+
+def compile_function(function: FunctionDeclaration) -> Code:
+    return BytecodeCompiler().visit(function)
@@ -0,0 +1,260 @@
+import math
+import sys
+import time
+from typing import Any, Callable, List, Optional
+from syvora.ast_creator.ast_nodes import Module
+from syvora.ast_optimizer.constant_folder import fold_int
+from syvora.ast_optimizer.dead_functions import reachable_slots
+from syvora.ast_optimizer.evaluator import pure_slots
+from syvora.semantic import PRINT_SLOT, SCALAR_TYPES, builtin_functions, format_value, resolve
+from .bytecode import *
+
+
+DEFAULT_HOT_THRESHOLD = 1000
+
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+
+def wrap(value: int) -> int:
+    return ((value - INT_MIN) & ((1 << 64) - 1)) + INT_MIN
+
+
+# Float division follows IEEE 754, like fdiv and frem in native code: x / 0.0
+# is an infinity signed by both operands and 0.0 / 0.0 is NaN, and so is the
+# remainder by zero or of an infinity.
+def divide_float(opcode: int, left: float, right: float) -> float:
+    if opcode == DIV:
+        if right != 0:
+            return left / right
+        if left == 0 or math.isnan(left):
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1.0, right)
+    if right == 0 or math.isinf(left):
+        return math.nan
+    return math.fmod(left, right)
+
+
+def divide(opcode: int, left, right):
+    if isinstance(left, float):
+        return divide_float(opcode, left, right)
+    value = fold_int("/" if opcode == DIV else "%", left, right)
+    if value is None:
+        raise ZeroDivisionError("integer division by zero or overflow")
+    return value
+
+
+# Native functions are called through ctypes, which only passes scalars.
+def has_scalar_signature(function) -> bool:
+    types = [argument.type for argument in function.arguments] + [function.return_type]
+    return all(t is None or repr(t) in SCALAR_TYPES for t in types)
+
+
+class Promotion:
+    def __init__(self, name: str, calls: int, compile_time: float):
+        self.name = name
+        self.calls = calls
+        self.compile_time = compile_time
+
+
+# Runs a module on bytecode, compiling each function the first time it is
+# called. A function called hot_threshold times is JIT-compiled together with
+# everything it calls, and from then on calls to it run natively; frames that
+# are already running in the interpreter finish there. A threshold of 0 never
+# promotes, so llvmlite is not even imported. Functions that take or return
+# structs stay interpreted, though native code may still call them.
+class VM:
+    def __init__(self, module: Module, hot_threshold: int = DEFAULT_HOT_THRESHOLD, opt_level: int = 0, target_cpu: Optional[str] = None):
+        if module.function_table is None:
+            resolve(module)
+        self.module = module
+        self.function_table = module.function_table
+        self.hot_threshold = hot_threshold
+        self.opt_level = opt_level
+        self.target_cpu = target_cpu
+        if hot_threshold > 0 and target_cpu is not None:
+            # Rejects a CPU before the run rather than at the first promotion.
+            from syvora.llvmir_generator.target import cpu_and_features
+            cpu_and_features(target_cpu)
+
+        count = len(self.function_table)
+        self.codes: List[Optional[Code]] = [None] * count
+        self.arg_counts = [len(function.arguments) for function in self.function_table]
+        self.call_counts = [0] * count
+        self.promotable = [has_scalar_signature(function) for function in self.function_table]
+        self.native: List[Optional[Callable]] = [None] * count
+        # The JIT of every native function that may print, None for the rest.
+        self.native_output: List[Optional[Any]] = [None] * count
+        self.pure = None
+        self.jits = []
+        self.promotions: List[Promotion] = []
+        self.execution_time = 0.0
+
+    def code(self, slot: int) -> Code:
+        code = self.codes[slot]
+        if code is None:
+            code = compile_function(self.function_table[slot])
+            self.codes[slot] = code
+        return code
+
+    def promote(self, slot: int):
+        # Imported here so that runs that never get hot skip llvmlite entirely.
+        from syvora.llvmir_generator import LLVMIRGenerator
+        from syvora.llvmir_generator.jit import JIT
+        from syvora.llvmir_generator.optimizer import create_llvm_module
+
+        if self.pure is None:
+            self.pure = pure_slots(self.function_table)
+
+        start = time.perf_counter()
+        generator = LLVMIRGenerator(self.function_table)
+        generator.add_runtime()
+        for callee in sorted(reachable_slots(self.module, [slot])):
+            if callee >= len(builtin_functions):
+                generator.visit(self.function_table[callee])
+        jit = JIT(create_llvm_module(generator.module), self.opt_level, target_cpu=self.target_cpu)
+
+        self.jits.append(jit)
+        self.native[slot] = jit.cfunction(generator.function_for_slot(slot))
+        self.native_output[slot] = jit if slot not in self.pure else None
+        self.promotions.append(Promotion(
+            self.function_table[slot].name, self.call_counts[slot], time.perf_counter() - start))
+
+    def call_native(self, slot: int, args: list):
+        jit = self.native_output[slot]
+        if jit is None:
+            return self.native[slot](*args)
+
+        # Keep what the interpreter and native code print in order.
+        sys.stdout.flush()
+        result = self.native[slot](*args)
+        jit.flush_output()
+        return result
+
+    def run(self, name: str = "main"):
+        for slot, function in enumerate(self.function_table):
+            if slot >= len(builtin_functions) and function.name == name:
+                if len(function.arguments) != 0:
+                    raise RuntimeError(f"{name} function must not take arguments")
+                start = time.perf_counter()
+                try:
+                    return self.execute(slot, [])
+                finally:
+                    sys.stdout.flush()
+                    self.execution_time += time.perf_counter() - start
+        raise RuntimeError(f"{name} function not found in the module")
+
+    def execute(self, slot: int, args: list) -> Any:
+        code = self.code(slot)
+        instructions = code.instructions
+        constants = code.constants
+        local_values = args + [None] * (code.local_count - len(args))
+        stack: List[Any] = []
+        base = 0
+        frames = []
+        pc = 0
+
+        native = self.native
+        call_counts = self.call_counts
+        arg_counts = self.arg_counts
+        hot_threshold = self.hot_threshold
+        promotable = self.promotable
+
+        while True:
+            opcode = instructions[pc]
+            operand = instructions[pc + 1]
+            pc += 2
+
+            if opcode == LOAD_LOCAL:
+                stack.append(local_values[operand])
+            elif opcode == LOAD_CONST:
+                stack.append(constants[operand])
+            elif opcode == STORE_LOCAL:
+                local_values[operand] = stack.pop()
+            elif opcode == CALL:
+                count = arg_counts[operand]
+                call_args = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+
+                if native[operand] is None and operand >= len(builtin_functions):
+                    calls = call_counts[operand] + 1
+                    call_counts[operand] = calls
+                    if calls == hot_threshold and promotable[operand]:
+                        try:
+                            self.promote(operand)
+                        except Exception as error:
+                            # Promotion is best effort; the function stays interpreted.
+                            print(f"syvora: could not promote {self.function_table[operand].name}: {error}", file=sys.stderr)
+                if native[operand] is not None:
+                    stack.append(self.call_native(operand, call_args))
+                elif operand == PRINT_SLOT:
+                    print(format_value(call_args[0]))
+                    stack.append(None)
+                else:
+                    frames.append((instructions, constants, local_values, base, pc))
+                    code = self.code(operand)
+                    instructions = code.instructions
+                    constants = code.constants
+                    local_values = call_args
+                    if code.local_count > count:
+                        local_values += [None] * (code.local_count - count)
+                    base = len(stack)
+                    pc = 0
+            elif opcode == RETURN:
+                value = stack.pop()
+                if not frames:
+                    return value
+                del stack[base:]
+                stack.append(value)
+                instructions, constants, local_values, base, pc = frames.pop()
+            elif opcode == JUMP_IF_FALSE:
+                if not stack.pop():
+                    pc = operand
+            elif opcode == JUMP:
+                pc = operand
+            elif opcode == POP:
+                stack.pop()
+            elif opcode <= MUL:
+                right = stack.pop()
+                left = stack[-1]
+                if opcode == ADD:
+                    value = left + right
+                elif opcode == SUB:
+                    value = left - right
+                else:
+                    value = left * right
+                if isinstance(value, int) and not INT_MIN <= value <= INT_MAX:
+                    value = wrap(value)
+                stack[-1] = value
+            elif opcode <= MOD:
+                right = stack.pop()
+                stack[-1] = divide(opcode, stack[-1], right)
+            elif opcode <= GE:
+                right = stack.pop()
+                left = stack[-1]
+                if opcode == EQ:
+                    stack[-1] = left == right
+                elif opcode == NE:
+                    stack[-1] = left != right
+                elif opcode == LT:
+                    stack[-1] = left < right
+                elif opcode == LE:
+                    stack[-1] = left <= right
+                elif opcode == GT:
+                    stack[-1] = left > right
+                else:
+                    stack[-1] = left >= right
+            elif opcode == NEG:
+                value = -stack[-1]
+                # A Float can equal -INT_MIN too, but only Ints wrap.
+                stack[-1] = wrap(value) if type(value) is int and value == -INT_MIN else value
+            elif opcode == NOT:
+                stack[-1] = not stack[-1]
+            elif opcode == MAKE_STRUCT:
+                fields = tuple(stack[len(stack) - operand:])
+                del stack[len(stack) - operand:]
+                stack.append(fields)
+            elif opcode == LOAD_FIELD:
+                stack[-1] = stack[-1][operand]
+            else:
+                raise RuntimeError(f"Unknown opcode {opcode}")
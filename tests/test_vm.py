@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every operation runs on arguments, so that nothing is folded at compile time.
+ARITHMETIC = """fn add(a: Int, b: Int) -> Int {
+    return a + b
+}
+
+fn mul(a: Int, b: Int) -> Int {
+    return a * b
+}
+
+fn div(a: Int, b: Int) -> Int {
+    return a / b
+}
+
+fn rem(a: Int, b: Int) -> Int {
+    return a % b
+}
+
+fn neg(x: Int) -> Int {
+    return -x
+}
+
+fn fdiv(a: Float, b: Float) -> Float {
+    return a / b
+}
+
+fn frem(a: Float, b: Float) -> Float {
+    return a % b
+}
+
+fn fneg(x: Float) -> Float {
+    return -x
+}
+
+fn main() -> Int {
+    <print arg={<add a={9223372036854775807} b={1} />} />
+    <print arg={<mul a={4611686018427387904} b={4} />} />
+    <print arg={<neg x={-9223372036854775807 - 1} />} />
+    <print arg={<div a={-7} b={2} />} />
+    <print arg={<rem a={-7} b={2} />} />
+    <print arg={<div a={7} b={-2} />} />
+    <print arg={<rem a={7} b={-2} />} />
+    <print arg={<rem a={-7} b={-2} />} />
+    <print arg={<frem a={-7.5} b={2.0} />} />
+    <print arg={<frem a={5.5} b={0.0} />} />
+    <print arg={<frem a={0.0} b={0.0} />} />
+    <print arg={<fdiv a={1.0} b={0.0} />} />
+    <print arg={<fdiv a={1.0} b={-0.0} />} />
+    <print arg={<fdiv a={0.0} b={0.0} />} />
+    <print arg={<fneg x={-9223372036854775808.0} />} />
+    <print arg={<fneg x={9223372036854775808.0} />} />
+    return <rem a={-9} b={4} />
+}
+"""
+
+
+def run(path: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", "syvora.main", "run", "--eval-steps", "0", *options, path],
+                          cwd=ROOT, capture_output=True, text=True,
+                          env=dict(os.environ, PYTHONPATH=ROOT))
+
+
+# The bytecode VM has to compute what native code does, or results would
+# change when a function is promoted.
+class VMMatchesJITTest(unittest.TestCase):
+    def test_arithmetic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "arithmetic.syv")
+            with open(path, "w") as file:
+                file.write(ARITHMETIC)
+            jit = run(path)
+            vm = run(path, "--tiered", "--hot-threshold", "0")
+
+        self.assertEqual(jit.stderr, "")
+        self.assertEqual(vm.stderr, "")
+        self.assertEqual(vm.stdout, jit.stdout)
+        self.assertEqual(vm.returncode, jit.returncode)
+
+
+if __name__ == "__main__":
+    unittest.main()